@@ -0,0 +1,259 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import re
+
+import numpy as np
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.helper_functions.coordinates import lv95_to_wgs84, wgs84_to_ecef, get_enu_rotation
+
+GPS_EPOCH = datetime(1980, 1, 6, tzinfo=timezone.utc)
+LEAP_SECONDS = 18 # GPS - UTC since 2017
+SECONDS_PER_WEEK = 604800
+
+MU = 3.986005e14 # gravitational constant of the earth (IS-GPS-200) [m^3/s^2]
+OMEGA_EARTH = 7.2921151467e-5 # rotation rate of the earth [rad/s]
+
+def get_gps_seconds(time: datetime) -> float:
+    """
+    Returns the GPS time [s since 6.1.1980] of a UTC datetime (naive datetimes are taken as UTC).
+    """
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    return (time - GPS_EPOCH).total_seconds() + LEAP_SECONDS
+
+
+@dataclass
+class Almanac:
+    """
+    Keplerian almanac elements of a constellation, one array entry per satellite (angles in radians).
+
+    Attributes
+    ----------
+    satellites : list[str]
+        Satellite names, e.g. G01 or E11.
+
+    week : np.ndarray
+        Almanac week, possibly truncated to 10 bits (resolved against the requested time).
+
+    toa : np.ndarray
+        Time of applicability [s of week].
+
+    eccentricity, inclination, rate_of_right_ascension, sqrt_a, right_ascension, argument_of_perigee, mean_anomaly : np.ndarray
+        Orbital elements.
+
+    healthy : np.ndarray
+        True if the satellite is reported healthy.
+
+    Methods
+    -------
+    concatenate(almanacs: list[Almanac]) -> Almanac:
+        Combines the almanacs of several constellations.
+
+    get_positions(gps_seconds: np.ndarray) -> np.ndarray:
+        Returns the ECEF positions (epochs x satellites x 3) [Meters].
+    """
+    satellites: list[str]
+    week: np.ndarray
+    toa: np.ndarray
+    eccentricity: np.ndarray
+    inclination: np.ndarray
+    rate_of_right_ascension: np.ndarray
+    sqrt_a: np.ndarray
+    right_ascension: np.ndarray
+    argument_of_perigee: np.ndarray
+    mean_anomaly: np.ndarray
+    healthy: np.ndarray
+
+    @staticmethod
+    def concatenate(almanacs: list["Almanac"]) -> "Almanac":
+        return Almanac(satellites=[satellite for almanac in almanacs for satellite in almanac.satellites], **{name: np.concatenate([getattr(almanac, name) for almanac in almanacs]) for name in ('week', 'toa', 'eccentricity', 'inclination', 'rate_of_right_ascension', 'sqrt_a', 'right_ascension', 'argument_of_perigee', 'mean_anomaly', 'healthy')})
+
+    def get_healthy(self) -> "Almanac":
+        return Almanac(satellites=[satellite for satellite, healthy in zip(self.satellites, self.healthy) if healthy], **{name: getattr(self, name)[self.healthy] for name in ('week', 'toa', 'eccentricity', 'inclination', 'rate_of_right_ascension', 'sqrt_a', 'right_ascension', 'argument_of_perigee', 'mean_anomaly', 'healthy')})
+
+    def get_positions(self, gps_seconds: np.ndarray) -> np.ndarray:
+        """
+        Propagates all satellites to all epochs at once (IS-GPS-200 almanac algorithm).
+        """
+        gps_seconds = np.asarray(gps_seconds, dtype=np.float64)[:, None] # epochs x 1
+
+        # resolve truncated weeks (10 bit) to the week closest to the requested time
+        week = self.week + 1024 * np.round((gps_seconds[0, 0] / SECONDS_PER_WEEK - self.week) / 1024)
+        tk = gps_seconds - (week * SECONDS_PER_WEEK + self.toa) # epochs x satellites
+
+        semi_major_axis = self.sqrt_a**2
+        mean_anomaly = self.mean_anomaly + np.sqrt(MU / semi_major_axis**3) * tk
+
+        # Kepler's equation, Newton iterations on the whole array
+        eccentric_anomaly = mean_anomaly.copy()
+        for _ in range(8):
+            eccentric_anomaly -= (eccentric_anomaly - self.eccentricity * np.sin(eccentric_anomaly) - mean_anomaly) / (1 - self.eccentricity * np.cos(eccentric_anomaly))
+
+        true_anomaly = np.arctan2(np.sqrt(1 - self.eccentricity**2) * np.sin(eccentric_anomaly), np.cos(eccentric_anomaly) - self.eccentricity)
+        argument_of_latitude = true_anomaly + self.argument_of_perigee
+        radius = semi_major_axis * (1 - self.eccentricity * np.cos(eccentric_anomaly))
+        right_ascension = self.right_ascension + (self.rate_of_right_ascension - OMEGA_EARTH) * tk - OMEGA_EARTH * self.toa
+
+        x_orbit = radius * np.cos(argument_of_latitude)
+        y_orbit = radius * np.sin(argument_of_latitude)
+        return np.stack((
+            x_orbit * np.cos(right_ascension) - y_orbit * np.cos(self.inclination) * np.sin(right_ascension),
+            x_orbit * np.sin(right_ascension) + y_orbit * np.cos(self.inclination) * np.cos(right_ascension),
+            y_orbit * np.sin(self.inclination),
+        ), axis=-1)
+
+
+def read_yuma(path: str, prefix: str = "G") -> Almanac:
+    """
+    Reads an almanac in YUMA format (GPS, Galileo uses the same layout).
+    """
+    records = []
+    with open(path, "r") as file:
+        for line in file:
+            if line.startswith("****"):
+                records.append({})
+            elif ":" in line and records:
+                key, value = line.split(":", 1)
+                records[-1][key.strip().lower()] = value.strip()
+
+    if not records:
+        raise ValueError(f"Keine YUMA-Almanach-Daten in {path} gefunden!")
+
+    def values(key: str) -> np.ndarray:
+        return np.array([float(next(value for name, value in record.items() if name.startswith(key))) for record in records])
+
+    return Almanac(satellites=[f"{prefix}{int(record['id']):02d}" for record in records], week=values("week"), toa=values("time of applicability"), eccentricity=values("eccentricity"), inclination=values("orbital inclination"), rate_of_right_ascension=values("rate of right ascen"), sqrt_a=values("sqrt(a)"), right_ascension=values("right ascen at week"), argument_of_perigee=values("argument of perigee"), mean_anomaly=values("mean anom"), healthy=values("health") == 0)
+
+
+def read_sem(path: str, prefix: str = "G") -> Almanac:
+    """
+    Reads an almanac in SEM format (angles in semicircles, inclination as offset from 0.3 semicircles).
+    """
+    with open(path, "r") as file:
+        lines = file.read().splitlines()
+
+    # numbers only, labels like "(PRN)" are ignored
+    numbers = [float(token) for line in lines[1:] for token in re.sub(r"\(.*?\)", " ", line).split()]
+    number_of_records = int(lines[0].split()[0])
+    week, toa = numbers[:2]
+
+    records = np.array(numbers[2:2 + 14 * number_of_records]).reshape(number_of_records, 14)
+    if len(records) == 0:
+        raise ValueError(f"Keine SEM-Almanach-Daten in {path} gefunden!")
+
+    # PRN, SVN, URA, e, di, OMEGADOT, sqrtA, OMEGA0, omega, M0, af0, af1, health, config
+    return Almanac(satellites=[f"{prefix}{int(prn):02d}" for prn in records[:, 0]], week=np.full(number_of_records, week), toa=np.full(number_of_records, toa), eccentricity=records[:, 3], inclination=(0.3 + records[:, 4]) * np.pi, rate_of_right_ascension=records[:, 5] * np.pi, sqrt_a=records[:, 6], right_ascension=records[:, 7] * np.pi, argument_of_perigee=records[:, 8] * np.pi, mean_anomaly=records[:, 9] * np.pi, healthy=records[:, 12] == 0)
+
+
+def read_almanac(path: str, prefix: str = "G") -> Almanac:
+    """
+    Reads a YUMA or SEM almanac, the format is detected from the content.
+    """
+    with open(path, "r") as file:
+        content = file.read(4096)
+    if "****" in content:
+        return read_yuma(path=path, prefix=prefix)
+    return read_sem(path=path, prefix=prefix)
+
+
+@dataclass
+class PointVisibility:
+    """
+    Satellite geometry at a point over the epochs of a VisibilityForecast.
+
+    Attributes
+    ----------
+    name : str
+        Point name.
+
+    azimuths, elevations : np.ndarray
+        Direction of every satellite (epochs x satellites) [gon].
+
+    visible : np.ndarray
+        True if the satellite is above the cut-off angle and the horizon of the point (epochs x satellites).
+    """
+    name: str
+    azimuths: np.ndarray
+    elevations: np.ndarray
+    visible: np.ndarray
+
+    def get_visible_counts(self) -> np.ndarray:
+        return self.visible.sum(axis=1)
+
+
+@dataclass
+class VisibilityForecast:
+    """
+    Predicts which satellites are visible at the points of a session, the satellite positions of all epochs are
+    computed once as (epochs x satellites) arrays and shared by all points.
+
+    Attributes
+    ----------
+    almanac : Almanac
+        Satellites to forecast, unhealthy satellites are ignored.
+
+    start : datetime
+        Start of the time window (UTC).
+
+    duration : float
+        Length of the time window [hours]. Default 24.
+
+    step : float
+        Distance between two epochs [minutes]. Default 1.
+
+    cutoff : float
+        Cut-off angle [gon]. Default 0.
+
+    Methods
+    -------
+    get_epochs() -> list[datetime]:
+        Returns the epochs of the time window.
+
+    forecast(points: list[GNSS_Point], horizons: dict[str, tuple[list, list]]) -> dict[str, PointVisibility]:
+        Returns the visibility per point name, horizons are (azimuths, elevation_angles) of RoughPlanning.plan.
+    """
+    almanac: Almanac
+    start: datetime
+    duration: float = 24
+    step: float = 1
+    cutoff: float = 0
+
+    def __post_init__(self) -> None:
+        self.almanac = self.almanac.get_healthy()
+        self._positions = None
+
+    def get_epochs(self) -> list[datetime]:
+        number_of_epochs = int(self.duration * 60 / self.step) + 1
+        return [self.start + timedelta(minutes=self.step * idx) for idx in range(number_of_epochs)]
+
+    def get_positions(self) -> np.ndarray:
+        if self._positions is None:
+            self._positions = self.almanac.get_positions(gps_seconds=[get_gps_seconds(epoch) for epoch in self.get_epochs()])
+        return self._positions
+
+    def get_directions(self, point: GNSS_Point) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns azimuths and elevations (epochs x satellites) [gon] of all satellites seen from the antenna of the point.
+        """
+        latitude, longitude, height = lv95_to_wgs84(easting=point.easting, northing=point.northing, height=point.floor_height + point.antenna_height)
+        receiver = wgs84_to_ecef(latitude=latitude, longitude=longitude, height=height)
+
+        enu = (self.get_positions() - receiver) @ get_enu_rotation(latitude=latitude, longitude=longitude).T # epochs x satellites x 3
+        azimuths = np.mod(np.arctan2(enu[..., 0], enu[..., 1]), 2 * np.pi) * 200 / np.pi
+        elevations = np.arctan2(enu[..., 2], np.hypot(enu[..., 0], enu[..., 1])) * 200 / np.pi
+        return (azimuths, elevations)
+
+    def forecast(self, points: list[GNSS_Point], horizons: dict[str, tuple[list, list]]) -> dict[str, PointVisibility]:
+        visibilities = {}
+        for point in points:
+            azimuths, elevations = self.get_directions(point=point)
+
+            mask = np.full(azimuths.shape, float(self.cutoff))
+            if point.name in horizons:
+                horizon_azimuths, horizon_angles = horizons[point.name]
+                # horizon between the computed azimuths, periodic over 400 gon
+                mask = np.maximum(mask, np.interp(azimuths, horizon_azimuths, horizon_angles, period=400))
+
+            visibilities[point.name] = PointVisibility(name=point.name, azimuths=azimuths, elevations=elevations, visible=elevations > mask)
+        return visibilities
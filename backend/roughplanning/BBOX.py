@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 
 from backend.roughplanning.GNSS import GNSS_Session, GNSS_Point
+from backend.roughplanning.SpatialIndex import PointGridIndex
 
 @dataclass
 class BBOX:
@@ -21,6 +22,18 @@ class BBOX:
         
         return bbox
 
+    def intersects(self, other: "BBOX") -> bool:
+        # boxes touching at their border are treated as overlapping
+        return not (self.Emax < other.Emin or other.Emax < self.Emin or self.Nmax < other.Nmin or other.Nmax < self.Nmin)
+
+    def union(self, other: "BBOX") -> "BBOX":
+        bbox = BBOX(Emin=min(self.Emin, other.Emin), Emax=max(self.Emax, other.Emax), Nmin=min(self.Nmin, other.Nmin), Nmax=max(self.Nmax, other.Nmax))
+
+        return bbox
+
+    def contains(self, easting: float, northing: float) -> bool:
+        return self.Emin <= easting <= self.Emax and self.Nmin <= northing <= self.Nmax
+
 
 @ dataclass
 class BBOXCreator:
@@ -37,4 +50,38 @@ class BBOXCreator:
 
         return bbox
 
+    def get_cluster_bboxes(self, distance: float | int) -> list[BBOX]:
+        """
+        Creates one buffered bounding-box per spatial cluster of the session instead of a single box over all points.
+
+        Parameters
+        ----------
+        distance : float | int
+            Buffer distance (analysis distance) in meters.
+
+        Returns
+        -------
+        list[BBOX]
+            Buffered, non-overlapping bounding-boxes covering all points of the session.
+        """
+        index = PointGridIndex(session=self.session, cell_size=2 * distance)
+        clusters = index.get_clusters(distance=distance)
+
+        bboxes = [BBOXCreator(session=GNSS_Session(points=cluster)).get_bbox().puffer_box(distance=distance) for cluster in clusters]
+
+        # merging clusters can create new overlaps -> repeat until all boxes are disjoint
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(bboxes)):
+                for j in range(i + 1, len(bboxes)):
+                    if bboxes[i].intersects(bboxes[j]):
+                        bboxes[i] = bboxes[i].union(bboxes.pop(j))
+                        merged = True
+                        break
+                if merged:
+                    break
+
+        return bboxes
+
 
@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+import math
+
+import numpy as np
+import rasterio
+import rasterio.transform
+import rasterio.windows
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.Horizon import get_azimuths, get_ray_offsets
+
+@dataclass
+class BlockHorizonScheduler:
+    """
+    Computes the horizon of all points of a mosaic at once, reading every DEM block exactly once.
+
+    Every (point, azimuth) ray is split into the runs of samples falling into the same processing block.
+    The blocks are then read in raster order and each run updates the maximal elevation angle of its ray,
+    so the memory use is bounded by one block plus the run list, independent of the mosaic size.
+    The samples are the same as the ones of RoughPlanning.plan_conventional, so are the results.
+
+    Attributes
+    ----------
+    points : list[GNSS_Point]
+        Points inside the mosaic.
+
+    dem_path : str
+        Path to the mosaic (raster.tif).
+
+    block_size : int
+        Minimal edge length of a processing block in pixels, rounded up to multiples of the storage blocks. Default 512.
+
+    Methods
+    -------
+    plan(number_of_lines: int, line_length: float | int, number_of_segments: int) -> dict[str, tuple[list, list]]:
+        Returns (azimuths, elevation_angles) in gon per point name.
+    """
+    points: list[GNSS_Point]
+    dem_path: str
+    block_size: int = 512
+    blocks_read: int = field(default=0, init=False) # statistics of the last run
+
+    def plan(self, number_of_lines: int, line_length: float | int, number_of_segments: int) -> dict[str, tuple[list, list]]:
+        with rasterio.open(self.dem_path) as src:
+            transform = src.transform
+            pix_size = transform[0]
+            scale = src.scales[0]
+            offset = src.offsets[0]
+            block_height, block_width = self.get_block_shape(src=src)
+
+            # if segmentsize is smaller than the actual width of a cell -> segmentsize will be overwritten with cell size
+            if line_length / pix_size < number_of_segments:
+                number_of_segments = int(line_length / pix_size)
+
+            easting_lines, northing_lines, runs = self.create_runs(transform=transform, number_of_lines=number_of_lines, line_length=line_length, number_of_segments=number_of_segments, block_shape=(block_height, block_width), raster_shape=(src.height, src.width))
+
+            distances = np.sqrt(easting_lines**2 + northing_lines**2)
+            max_alpha = np.full((len(self.points), number_of_lines), -np.inf)
+
+            self.blocks_read = 0
+            for block in sorted(runs): # raster order -> sequential reads
+                block_row, block_col = block
+                window = rasterio.windows.Window(col_off=block_col * block_width, row_off=block_row * block_height, width=min(block_width, src.width - block_col * block_width), height=min(block_height, src.height - block_row * block_height))
+                data = src.read(1, window=window)
+                self.blocks_read += 1
+
+                for point_idx, line_idx, first, last in runs[block]:
+                    point = self.points[point_idx]
+                    rows, cols = rasterio.transform.rowcol(transform, point.easting + easting_lines[line_idx, first:last], point.northing + northing_lines[line_idx, first:last])
+                    heights = data[np.asarray(rows) - window.row_off, np.asarray(cols) - window.col_off] * scale + offset
+
+                    # Height of GNSS at its position to calculate height difference between itself and the terrain-points
+                    gnss_height = point.floor_height + point.antenna_height
+                    alphas = np.arctan((heights - gnss_height) / distances[line_idx, first:last])
+                    max_alpha[point_idx, line_idx] = max(max_alpha[point_idx, line_idx], np.nanmax(alphas, initial=-np.inf))
+
+        azimuths = [400 / number_of_lines * i for i in range(number_of_lines)]
+        return {point.name: (list(azimuths), list(max_alpha[point_idx] * 200 / np.pi)) for point_idx, point in enumerate(self.points)}
+
+    def get_block_shape(self, src) -> tuple[int, int]:
+        # processing blocks are multiples of the storage blocks (strips or tiles) of the file
+        storage_height, storage_width = src.block_shapes[0]
+        block_height = math.ceil(self.block_size / storage_height) * storage_height
+        block_width = math.ceil(self.block_size / storage_width) * storage_width
+        return (block_height, block_width)
+
+    def create_runs(self, transform: rasterio.Affine, number_of_lines: int, line_length: float | int, number_of_segments: int, block_shape: tuple[int, int], raster_shape: tuple[int, int]) -> tuple[np.ndarray, np.ndarray, dict]:
+        """
+        Splits all rays into runs of consecutive samples in the same block.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray, dict]
+            easting and northing offsets of the samples (lines x segments) and
+            {(block_row, block_col): [(point_idx, line_idx, first, last)]}. The pixels of a run are recomputed
+            when its block is processed, so only four integers per run are kept.
+        """
+        easting_lines, northing_lines = get_ray_offsets(azimuths=get_azimuths(number_of_lines=number_of_lines), line_length=line_length, number_of_segments=number_of_segments)
+
+        runs = {}
+        for point_idx, point in enumerate(self.points):
+            rows, cols = rasterio.transform.rowcol(transform, (point.easting + easting_lines).ravel(), (point.northing + northing_lines).ravel())
+            rows = np.asarray(rows).reshape(easting_lines.shape)
+            cols = np.asarray(cols).reshape(easting_lines.shape)
+
+            if rows.min() < 0 or cols.min() < 0 or rows.max() >= raster_shape[0] or cols.max() >= raster_shape[1]:
+                raise EOFError(f"Expansion DEM not sufficient! {point.name}")
+
+            block_ids = (rows // block_shape[0]) * (raster_shape[1] // block_shape[1] + 1) + cols // block_shape[1]
+            for line_idx in range(number_of_lines):
+                # a straight ray crosses a rectangular block once -> samples of a block are consecutive
+                changes = np.flatnonzero(np.diff(block_ids[line_idx])) + 1
+                bounds = np.concatenate(([0], changes, [number_of_segments]))
+                for first, last in zip(bounds[:-1], bounds[1:]):
+                    block = (int(rows[line_idx, first] // block_shape[0]), int(cols[line_idx, first] // block_shape[1]))
+                    runs.setdefault(block, []).append((point_idx, line_idx, int(first), int(last)))
+
+        return (easting_lines, northing_lines, runs)
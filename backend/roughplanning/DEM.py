@@ -0,0 +1,393 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import glob
+import os
+import threading
+
+import numpy as np
+import rasterio
+import rasterio.transform
+
+from backend.roughplanning.BBOX import BBOX
+from backend.roughplanning.Downloader import LoadRasterDEM, TileProduct, WMS_URL, DATA_URL, SWISSSURFACE3D
+from backend.roughplanning.Merger import get_pyramid_path
+
+# rasters already read by this process, worker processes receive RasterDEM without its arrays for every line
+_raster_cache: dict = {}
+
+# tiles already read by this process per (cache folder, i, j), worker processes receive LazyTileDEM without them for
+# every line; least recently used tiles are dropped beyond TILE_CACHE_BYTES
+_tile_cache: OrderedDict = OrderedDict()
+_tile_cache_lock = threading.Lock()
+TILE_CACHE_BYTES = 1024 ** 3
+
+# one lock per tile of a cache folder, threads of a process reaching the same tile fetch and read it once
+_tile_locks: dict = {}
+_tile_locks_lock = threading.Lock()
+
+
+def get_tile_key(cache_folder: str, i: int, j: int) -> tuple[str, int, int]:
+    return (os.path.abspath(cache_folder), i, j)
+
+
+def get_tile_lock(cache_folder: str, i: int, j: int) -> threading.RLock:
+    with _tile_locks_lock:
+        return _tile_locks.setdefault(get_tile_key(cache_folder=cache_folder, i=i, j=j), threading.RLock())
+
+
+def get_cached_tile(key: tuple[str, int, int]) -> tuple[np.ndarray, rasterio.Affine] | None:
+    with _tile_cache_lock:
+        tile = _tile_cache.get(key)
+        if tile is not None:
+            _tile_cache.move_to_end(key)
+        return tile
+
+
+def cache_tile(key: tuple[str, int, int], tile: tuple[np.ndarray, rasterio.Affine] | None) -> None:
+    # None drops the tile (e.g. a new version was published)
+    with _tile_cache_lock:
+        if tile is None:
+            _tile_cache.pop(key, None)
+            return
+        _tile_cache[key] = tile
+        size = sum(array.nbytes for array, _ in _tile_cache.values())
+        while size > TILE_CACHE_BYTES and len(_tile_cache) > 1:
+            _, (array, _) = _tile_cache.popitem(last=False)
+            size -= array.nbytes
+    return
+
+
+@dataclass
+class RasterDEM:
+    """
+    DEM provider reading heights from a single (merged) raster file.
+
+    The first band is read once per process and kept in memory in its stored type, the array is not pickled when the
+    provider is sent to worker processes. Quantized rasters (RasterMerger storage INT16/INT32) are converted with
+    their scale/offset when sampled.
+
+    Attributes
+    ----------
+    path : str
+        Path to the raster file (e.g. raster.tif).
+
+    max_height : float | None
+        Upper bound of all heights in meters. Default None -> no early-out, the whole band is in memory anyway.
+
+    use_pyramid : bool
+        Use the max-height pyramid next to the raster (written by RasterMerger) if it exists. Default True.
+
+    Methods
+    -------
+    get_pixel_size() -> float:
+        Returns the pixel size in meters.
+
+    get_memory_size() -> int:
+        Returns the size of the band in memory [bytes] (per process) without reading it.
+
+    sample(eastings: np.ndarray, northings: np.ndarray) -> np.ndarray:
+        Returns the heights at the given coordinates.
+
+    get_array() -> tuple[np.ndarray, rasterio.Affine]:
+        Returns the first band (stored type) and its transform.
+
+    get_scale_offset() -> tuple[float, float]:
+        Returns scale and offset of the first band (height = value * scale + offset).
+
+    get_pyramid_block_sizes() -> list[int]:
+        Returns the block sizes of the available pyramid levels, coarsest first.
+
+    sample_max(eastings: np.ndarray, northings: np.ndarray, block_size: int) -> np.ndarray:
+        Returns the maximal height of the pyramid cells containing the given coordinates.
+    """
+    path: str
+    max_height: float | None = None # upper bound of all heights, None disables early-out
+    use_pyramid: bool = True
+    _array: np.ndarray | None = field(default=None, init=False, repr=False)
+    _transform: rasterio.Affine | None = field(default=None, init=False, repr=False)
+    _pyramid: dict | None = field(default=None, init=False, repr=False)
+    _scale_offset: tuple[float, float] = field(default=(1.0, 0.0), init=False, repr=False)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['_array'] = None
+        state['_pyramid'] = None
+        return state
+
+    def open(self) -> None:
+        if self._array is None:
+            key = (os.path.abspath(self.path), os.path.getmtime(self.path), self.use_pyramid)
+            if key not in _raster_cache:
+                _raster_cache.clear() # keep a single raster per process
+                _raster_cache[key] = self.read()
+            self._array, self._transform, self._pyramid, self._scale_offset = _raster_cache[key]
+        return
+
+    def read(self) -> tuple[np.ndarray, rasterio.Affine, dict, tuple[float, float]]:
+        with rasterio.open(self.path) as src:
+            array = src.read(1)
+            transform = src.transform
+            scale_offset = (float(src.scales[0]), float(src.offsets[0]))
+
+        pyramid = {}
+        pyramid_path = get_pyramid_path(raster_path=self.path)
+        if self.use_pyramid and os.path.exists(pyramid_path):
+            with np.load(pyramid_path) as levels:
+                pyramid = {int(block_size): levels[f"level_{block_size}"] for block_size in levels["block_sizes"]}
+
+        return (array, transform, pyramid, scale_offset)
+
+    def get_array(self) -> tuple[np.ndarray, rasterio.Affine]:
+        self.open()
+        return (self._array, self._transform)
+
+    def get_scale_offset(self) -> tuple[float, float]:
+        self.open()
+        return self._scale_offset
+
+    def get_pyramid_block_sizes(self) -> list[int]:
+        self.open()
+        return sorted(self._pyramid, reverse=True)
+
+    def sample_max(self, eastings: np.ndarray, northings: np.ndarray, block_size: int) -> np.ndarray:
+        self.open()
+        rows, cols = rasterio.transform.rowcol(self._transform, np.atleast_1d(eastings), np.atleast_1d(northings))
+
+        level = self._pyramid[block_size]
+        rows = np.clip(np.asarray(rows) // block_size, 0, level.shape[0] - 1)
+        cols = np.clip(np.asarray(cols) // block_size, 0, level.shape[1] - 1)
+        return level[rows, cols]
+
+    def get_pixel_size(self) -> float:
+        with rasterio.open(self.path) as src:
+            return src.transform[0]
+
+    def get_memory_size(self) -> int:
+        with rasterio.open(self.path) as src:
+            return src.width * src.height * np.dtype(src.dtypes[0]).itemsize
+
+    def sample(self, eastings: np.ndarray, northings: np.ndarray) -> np.ndarray:
+        self.open()
+        rows, cols = rasterio.transform.rowcol(self._transform, np.atleast_1d(eastings), np.atleast_1d(northings))
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+
+        height, width = self._array.shape
+        if rows.min() < 0 or cols.min() < 0 or rows.max() >= height or cols.max() >= width:
+            raise EOFError(f"Expansion DEM not sufficient!{width} {rows.max()} {height} {cols.max()}")
+
+        scale, offset = self._scale_offset
+        return self._array[rows, cols] * scale + offset
+
+
+@dataclass
+class LazyTileDEM:
+    """
+    DEM provider fetching 1 km tiles (swissSURFACE3D or swissALTI3D) on first access.
+
+    Tiles are looked up (temporalkey) and downloaded the first time a coordinate inside them is sampled,
+    kept in cache_folder on disk and in memory per process (shared by all providers of the folder and kept by
+    worker processes between the lines they receive). Together with the early-out of the horizon
+    computation, tiles which cannot influence any horizon are never downloaded. Threads sharing the provider
+    (Executor THREAD) wait for a tile another thread is fetching instead of downloading it again.
+
+    Attributes
+    ----------
+    cache_folder : str
+        Folder where downloaded tiles are kept between runs.
+
+    wms_url : str
+        Address of the WMS used to resolve the tiles. May point to a local fixture server.
+
+    data_url : str
+        Address of the raster download. May point to a local fixture server.
+
+    max_height : float
+        Upper bound of all heights in meters, used to stop sampling a line early. Default 4700 m.
+
+    tile_size : float | int
+        Edge length of a tile in meters. Default 1000 m.
+
+    pixel_size : float
+        Pixel size of the tiles in meters. Default 0.5 m.
+
+    product : TileProduct
+        Height model to download, data_url has to match it. Default SWISSSURFACE3D.
+    """
+    cache_folder: str
+    wms_url: str = WMS_URL
+    data_url: str = DATA_URL
+    max_height: float = 4700.0 # above the highest summit of Switzerland
+    tile_size: float | int = 1000
+    pixel_size: float = 0.5
+    product: TileProduct = SWISSSURFACE3D
+
+    def get_pixel_size(self) -> float:
+        return self.pixel_size
+
+    def get_memory_size(self) -> int:
+        # a disk within one tile of the point touches up to four tiles (float32)
+        return 4 * int(self.tile_size / self.pixel_size) ** 2 * np.dtype(np.float32).itemsize
+
+    def get_pyramid_block_sizes(self) -> list[int]:
+        # single tiles are sampled on demand, only max_height bounds them
+        return []
+
+    def get_tile(self, i: int, j: int) -> tuple[np.ndarray, rasterio.Affine]:
+        """
+        Returns (array, transform) of the tile with lower-left corner (i * tile_size, j * tile_size).
+        """
+        key = get_tile_key(cache_folder=self.cache_folder, i=i, j=j)
+        tile = get_cached_tile(key=key)
+        if tile is None:
+            with get_tile_lock(cache_folder=self.cache_folder, i=i, j=j):
+                tile = get_cached_tile(key=key)
+                if tile is None: # not read by another thread meanwhile
+                    tile = self.read_tile(filepath=self.fetch_tile(i=i, j=j))
+                    cache_tile(key=key, tile=tile)
+        return tile
+
+    def fetch_tile(self, i: int, j: int) -> str:
+        with get_tile_lock(cache_folder=self.cache_folder, i=i, j=j):
+            # tiles already on disk are reused regardless of their timestamp
+            cached = glob.glob(os.path.join(self.cache_folder, f"{i}-{j}_*.tif"))
+            if cached:
+                return sorted(cached)[-1]
+            return self.download_tile(i=i, j=j)
+
+    def download_tile(self, i: int, j: int) -> str:
+        e = i * self.tile_size
+        n = j * self.tile_size
+        loader = LoadRasterDEM(bbox=BBOX(Emin=e, Emax=e + self.tile_size, Nmin=n, Nmax=n + self.tile_size), download_folder=self.cache_folder, wms_url=self.wms_url, data_url=self.data_url, product=self.product)
+        tiles = loader.query_tiles(e=e + self.tile_size / 2, n=n + self.tile_size / 2)
+        if not tiles:
+            raise EOFError(f"Kein DEM-Kachel bei {e} {n} verfügbar!")
+
+        return loader.download_tile(tile=tiles[0])
+
+    def remove_outdated_tiles(self, tiles: list[tuple[str, str]]) -> None:
+        """
+        Deletes cached tiles of another version than the current (tilekey, temporalkey), they are fetched again on access.
+        """
+        for tile_key, temporalkey in tiles:
+            name = tile_key.replace("_", "-")
+            for path in glob.glob(os.path.join(self.cache_folder, f"{name}_*.tif")):
+                if os.path.basename(path) != f"{name}_{temporalkey}.tif":
+                    os.remove(path)
+                    i, j = (int(value) for value in tile_key.split("_"))
+                    cache_tile(key=get_tile_key(cache_folder=self.cache_folder, i=i, j=j), tile=None)
+        return
+
+    def read_tile(self, filepath: str) -> tuple[np.ndarray, rasterio.Affine]:
+        with rasterio.open(filepath) as src:
+            return (src.read(1), src.transform)
+
+    def sample(self, eastings: np.ndarray, northings: np.ndarray) -> np.ndarray:
+        eastings = np.atleast_1d(np.asarray(eastings, dtype=float))
+        northings = np.atleast_1d(np.asarray(northings, dtype=float))
+        heights = np.empty(eastings.shape, dtype=float)
+
+        tile_i = np.floor(eastings / self.tile_size).astype(int)
+        tile_j = np.floor(northings / self.tile_size).astype(int)
+
+        # sample tile by tile
+        for i, j in set(zip(tile_i.tolist(), tile_j.tolist())):
+            mask = (tile_i == i) & (tile_j == j)
+            array, transform = self.get_tile(i=i, j=j)
+            rows, cols = rasterio.transform.rowcol(transform, eastings[mask], northings[mask])
+
+            # coordinates on the upper/right tile border
+            rows = np.clip(np.asarray(rows), 0, array.shape[0] - 1)
+            cols = np.clip(np.asarray(cols), 0, array.shape[1] - 1)
+            heights[mask] = array[rows, cols]
+
+        return heights
+
+
+
+@dataclass
+class HybridDEM:
+    """
+    DEM provider combining a fine DEM near the point with a coarse DEM further away.
+
+    Buildings and vegetation only matter close to the point, distant terrain is sampled from the coarse model
+    (e.g. swissSURFACE3D 0.5 m up to near_radius, swissALTI3D 2 m beyond), which needs far fewer tiles and samples.
+
+    Attributes
+    ----------
+    near : RasterDEM | LazyTileDEM
+        Fine DEM, has to cover near_radius around the point.
+
+    far : RasterDEM | LazyTileDEM
+        Coarse DEM, has to cover the analysis distance around the point.
+
+    easting, northing : float
+        Position of the point [Meters].
+
+    near_radius : float
+        Distance up to which the fine DEM is used [Meters].
+
+    Methods
+    -------
+    get_pixel_size() -> float:
+        Returns the pixel size of the fine DEM.
+
+    get_memory_size() -> int:
+        Returns the memory of both models [bytes].
+
+    sample(eastings: np.ndarray, northings: np.ndarray) -> np.ndarray:
+        Returns the heights, from the fine DEM within near_radius and from the coarse DEM beyond.
+
+    thin_samples(line_points: list) -> list:
+        Keeps all points within near_radius and one point per pixel of the coarse DEM beyond.
+    """
+    near: RasterDEM | LazyTileDEM
+    far: RasterDEM | LazyTileDEM
+    easting: float
+    northing: float
+    near_radius: float
+
+    def __post_init__(self) -> None:
+        if self.near_radius <= 0:
+            raise ValueError("Attribute 'near_radius' must be positive.")
+
+        # early-out only if both models know an upper bound
+        if self.near.max_height is None or self.far.max_height is None:
+            self.max_height = None
+        else:
+            self.max_height = max(self.near.max_height, self.far.max_height)
+
+    def get_pixel_size(self) -> float:
+        return self.near.get_pixel_size()
+
+    def get_memory_size(self) -> int:
+        return self.near.get_memory_size() + self.far.get_memory_size()
+
+    def get_pyramid_block_sizes(self) -> list[int]:
+        # the pyramids of the two models have different cells, only max_height bounds the samples
+        return []
+
+    def thin_samples(self, line_points: list) -> list:
+        """
+        Removes points beyond near_radius closer than one coarse pixel to the previous kept point (line_points sorted by distance).
+        """
+        far_pixel_size = self.far.get_pixel_size()
+        thinned = []
+        last_distance = -np.inf
+        for line_point in line_points:
+            if line_point.distance_from_start <= self.near_radius or line_point.distance_from_start - last_distance >= far_pixel_size:
+                thinned.append(line_point)
+                last_distance = line_point.distance_from_start
+        return thinned
+
+    def sample(self, eastings: np.ndarray, northings: np.ndarray) -> np.ndarray:
+        eastings = np.atleast_1d(np.asarray(eastings, dtype=float))
+        northings = np.atleast_1d(np.asarray(northings, dtype=float))
+        heights = np.empty(eastings.shape, dtype=float)
+
+        near = np.hypot(eastings - self.easting, northings - self.northing) <= self.near_radius
+        if near.any():
+            heights[near] = self.near.sample(eastings=eastings[near], northings=northings[near])
+        if not near.all():
+            heights[~near] = self.far.sample(eastings=eastings[~near], northings=northings[~near])
+        return heights
@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from backend.roughplanning.Almanac import PointVisibility
+
+@dataclass
+class DOPSeries:
+    """
+    Dilution of precision of a point over the epochs of a forecast, NaN where less than 4 satellites are visible.
+
+    Attributes
+    ----------
+    name : str
+        Point name.
+
+    pdop, hdop, vdop, gdop : np.ndarray
+        DOP values per epoch.
+
+    satellites : np.ndarray
+        Number of visible satellites per epoch.
+
+    Methods
+    -------
+    get_summary(threshold: float) -> dict:
+        Returns the threshold, min/mean/max PDOP and the share of epochs with PDOP <= threshold.
+    """
+    name: str
+    pdop: np.ndarray
+    hdop: np.ndarray
+    vdop: np.ndarray
+    gdop: np.ndarray
+    satellites: np.ndarray
+
+    def get_summary(self, threshold: float = 6.0) -> dict:
+        valid = np.isfinite(self.pdop)
+        if not valid.any():
+            return {"threshold": threshold, "pdop_min": float("nan"), "pdop_mean": float("nan"), "pdop_max": float("nan"), "share_below_threshold": 0.0}
+        return {"threshold": threshold, "pdop_min": float(np.min(self.pdop[valid])), "pdop_mean": float(np.mean(self.pdop[valid])), "pdop_max": float(np.max(self.pdop[valid])), "share_below_threshold": float(np.mean(valid & (np.nan_to_num(self.pdop, nan=np.inf) <= threshold)))}
+
+
+def compute_dop(visibility: PointVisibility) -> DOPSeries:
+    """
+    Computes the DOP time series of a point. The normal matrices of all epochs are built and inverted as one
+    (epochs x 4 x 4) stack instead of an epoch loop, invisible satellites get weight 0.
+    """
+    azimuths = visibility.azimuths * np.pi / 200
+    elevations = visibility.elevations * np.pi / 200
+    weights = visibility.visible.astype(np.float64)
+
+    # design matrix rows: unit vector receiver -> satellite in east, north, up and the receiver clock
+    design = np.stack((-np.cos(elevations) * np.sin(azimuths), -np.cos(elevations) * np.cos(azimuths), -np.sin(elevations), np.ones_like(elevations)), axis=-1) # epochs x satellites x 4
+    normals = np.matmul((design * weights[..., None]).transpose(0, 2, 1), design) # epochs x 4 x 4
+
+    satellites = visibility.visible.sum(axis=1)
+    cofactors = np.full(normals.shape, np.nan)
+    valid = satellites >= 4
+    if valid.any():
+        try:
+            cofactors[valid] = np.linalg.inv(normals[valid])
+        except np.linalg.LinAlgError:
+            # degenerate geometry in some epoch (e.g. satellites in one plane)
+            cofactors[valid] = np.linalg.pinv(normals[valid])
+
+    diagonal = np.diagonal(cofactors, axis1=1, axis2=2)
+    return DOPSeries(name=visibility.name, pdop=np.sqrt(diagonal[:, :3].sum(axis=1)), hdop=np.sqrt(diagonal[:, :2].sum(axis=1)), vdop=np.sqrt(diagonal[:, 2]), gdop=np.sqrt(diagonal.sum(axis=1)), satellites=satellites)
@@ -1,39 +1,128 @@
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 import requests
 import xml.etree.ElementTree as ET
 import os
 import math
+import shutil
 
 from backend.roughplanning.BBOX import BBOX
 from backend.roughplanning.Merger import RasterMerger
+from backend.roughplanning.HTTPCache import HTTPCache
+from backend.roughplanning.helper_functions.files import open_atomic
+
+WMS_URL = "https://wms.geo.admin.ch/"
+DATA_URL = "https://data.geo.admin.ch/ch.swisstopo.swisssurface3d-raster"
+ALTI_DATA_URL = "https://data.geo.admin.ch/ch.swisstopo.swissalti3d"
+
+@dataclass(frozen=True)
+class TileProduct:
+    """
+    A 1 km tiled height model of swisstopo.
+
+    Attributes
+    ----------
+    name : str
+        Name of the product in the download paths.
+
+    metadata_layer : str
+        WMS layer answering GetFeatureInfo with tilekey and temporalkey.
+
+    resolution : float
+        Pixel size of the downloaded tiles [Meters].
+    """
+    name: str
+    metadata_layer: str
+    resolution: float
+
+SWISSSURFACE3D = TileProduct(name="swisssurface3d-raster", metadata_layer="ch.swisstopo.swisssurface3d.metadata", resolution=0.5) # surface model incl. buildings and vegetation
+SWISSALTI3D = TileProduct(name="swissalti3d", metadata_layer="ch.swisstopo.swissalti3d.metadata", resolution=2.0) # terrain model
 
 @ dataclass
 class LoadRasterDEM:
     bbox: BBOX
     download_folder: str
+    wms_url: str = WMS_URL # may be replaced by a local fixture server
+    data_url: str = DATA_URL
+    product: TileProduct = SWISSSURFACE3D
+    cache_folder: str | None = None # keeps tiles and GetFeatureInfo responses, revalidated with conditional requests
+    max_workers: int = 8 # parallel requests
+    _http_cache: HTTPCache | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # created once here, the download threads share its index and lock
+        if self.cache_folder is not None:
+            self._http_cache = HTTPCache(folder=self.cache_folder, max_workers=self.max_workers)
+
+    def get_http_cache(self) -> HTTPCache | None:
+        return self._http_cache
+
+    def batch(self):
+        # the validator index is written once after several requests instead of after every response
+        return self._http_cache.batch() if self._http_cache is not None else nullcontext()
 
     def load_raster(self, tiles: list) -> None:
-        if not os.path.exists(self.download_folder): # check if download-path exists
-            os.makedirs(self.download_folder)
-
-        for tile in tiles:
-            tile_key = tile[0]
-            tile_key = tile_key.replace("_", "-") # string-replacement
-            timestamp = tile[1]
-
-            filename = f"{tile_key}_{timestamp}"
-            filepath = os.path.join(self.download_folder, f"{filename}.tif")
-            response = requests.get(
-                f"https://data.geo.admin.ch/ch.swisstopo.swisssurface3d-raster/swisssurface3d-raster_{timestamp}_{tile_key}/swisssurface3d-raster_{timestamp}_{tile_key}_0.5_2056_5728.tif"
-            ) # download raster-tile
-            with open(filepath, "wb") as f:
-                f.write(response.content) # write content of response to file
+        with self.batch(), ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(lambda tile: self.download_tile(tile=tile), tiles))
         return
 
+    def get_tile_url(self, tile: tuple) -> str:
+        tile_key = tile[0].replace("_", "-")
+        timestamp = tile[1]
+        name = self.product.name
+        return f"{self.data_url}/{name}_{timestamp}_{tile_key}/{name}_{timestamp}_{tile_key}_{self.product.resolution:g}_2056_5728.tif"
+
+    def revalidate_tiles(self, tiles: list) -> list:
+        """
+        Revalidates the cached tiles (tilekey, temporalkey) in parallel and returns the ones which were downloaded again.
+        """
+        cache = self.get_http_cache()
+        if cache is None:
+            raise AttributeError("Revalidation needs a cache_folder.")
+        fetched = cache.fetch_all(urls=[self.get_tile_url(tile=tile) for tile in tiles])
+        return [tile for tile, (_, downloaded) in zip(tiles, fetched) if downloaded]
+
+    def download_tile(self, tile: tuple) -> str:
+        """
+        Downloads a single raster-tile (tilekey, temporalkey) and returns the path of the written file.
+        """
+        if not os.path.exists(self.download_folder): # check if download-path exists
+            os.makedirs(self.download_folder, exist_ok=True)
+
+        tile_key = tile[0]
+        tile_key = tile_key.replace("_", "-") # string-replacement
+        timestamp = tile[1]
+
+        filename = f"{tile_key}_{timestamp}"
+        filepath = os.path.join(self.download_folder, f"{filename}.tif")
 
-    def get_tiles(self) -> list:
+        cache = self.get_http_cache()
+        if cache is not None:
+            # only downloaded if the cached copy is missing or outdated (304 otherwise)
+            cached_path, _ = cache.fetch(url=self.get_tile_url(tile=tile))
+            with open(cached_path, "rb") as source, open_atomic(filepath) as target:
+                shutil.copyfileobj(source, target)
+            return filepath
+
+        response = requests.get(self.get_tile_url(tile=tile)) # download raster-tile
+        response.raise_for_status()
+
+        # write to a temporary file of this thread first, parallel threads and workers may fetch the same tile
+        with open_atomic(filepath) as f:
+            f.write(response.content) # write content of response to file
+        return filepath
+
+
+    def get_tiles(self, tile_origins: list | None = None) -> list:
         """
-        Creates a list of raster-tiles based on the calculated bounding-box using response from the web-feature-service: ch.swisstopo.swisssurface3d.metadata.
+        Creates a list of raster-tiles based on the calculated bounding-box using response from the web-feature-service (metadata layer of the product, e.g. ch.swisstopo.swisssurface3d.metadata).
+
+        Parameters
+        ----------
+        tile_origins : list | None
+            Lower-left corners [(easting, northing)] of the 1 km tiles to request (e.g. from DiskTileSelector).
+            If None, the whole bounding-box is scanned.
         
         Returns
         -------
@@ -42,28 +131,60 @@ class LoadRasterDEM:
         """
         tiles = []
 
+        if tile_origins is not None:
+            # query the center of the tile to avoid hitting a neighbouring tile at its border
+            with self.batch(), ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                responses = list(executor.map(lambda origin: self.query_tiles(e=origin[0] + 500, n=origin[1] + 500), tile_origins))
+            for response in responses:
+                for tile in response:
+                    if tile not in tiles:
+                        tiles.append(tile)
+            return tiles
+
         e = self.bbox.Emin
         n = self.bbox.Nmin
 
-        while e <= self.bbox.Emax + 1500:
-            while n <= self.bbox.Nmax:
-                url = f"https://wms.geo.admin.ch/?SERVICE=WMS&VERSION=1.3.0&REQUEST=GetFeatureInfo&QUERY_LAYERS=ch.swisstopo.swisssurface3d.metadata&LAYERS=ch.swisstopo.swisssurface3d.metadata&INFO_FORMAT=text/xml&LANG=de&I=50&J=50&CRS=EPSG%3A2056&WIDTH=101&HEIGHT=101&BBOX={e}%2C{n}%2C{e+1}%2C{n+1}" # WFS-adress
-
-                response = requests.get(url) # API-request
-
-                root = ET.fromstring(response.content) # Using elementtree to handle xml --> get important details (tilekey, temporalkey)
-                for feature_member in root.findall(
-                    ".//{http://www.opengis.net/gml}featureMember"
-                ):
-                    tilekey = feature_member.find(
-                        ".//ogr:tilekey", namespaces={"ogr": "http://ogr.maptools.org/"}
-                    ).text
-                    temporalkey = feature_member.find(
-                        ".//ogr:temporalkey",
-                        namespaces={"ogr": "http://ogr.maptools.org/"},
-                    ).text
-                    tiles.append((tilekey, temporalkey))
-                n += 1000
-            e += 1000
-            n = self.bbox.Nmin
+        with self.batch():
+            while e <= self.bbox.Emax + 1500:
+                while n <= self.bbox.Nmax:
+                    tiles += self.query_tiles(e=e, n=n)
+                    n += 1000
+                e += 1000
+                n = self.bbox.Nmin
+        return tiles
+
+    def query_tiles(self, e: float, n: float) -> list:
+        """
+        Requests the tiles at a single position.
+
+        Returns
+        -------
+        list
+            List containing [(tilekey, temporalkey)]
+        """
+        tiles = []
+
+        url = f"{self.wms_url}?SERVICE=WMS&VERSION=1.3.0&REQUEST=GetFeatureInfo&QUERY_LAYERS={self.product.metadata_layer}&LAYERS={self.product.metadata_layer}&INFO_FORMAT=text/xml&LANG=de&I=50&J=50&CRS=EPSG%3A2056&WIDTH=101&HEIGHT=101&BBOX={e}%2C{n}%2C{e+1}%2C{n+1}" # WFS-adress
+
+        cache = self.get_http_cache()
+        if cache is not None:
+            # the cached response is reused as long as the server answers 304
+            cached_path, _ = cache.fetch(url=url)
+            with open(cached_path, "rb") as f:
+                content = f.read()
+        else:
+            content = requests.get(url).content # API-request
+
+        root = ET.fromstring(content) # Using elementtree to handle xml --> get important details (tilekey, temporalkey)
+        for feature_member in root.findall(
+            ".//{http://www.opengis.net/gml}featureMember"
+        ):
+            tilekey = feature_member.find(
+                ".//ogr:tilekey", namespaces={"ogr": "http://ogr.maptools.org/"}
+            ).text
+            temporalkey = feature_member.find(
+                ".//ogr:temporalkey",
+                namespaces={"ogr": "http://ogr.maptools.org/"},
+            ).text
+            tiles.append((tilekey, temporalkey))
         return tiles
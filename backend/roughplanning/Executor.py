@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Iterator, Literal
+import math
+import multiprocessing
+import os
+
+EXECUTOR_ENV = "GNSS_PLANNER_EXECUTOR" # "serial", "thread", "process" or "forkserver"
+WORKERS_ENV = "GNSS_PLANNER_WORKERS"
+EXECUTOR_BACKENDS = ('SERIAL', 'THREAD', 'PROCESS', 'FORKSERVER')
+
+# imported once by the fork server, every worker starts with them
+FORKSERVER_PRELOAD = ["numpy", "rasterio", "backend.roughplanning.RoughPlanning", "backend.roughplanning.HorizonRaster"]
+
+MEMORY_FRACTION = 0.75 # of the available memory the worker processes may use together
+
+
+def get_cpu_count() -> int:
+    # CPUs this process may run on (taskset, cgroups), not all CPUs of the node
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_available_memory() -> int | None:
+    """
+    Returns the memory available for new processes [bytes], None if unknown.
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+@dataclass
+class Executor:
+    """
+    Runs independent tasks (e.g. the lines of a point) serially, in threads or in worker processes.
+
+    Without explicit workers the pool is sized from the CPUs available to the process and, for worker processes,
+    from the available memory: every worker process holds its own copy of the DEM (worker_memory of map), so a
+    large mosaic on a node with many cores gets fewer processes instead of running out of memory. Threads share
+    the DEM of the parent; rasterio reads and the numpy/numba kernels release the GIL.
+
+    Attributes
+    ----------
+    backend : Literal['SERIAL', 'THREAD', 'PROCESS', 'FORKSERVER'] | None
+        SERIAL runs in the calling thread, THREAD in a thread pool, PROCESS in a forked process pool and FORKSERVER
+        in processes started from a server with numpy, rasterio and the planning modules already imported (no
+        inherited threads or locks, cheap start). Default None -> environment variable GNSS_PLANNER_EXECUTOR,
+        otherwise PROCESS.
+
+    workers : int | None
+        Number of threads or processes. Default None -> environment variable GNSS_PLANNER_WORKERS, otherwise sized
+        automatically.
+
+    Methods
+    -------
+    get_workers(task_count: int, worker_memory: int) -> int:
+        Returns the number of workers used for task_count tasks.
+
+    get_chunksize(task_count: int, workers: int) -> int:
+        Returns the number of tasks sent to a worker process at once.
+
+    map(func: Callable, tasks: list, worker_memory: int) -> list:
+        Returns func(task) for all tasks, in the order of tasks.
+
+    imap_unordered(func: Callable, tasks: list, worker_memory: int) -> Iterator:
+        Yields func(task) as the tasks finish.
+    """
+    backend: Literal['SERIAL', 'THREAD', 'PROCESS', 'FORKSERVER'] | None = None
+    workers: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.backend is None:
+            self.backend = os.environ.get(EXECUTOR_ENV, "process").upper()
+        if self.backend not in EXECUTOR_BACKENDS:
+            raise AttributeError("Unsupported executor. Use 'SERIAL', 'THREAD', 'PROCESS' or 'FORKSERVER'!")
+
+        if self.workers is None and os.environ.get(WORKERS_ENV):
+            self.workers = int(os.environ[WORKERS_ENV])
+        if self.workers is not None and self.workers < 1:
+            raise ValueError("Attribute 'workers' must be positive.")
+
+    def get_workers(self, task_count: int, worker_memory: int = 0) -> int:
+        if self.backend == 'SERIAL' or task_count <= 1:
+            return 1
+        if self.workers is not None:
+            return min(self.workers, task_count)
+
+        workers = min(get_cpu_count(), task_count)
+        available = get_available_memory()
+        if self.backend in ('PROCESS', 'FORKSERVER') and worker_memory > 0 and available is not None:
+            workers = min(workers, max(1, int(available * MEMORY_FRACTION // worker_memory)))
+        return workers
+
+    def get_chunksize(self, task_count: int, workers: int) -> int:
+        # about four chunks per worker: few pickling round trips, still balanced if some tasks take longer
+        return max(1, math.ceil(task_count / (workers * 4)))
+
+    def get_pool(self, workers: int):
+        if self.backend == 'FORKSERVER':
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(FORKSERVER_PRELOAD)
+        else:
+            context = multiprocessing.get_context()
+        return context.Pool(processes=workers)
+
+    def map(self, func: Callable, tasks: list, worker_memory: int = 0) -> list:
+        workers = self.get_workers(task_count=len(tasks), worker_memory=worker_memory)
+        if workers == 1:
+            return [func(task) for task in tasks] # no pool for a single worker
+        if self.backend == 'THREAD':
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(func, tasks))
+
+        with self.get_pool(workers=workers) as pool:
+            return pool.map(func, tasks, chunksize=self.get_chunksize(task_count=len(tasks), workers=workers))
+
+    def imap_unordered(self, func: Callable, tasks: list, worker_memory: int = 0) -> Iterator:
+        workers = self.get_workers(task_count=len(tasks), worker_memory=worker_memory)
+        if workers == 1:
+            for task in tasks:
+                yield func(task)
+        elif self.backend == 'THREAD':
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in as_completed([executor.submit(func, task) for task in tasks]):
+                    yield future.result()
+        else:
+            # chunks of one task: every result is written (and the progress reported) as soon as it exists
+            with self.get_pool(workers=workers) as pool:
+                yield from pool.imap_unordered(func, tasks)
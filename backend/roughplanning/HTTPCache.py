@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+import hashlib
+import json
+import os
+import threading
+
+import requests
+
+from backend.roughplanning.helper_functions.files import open_atomic
+
+INDEX_FILE = "index.json"
+
+
+@dataclass
+class HTTPCache:
+    """
+    Bodies of GET responses kept on disk together with their validators (ETag, Last-Modified).
+
+    A cached URL is revalidated with a conditional request (If-None-Match / If-Modified-Since): the server answers
+    304 without a body if the cached copy is still current, only a 200 response is written to disk again.
+    The validator index is written after every changed response, or once at the end of a batch.
+
+    Attributes
+    ----------
+    folder : str
+        Folder of the cached bodies and the validator index (index.json).
+
+    max_workers : int
+        Number of parallel requests of fetch_all. Default 8.
+
+    Methods
+    -------
+    fetch(url: str) -> tuple[str, bool]:
+        Returns the path of the current body and True if it was (re)downloaded, False if the cached copy is still valid.
+
+    fetch_all(urls: list[str]) -> list[tuple[str, bool]]:
+        Fetches or revalidates several URLs in parallel, results in the order of urls.
+
+    batch() -> contextmanager:
+        Fetches inside the block (from any thread) only update the index in memory, it is written once at the end.
+    """
+    folder: str
+    max_workers: int = 8
+    index: dict = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        os.makedirs(self.folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.batch_depth = 0
+        self.modified = False # index changed since the last save
+
+        index_path = os.path.join(self.folder, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                self.index = json.load(f)
+
+    def get_path(self, url: str) -> str:
+        return os.path.join(self.folder, hashlib.sha1(url.encode()).hexdigest())
+
+    def fetch(self, url: str) -> tuple[str, bool]:
+        path = self.get_path(url=url)
+
+        headers = {}
+        entry = self.index.get(url)
+        if entry is not None and os.path.exists(path):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = requests.get(url, headers=headers)
+        if response.status_code == 304:
+            return (path, False)
+        response.raise_for_status()
+
+        # write to a temporary file first, parallel requests may fetch the same URL
+        with open_atomic(path) as f:
+            f.write(response.content)
+
+        with self.lock:
+            self.index[url] = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+            self.modified = True
+            if self.batch_depth == 0:
+                self.save()
+        return (path, True)
+
+    def fetch_all(self, urls: list[str]) -> list[tuple[str, bool]]:
+        with self.batch():
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(executor.map(self.fetch, urls))
+
+    @contextmanager
+    def batch(self) -> Iterator["HTTPCache"]:
+        with self.lock:
+            self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.batch_depth -= 1
+                if self.batch_depth == 0 and self.modified:
+                    self.save()
+
+    def save(self) -> None:
+        # called with self.lock held
+        index_path = os.path.join(self.folder, INDEX_FILE)
+
+        # other processes sharing the folder (e.g. workers of a node) may have added entries meanwhile
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r") as f:
+                    self.index = {**json.load(f), **self.index}
+            except ValueError:
+                pass
+
+        with open_atomic(index_path, mode="w") as f:
+            json.dump(self.index, f)
+        self.modified = False
+        return
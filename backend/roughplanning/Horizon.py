@@ -0,0 +1,292 @@
+"""
+Array kernels computing the maximal elevation angle per azimuth directly on a DEM held in memory.
+
+The samples are the same as the ones of RoughPlanning.create_lines and segment_line.
+The NUMBA kernel is used if numba is installed, otherwise the NUMPY kernel is used instead.
+Quantized DEMs (e.g. int16 centimetres) are used in their stored type, every sample is converted with
+height = value * scale + offset when it is read.
+"""
+
+from typing import Literal
+
+import numpy as np
+import rasterio
+import rasterio.transform
+
+try:
+    import numba # optional dependency
+except ImportError:
+    numba = None
+
+HAS_NUMBA = numba is not None
+
+
+def get_azimuths(number_of_lines: int) -> np.ndarray:
+    """
+    Returns number_of_lines uniformly spaced azimuths [rad], same as RoughPlanning.create_lines.
+    """
+    return np.array([2 * np.pi / number_of_lines * i for i in range(number_of_lines)])
+
+
+def get_ray_offsets(azimuths: np.ndarray, line_length: float | int, number_of_segments: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the easting and northing offset of every sample (lines x segments) from the point.
+    """
+    # same arithmetic as RoughPlanning.create_lines and segment_line
+    delta_easts = line_length * np.sin(azimuths)
+    delta_norths = line_length * np.cos(azimuths)
+    steps = np.arange(1, number_of_segments + 1)
+
+    return (delta_easts[:, None] / number_of_segments * steps, delta_norths[:, None] / number_of_segments * steps)
+
+
+def horizon_numpy(array: np.ndarray, transform: rasterio.Affine, easting: float, northing: float, gnss_height: float, azimuths: np.ndarray, line_length: float | int, number_of_segments: int, scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+    """
+    Returns the maximal elevation angle [rad] per azimuth, computed on (lines x segments) arrays.
+    """
+    easting_lines, northing_lines = get_ray_offsets(azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments)
+    rows, cols = rasterio.transform.rowcol(transform, (easting + easting_lines).ravel(), (northing + northing_lines).ravel())
+    rows = np.asarray(rows).reshape(easting_lines.shape)
+    cols = np.asarray(cols).reshape(easting_lines.shape)
+
+    if rows.min() < 0 or cols.min() < 0 or rows.max() >= array.shape[0] or cols.max() >= array.shape[1]:
+        raise EOFError(f"Expansion DEM not sufficient!{array.shape[1]} {rows.max()} {array.shape[0]} {cols.max()}")
+
+    distances = np.sqrt(easting_lines**2 + northing_lines**2)
+    alphas = np.arctan((array[rows, cols] * scale + offset - gnss_height) / distances)
+
+    return np.nanmax(alphas, axis=1)
+
+
+if HAS_NUMBA:
+    @numba.njit(parallel=True, cache=True, nogil=True)
+    def _horizon_kernel(array, scale, offset, inverse, easting, northing, gnss_height, delta_easts, delta_norths, number_of_segments, out):
+        # one pass over the samples of every ray, rays in parallel, no intermediate arrays
+        outside = 0
+        for line_idx in numba.prange(delta_easts.shape[0]):
+            max_alpha = -np.inf
+            for k in range(number_of_segments):
+                e = delta_easts[line_idx] / number_of_segments * (k + 1)
+                n = delta_norths[line_idx] / number_of_segments * (k + 1)
+                x = easting + e
+                y = northing + n
+
+                col = int(np.floor(inverse[0] * x + inverse[1] * y + inverse[2]))
+                row = int(np.floor(inverse[3] * x + inverse[4] * y + inverse[5]))
+                if row < 0 or col < 0 or row >= array.shape[0] or col >= array.shape[1]:
+                    outside += 1
+                    continue
+
+                alpha = np.arctan((array[row, col] * scale + offset - gnss_height) / np.sqrt(e**2 + n**2))
+                if alpha > max_alpha:
+                    max_alpha = alpha
+            out[line_idx] = max_alpha
+        return outside
+
+
+def horizon_numba(array: np.ndarray, transform: rasterio.Affine, easting: float, northing: float, gnss_height: float, azimuths: np.ndarray, line_length: float | int, number_of_segments: int, scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+    """
+    Returns the maximal elevation angle [rad] per azimuth, computed by the compiled kernel.
+    """
+    delta_easts = line_length * np.sin(azimuths)
+    delta_norths = line_length * np.cos(azimuths)
+    inverse = np.array(tuple(~transform)[:6], dtype=np.float64)
+
+    out = np.empty(len(azimuths))
+    outside = _horizon_kernel(array, float(scale), float(offset), inverse, float(easting), float(northing), float(gnss_height), delta_easts, delta_norths, int(number_of_segments), out)
+    if outside:
+        raise EOFError(f"Expansion DEM not sufficient! {outside} samples outside")
+
+    return out
+
+
+def horizon_heights_numpy(array: np.ndarray, transform: rasterio.Affine, easting: float, northing: float, gnss_heights: np.ndarray, azimuths: np.ndarray, line_length: float | int, number_of_segments: int, scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+    """
+    Returns the maximal elevation angle [rad] per GNSS height and azimuth (heights x lines), the terrain is sampled once for all heights.
+    """
+    easting_lines, northing_lines = get_ray_offsets(azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments)
+    rows, cols = rasterio.transform.rowcol(transform, (easting + easting_lines).ravel(), (northing + northing_lines).ravel())
+    rows = np.asarray(rows).reshape(easting_lines.shape)
+    cols = np.asarray(cols).reshape(easting_lines.shape)
+
+    if rows.min() < 0 or cols.min() < 0 or rows.max() >= array.shape[0] or cols.max() >= array.shape[1]:
+        raise EOFError(f"Expansion DEM not sufficient!{array.shape[1]} {rows.max()} {array.shape[0]} {cols.max()}")
+
+    distances = np.sqrt(easting_lines**2 + northing_lines**2)
+    terrain = array[rows, cols] * scale + offset
+
+    # only the reduction to angles differs per height
+    return np.stack([np.nanmax(np.arctan((terrain - gnss_height) / distances), axis=1) for gnss_height in gnss_heights])
+
+
+if HAS_NUMBA:
+    @numba.njit(parallel=True, cache=True, nogil=True)
+    def _horizon_heights_kernel(array, scale, offset, inverse, easting, northing, gnss_heights, delta_easts, delta_norths, number_of_segments, out):
+        # like _horizon_kernel, every sample is read once and reduced for all heights
+        outside = 0
+        for line_idx in numba.prange(delta_easts.shape[0]):
+            for height_idx in range(gnss_heights.shape[0]):
+                out[height_idx, line_idx] = -np.inf
+            for k in range(number_of_segments):
+                e = delta_easts[line_idx] / number_of_segments * (k + 1)
+                n = delta_norths[line_idx] / number_of_segments * (k + 1)
+                x = easting + e
+                y = northing + n
+
+                col = int(np.floor(inverse[0] * x + inverse[1] * y + inverse[2]))
+                row = int(np.floor(inverse[3] * x + inverse[4] * y + inverse[5]))
+                if row < 0 or col < 0 or row >= array.shape[0] or col >= array.shape[1]:
+                    outside += 1
+                    continue
+
+                terrain = array[row, col] * scale + offset
+                distance = np.sqrt(e**2 + n**2)
+                for height_idx in range(gnss_heights.shape[0]):
+                    alpha = np.arctan((terrain - gnss_heights[height_idx]) / distance)
+                    if alpha > out[height_idx, line_idx]:
+                        out[height_idx, line_idx] = alpha
+        return outside
+
+
+def horizon_heights_numba(array: np.ndarray, transform: rasterio.Affine, easting: float, northing: float, gnss_heights: np.ndarray, azimuths: np.ndarray, line_length: float | int, number_of_segments: int, scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+    """
+    Returns the maximal elevation angle [rad] per GNSS height and azimuth (heights x lines), computed by the compiled kernel.
+    """
+    delta_easts = line_length * np.sin(azimuths)
+    delta_norths = line_length * np.cos(azimuths)
+    inverse = np.array(tuple(~transform)[:6], dtype=np.float64)
+
+    out = np.empty((len(gnss_heights), len(azimuths)))
+    outside = _horizon_heights_kernel(array, float(scale), float(offset), inverse, float(easting), float(northing), np.asarray(gnss_heights, dtype=np.float64), delta_easts, delta_norths, int(number_of_segments), out)
+    if outside:
+        raise EOFError(f"Expansion DEM not sufficient! {outside} samples outside")
+
+    return out
+
+
+def max_elevation_angles(array: np.ndarray, transform: rasterio.Affine, easting: float, northing: float, gnss_height: float, number_of_lines: int, line_length: float | int, number_of_segments: int, kernel: Literal['NUMPY', 'NUMBA'] = 'NUMBA', azimuths: np.ndarray | None = None, scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+    """
+    Returns the maximal elevation angle [rad] per azimuth with the selected kernel, NUMBA falls back to NUMPY if numba is not installed.
+    The azimuths [rad] default to number_of_lines uniformly spaced ones.
+    """
+    if azimuths is None:
+        azimuths = get_azimuths(number_of_lines=number_of_lines)
+
+    if kernel == 'NUMBA' and HAS_NUMBA:
+        return horizon_numba(array=array, transform=transform, easting=easting, northing=northing, gnss_height=gnss_height, azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments, scale=scale, offset=offset)
+    if kernel in ('NUMBA', 'NUMPY'):
+        return horizon_numpy(array=array, transform=transform, easting=easting, northing=northing, gnss_height=gnss_height, azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments, scale=scale, offset=offset)
+
+    raise AttributeError("Unsupported kernel. Use 'NUMPY' or 'NUMBA'!")
+
+
+def start_numba_threads() -> None:
+    """
+    Starts the worker threads of the parallel numba kernels from the calling thread. Started from a helper thread
+    first (e.g. a thread pool), the TBB threading layer keeps the interpreter from exiting, so this is called on the
+    main thread before kernels run in threads.
+    """
+    if HAS_NUMBA:
+        horizon_numba(array=np.zeros((4, 4), dtype=np.float32), transform=rasterio.Affine(1, 0, 0, 0, -1, 4), easting=2.0, northing=2.0, gnss_height=1.0, azimuths=get_azimuths(number_of_lines=4), line_length=1, number_of_segments=1)
+    return
+
+
+def max_elevation_angles_heights(array: np.ndarray, transform: rasterio.Affine, easting: float, northing: float, gnss_heights: list[float] | np.ndarray, azimuths: np.ndarray, line_length: float | int, number_of_segments: int, kernel: Literal['NUMPY', 'NUMBA'] = 'NUMBA', scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+    """
+    Returns the maximal elevation angle [rad] per GNSS height and azimuth (heights x lines) from one traversal of the DEM,
+    NUMBA falls back to NUMPY if numba is not installed.
+    """
+    gnss_heights = np.asarray(gnss_heights, dtype=np.float64)
+
+    if kernel == 'NUMBA' and HAS_NUMBA:
+        return horizon_heights_numba(array=array, transform=transform, easting=easting, northing=northing, gnss_heights=gnss_heights, azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments, scale=scale, offset=offset)
+    if kernel in ('NUMBA', 'NUMPY'):
+        return horizon_heights_numpy(array=array, transform=transform, easting=easting, northing=northing, gnss_heights=gnss_heights, azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments, scale=scale, offset=offset)
+
+    raise AttributeError("Unsupported kernel. Use 'NUMPY' or 'NUMBA'!")
+
+
+def horizon_points_numpy(array: np.ndarray, transform: rasterio.Affine, eastings: np.ndarray, northings: np.ndarray, gnss_heights: np.ndarray, azimuths: np.ndarray, line_length: float | int, number_of_segments: int, scale: float = 1.0, offset: float = 0.0, batch_size: int = 16) -> np.ndarray:
+    """
+    Returns the maximal elevation angle [rad] per point and azimuth (points x lines). The ray offsets and distances
+    are shared by all points, the points are processed in batches to bound the memory use.
+    """
+    easting_lines, northing_lines = get_ray_offsets(azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments)
+    distances = np.sqrt(easting_lines**2 + northing_lines**2)
+
+    out = np.empty((len(eastings), len(azimuths)))
+    for start in range(0, len(eastings), batch_size):
+        batch = slice(start, start + batch_size)
+        rows, cols = rasterio.transform.rowcol(transform, (eastings[batch, None, None] + easting_lines).ravel(), (northings[batch, None, None] + northing_lines).ravel())
+        rows = np.asarray(rows).reshape((-1,) + easting_lines.shape)
+        cols = np.asarray(cols).reshape((-1,) + easting_lines.shape)
+
+        if rows.min() < 0 or cols.min() < 0 or rows.max() >= array.shape[0] or cols.max() >= array.shape[1]:
+            raise EOFError(f"Expansion DEM not sufficient!{array.shape[1]} {rows.max()} {array.shape[0]} {cols.max()}")
+
+        alphas = np.arctan((array[rows, cols] * scale + offset - gnss_heights[batch, None, None]) / distances)
+        out[batch] = np.nanmax(alphas, axis=2)
+
+    return out
+
+
+if HAS_NUMBA:
+    @numba.njit(parallel=True, cache=True, nogil=True)
+    def _horizon_points_kernel(array, scale, offset, inverse, eastings, northings, gnss_heights, delta_easts, delta_norths, number_of_segments, out):
+        # all (point, line) rays in parallel, same samples as _horizon_kernel
+        outside = 0
+        number_of_lines = delta_easts.shape[0]
+        for ray_idx in numba.prange(eastings.shape[0] * number_of_lines):
+            point_idx = ray_idx // number_of_lines
+            line_idx = ray_idx % number_of_lines
+            max_alpha = -np.inf
+            for k in range(number_of_segments):
+                e = delta_easts[line_idx] / number_of_segments * (k + 1)
+                n = delta_norths[line_idx] / number_of_segments * (k + 1)
+                x = eastings[point_idx] + e
+                y = northings[point_idx] + n
+
+                col = int(np.floor(inverse[0] * x + inverse[1] * y + inverse[2]))
+                row = int(np.floor(inverse[3] * x + inverse[4] * y + inverse[5]))
+                if row < 0 or col < 0 or row >= array.shape[0] or col >= array.shape[1]:
+                    outside += 1
+                    continue
+
+                alpha = np.arctan((array[row, col] * scale + offset - gnss_heights[point_idx]) / np.sqrt(e**2 + n**2))
+                if alpha > max_alpha:
+                    max_alpha = alpha
+            out[point_idx, line_idx] = max_alpha
+        return outside
+
+
+def horizon_points_numba(array: np.ndarray, transform: rasterio.Affine, eastings: np.ndarray, northings: np.ndarray, gnss_heights: np.ndarray, azimuths: np.ndarray, line_length: float | int, number_of_segments: int, scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+    """
+    Returns the maximal elevation angle [rad] per point and azimuth (points x lines), computed by the compiled kernel.
+    """
+    delta_easts = line_length * np.sin(azimuths)
+    delta_norths = line_length * np.cos(azimuths)
+    inverse = np.array(tuple(~transform)[:6], dtype=np.float64)
+
+    out = np.empty((len(eastings), len(azimuths)))
+    outside = _horizon_points_kernel(array, float(scale), float(offset), inverse, np.asarray(eastings, dtype=np.float64), np.asarray(northings, dtype=np.float64), np.asarray(gnss_heights, dtype=np.float64), delta_easts, delta_norths, int(number_of_segments), out)
+    if outside:
+        raise EOFError(f"Expansion DEM not sufficient! {outside} samples outside")
+
+    return out
+
+
+def max_elevation_angles_points(array: np.ndarray, transform: rasterio.Affine, eastings: np.ndarray, northings: np.ndarray, gnss_heights: np.ndarray, azimuths: np.ndarray, line_length: float | int, number_of_segments: int, kernel: Literal['NUMPY', 'NUMBA'] = 'NUMBA', scale: float = 1.0, offset: float = 0.0) -> np.ndarray:
+    """
+    Returns the maximal elevation angle [rad] per point and azimuth (points x lines) for many points at once,
+    NUMBA falls back to NUMPY if numba is not installed.
+    """
+    eastings = np.asarray(eastings, dtype=np.float64)
+    northings = np.asarray(northings, dtype=np.float64)
+    gnss_heights = np.asarray(gnss_heights, dtype=np.float64)
+
+    if kernel == 'NUMBA' and HAS_NUMBA:
+        return horizon_points_numba(array=array, transform=transform, eastings=eastings, northings=northings, gnss_heights=gnss_heights, azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments, scale=scale, offset=offset)
+    if kernel in ('NUMBA', 'NUMPY'):
+        return horizon_points_numpy(array=array, transform=transform, eastings=eastings, northings=northings, gnss_heights=gnss_heights, azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments, scale=scale, offset=offset)
+
+    raise AttributeError("Unsupported kernel. Use 'NUMPY' or 'NUMBA'!")
@@ -0,0 +1,122 @@
+from dataclasses import dataclass, field
+import json
+import os
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.SpatialIndex import DiskTileSelector
+
+HORIZON_CACHE_VERSION = 2
+FAR_TILE_PREFIX = "far:" # tile versions of the coarse model beyond the near radius, e.g. "far:2600_1200"
+
+
+def get_point_record(point: GNSS_Point) -> list[float]:
+    return [point.easting, point.northing, point.floor_height, point.antenna_height]
+
+
+def create_entry(point: GNSS_Point, azimuths: list, elevation_angles: list, horizons_per_height: dict | None = None) -> dict:
+    """
+    Returns the JSON record of a planned point (horizon and the horizons of additional antenna heights) [gon].
+    """
+    return {
+        "point": get_point_record(point=point),
+        "azimuths": [float(azimuth) for azimuth in azimuths],
+        "elevation_angles": [float(angle) for angle in elevation_angles],
+        "heights": {f"{height:g}": [[float(azimuth) for azimuth in height_azimuths], [float(angle) for angle in height_angles]] for height, (height_azimuths, height_angles) in (horizons_per_height or {}).items()},
+    }
+
+
+def read_heights(entry: dict) -> dict[float, tuple[list, list]]:
+    return {float(height): tuple(horizon) for height, horizon in entry["heights"].items()}
+
+
+@dataclass
+class HorizonCache:
+    """
+    Horizons of planned points together with the versions of the DEM tiles they were computed from.
+
+    Every entry records the temporalkey of each tile intersecting the analysis disk of the point, and with a near
+    radius also those of the coarse model tiles sampled beyond it. An entry stays valid as long as the point, the
+    planning parameters and all these tile versions are unchanged, so a republished tile only invalidates the points
+    whose disk intersects it.
+
+    Attributes
+    ----------
+    path : str
+        JSON file of the cache (e.g. results/horizon_cache.json).
+
+    radius : float | int
+        Radius of the analysis disk whose tiles are recorded [Meters].
+
+    far_radius : float | int | None
+        Radius of the disk whose coarse model tiles (FAR_TILE_PREFIX + tilekey) are recorded too, None without a
+        coarse model. Default None.
+
+    Methods
+    -------
+    get(point: GNSS_Point, parameters: dict, tile_versions: dict[str, str]) -> dict | None:
+        Returns the cached entry of the point if it is still valid.
+
+    put(point: GNSS_Point, parameters: dict, tile_versions: dict[str, str], azimuths: list, elevation_angles: list, horizons_per_height: dict | None) -> bool:
+        Stores the horizon of a point, False if the version of a tile of its disk is unknown.
+
+    save() -> None:
+        Writes the cache to path.
+    """
+    path: str
+    radius: float | int
+    far_radius: float | int | None = None
+    entries: dict = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                content = json.load(f)
+            # caches of another format version are discarded
+            if content.get("version") == HORIZON_CACHE_VERSION:
+                self.entries = content["points"]
+
+    def get_tile_keys(self, point: GNSS_Point) -> list[str]:
+        tile_keys = DiskTileSelector(points=[point], radius=self.radius).get_tile_keys()
+        if self.far_radius is not None:
+            tile_keys += [FAR_TILE_PREFIX + tile_key for tile_key in DiskTileSelector(points=[point], radius=self.far_radius).get_tile_keys()]
+        return tile_keys
+
+    def get(self, point: GNSS_Point, parameters: dict, tile_versions: dict[str, str]) -> dict | None:
+        entry = self.entries.get(point.name)
+        if entry is None or entry["point"] != get_point_record(point=point):
+            return None
+
+        # round trip through JSON, e.g. tuples become lists like in the stored entry
+        if entry["parameters"] != json.loads(json.dumps(parameters)):
+            return None
+
+        for tile_key, temporalkey in entry["tiles"].items():
+            if tile_versions.get(tile_key) != temporalkey:
+                return None # republished (or unknown) tile in the analysis disk
+        return entry
+
+    def put(self, point: GNSS_Point, parameters: dict, tile_versions: dict[str, str], azimuths: list, elevation_angles: list, horizons_per_height: dict | None = None) -> bool:
+        tiles = {}
+        for tile_key in self.get_tile_keys(point=point):
+            if tile_key not in tile_versions:
+                self.entries.pop(point.name, None)
+                return False
+            tiles[tile_key] = tile_versions[tile_key]
+
+        self.entries[point.name] = {**create_entry(point=point, azimuths=azimuths, elevation_angles=elevation_angles, horizons_per_height=horizons_per_height), "parameters": json.loads(json.dumps(parameters)), "tiles": tiles}
+        return True
+
+    def save(self) -> None:
+        with open(self.path, "w") as f:
+            json.dump({"version": HORIZON_CACHE_VERSION, "points": self.entries}, f)
+        return
+
+
+def read_tile_versions(path: str) -> dict[str, str]:
+    """
+    Returns the temporalkey per tilekey recorded by the last DEM download, empty if there is none.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
@@ -0,0 +1,297 @@
+from dataclasses import dataclass, field
+from typing import Callable, Literal
+import json
+import math
+import os
+
+import numpy as np
+import rasterio
+
+from backend.roughplanning.DEM import RasterDEM
+from backend.roughplanning.Horizon import get_azimuths, max_elevation_angles_heights, start_numba_threads
+from backend.roughplanning.Executor import Executor
+
+HORIZON_RASTER_VERSION = 1
+
+METADATA_FILE = "horizon.json"
+HORIZON_FILE = "horizon.npy" # (rows x cols x height_offsets x lines) elevation angles [gon], float32
+GROUND_FILE = "ground.npy" # (rows x cols) terrain height at the grid nodes [Meters], float32
+DONE_FILE = "done.npy" # (chunk rows x chunk cols) finished chunks, makes the precomputation resumable
+
+
+def compute_chunk(args) -> tuple[tuple[int, int], np.ndarray, np.ndarray]:
+    """
+    Computes the horizons of all grid nodes of a chunk, executed in the worker processes.
+    """
+    dem_path, chunk, eastings, northings, azimuths, line_length, number_of_segments, height_offsets, kernel = args
+    dem = RasterDEM(path=dem_path)
+    array, transform = dem.get_array()
+    scale, offset = dem.get_scale_offset()
+
+    ground = dem.sample(eastings=eastings, northings=northings)
+    angles = np.empty((len(eastings), len(height_offsets), len(azimuths)), dtype=np.float32)
+    for node_idx, (easting, northing, ground_height) in enumerate(zip(eastings, northings, ground)):
+        # all height offsets of a node in one traversal of the DEM
+        max_alphas = max_elevation_angles_heights(array=array, transform=transform, easting=easting, northing=northing, gnss_heights=ground_height + np.asarray(height_offsets), azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments, kernel=kernel, scale=scale, offset=offset)
+        angles[node_idx] = max_alphas * 200 / np.pi
+
+    return (chunk, ground.astype(np.float32), angles)
+
+
+@dataclass
+class HorizonRasterBuilder:
+    """
+    Precomputes the horizon of every node of a regular grid over a DEM for instant point queries.
+
+    The grid covers the DEM shrunk by line_length, so every profile line stays inside the DEM. For every node the
+    horizon is stored for several heights above the terrain, queries interpolate between them. The nodes are
+    processed in chunks by an Executor and written to memory-mapped arrays. Finished chunks are recorded,
+    so an interrupted precomputation continues where it stopped when build() is called again.
+
+    Attributes
+    ----------
+    dem_path : str
+        Path to the DEM (e.g. raster.tif).
+
+    folder : str
+        Output folder of the horizon raster.
+
+    spacing : float
+        Distance between two grid nodes [Meters]. Default 10.
+
+    number_of_lines : int
+        Number of azimuths. Default 64.
+
+    line_length : float | int
+        Analysis distance [Meters]. Default 500.
+
+    segment_resolution : float
+        Distance between two samples on a line [Meters]. Default 1.
+
+    height_offsets : list[float]
+        Heights of the GNSS above the terrain [Meters], ascending. Default [0, 2, 5].
+
+    chunk_size : int
+        Edge length of a chunk in grid nodes. Default 16.
+
+    kernel : Literal['NUMPY', 'NUMBA']
+        Kernel of Horizon used per node. Default NUMBA (falls back to NUMPY).
+
+    processes : int | None
+        Number of workers. Default None -> sized from the CPUs and, for worker processes, the memory of the DEM.
+
+    executor : Literal['SERIAL', 'THREAD', 'PROCESS', 'FORKSERVER'] | None
+        Backend of the Executor running the chunks. Default None -> GNSS_PLANNER_EXECUTOR, processes otherwise.
+
+    Methods
+    -------
+    build(progress: Callable[[int, str], None] | None = None) -> None:
+        Computes all missing chunks.
+    """
+    dem_path: str
+    folder: str
+    spacing: float = 10.0
+    number_of_lines: int = 64
+    line_length: float | int = 500
+    segment_resolution: float = 1.0
+    height_offsets: list[float] = field(default_factory=lambda: [0.0, 2.0, 5.0])
+    chunk_size: int = 16
+    kernel: Literal['NUMPY', 'NUMBA'] = 'NUMBA'
+    processes: int | None = None
+    executor: Literal['SERIAL', 'THREAD', 'PROCESS', 'FORKSERVER'] | None = None
+
+    def get_metadata(self) -> dict:
+        with rasterio.open(self.dem_path) as src:
+            bounds = src.bounds
+            pix_size = src.transform[0]
+
+        # nodes at least line_length (+ one pixel) inside the DEM
+        inset = self.line_length + pix_size
+        width = bounds.right - bounds.left - 2 * inset
+        height = bounds.top - bounds.bottom - 2 * inset
+        if width < 0 or height < 0:
+            raise ValueError(f"DEM zu klein für eine Analysedistanz von {self.line_length} m!")
+
+        number_of_segments = int(self.line_length / self.segment_resolution)
+        # if segmentsize is smaller than the actual width of a cell -> segmentsize will be overwritten with cell size
+        if self.line_length / pix_size < number_of_segments:
+            number_of_segments = int(self.line_length / pix_size)
+
+        return {
+            "version": HORIZON_RASTER_VERSION,
+            "dem": os.path.abspath(self.dem_path),
+            "dem_mtime": os.path.getmtime(self.dem_path),
+            "origin_easting": bounds.left + inset,
+            "origin_northing": bounds.bottom + inset,
+            "spacing": self.spacing,
+            "cols": int(width // self.spacing) + 1,
+            "rows": int(height // self.spacing) + 1,
+            "chunk_size": self.chunk_size,
+            "azimuths": [400 / self.number_of_lines * i for i in range(self.number_of_lines)],
+            "line_length": self.line_length,
+            "number_of_segments": number_of_segments,
+            "height_offsets": sorted(self.height_offsets),
+        }
+
+    def build(self, progress: Callable[[int, str], None] | None = None) -> None:
+        metadata = self.get_metadata()
+        rows, cols = metadata["rows"], metadata["cols"]
+        number_of_offsets, number_of_lines = len(metadata["height_offsets"]), len(metadata["azimuths"])
+        chunk_rows, chunk_cols = math.ceil(rows / self.chunk_size), math.ceil(cols / self.chunk_size)
+        metadata_path = os.path.join(self.folder, METADATA_FILE)
+
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                if json.load(f) != metadata:
+                    raise ValueError(f"{self.folder} enthält einen Horizont mit anderen Parametern oder einem anderen DEM!")
+            horizon = np.load(os.path.join(self.folder, HORIZON_FILE), mmap_mode='r+')
+            ground = np.load(os.path.join(self.folder, GROUND_FILE), mmap_mode='r+')
+            done = np.load(os.path.join(self.folder, DONE_FILE), mmap_mode='r+')
+        else:
+            os.makedirs(self.folder, exist_ok=True)
+            horizon = np.lib.format.open_memmap(os.path.join(self.folder, HORIZON_FILE), mode='w+', dtype=np.float32, shape=(rows, cols, number_of_offsets, number_of_lines))
+            ground = np.lib.format.open_memmap(os.path.join(self.folder, GROUND_FILE), mode='w+', dtype=np.float32, shape=(rows, cols))
+            done = np.lib.format.open_memmap(os.path.join(self.folder, DONE_FILE), mode='w+', dtype=bool, shape=(chunk_rows, chunk_cols))
+            done[:] = False
+            done.flush()
+            # metadata last -> a folder without it is rebuilt from scratch
+            with open(metadata_path, "w") as f:
+                json.dump(metadata, f, indent=2)
+
+        azimuths = get_azimuths(number_of_lines=number_of_lines)
+        args = []
+        for chunk_row, chunk_col in zip(*np.nonzero(~np.asarray(done))):
+            row_idx = np.arange(chunk_row * self.chunk_size, min((chunk_row + 1) * self.chunk_size, rows))
+            col_idx = np.arange(chunk_col * self.chunk_size, min((chunk_col + 1) * self.chunk_size, cols))
+            node_rows, node_cols = np.meshgrid(row_idx, col_idx, indexing='ij')
+            eastings = metadata["origin_easting"] + node_cols.ravel() * self.spacing
+            northings = metadata["origin_northing"] + node_rows.ravel() * self.spacing
+            args.append((self.dem_path, (int(chunk_row), int(chunk_col)), eastings, northings, azimuths, self.line_length, metadata["number_of_segments"], metadata["height_offsets"], self.kernel))
+
+        total = done.size
+        finished = total - len(args)
+        executor = Executor(backend=self.executor, workers=self.processes)
+        if executor.backend == 'THREAD' and self.kernel == 'NUMBA':
+            start_numba_threads()
+        for (chunk_row, chunk_col), chunk_ground, chunk_angles in executor.imap_unordered(compute_chunk, args, worker_memory=RasterDEM(path=self.dem_path).get_memory_size()):
+            row_slice = slice(chunk_row * self.chunk_size, min((chunk_row + 1) * self.chunk_size, rows))
+            col_slice = slice(chunk_col * self.chunk_size, min((chunk_col + 1) * self.chunk_size, cols))
+            shape = (row_slice.stop - row_slice.start, col_slice.stop - col_slice.start)
+            horizon[row_slice, col_slice] = chunk_angles.reshape(shape + (number_of_offsets, number_of_lines))
+            ground[row_slice, col_slice] = chunk_ground.reshape(shape)
+
+            # data on disk before the chunk is marked as done
+            horizon.flush()
+            ground.flush()
+            done[chunk_row, chunk_col] = True
+            done.flush()
+
+            finished += 1
+            if progress is not None:
+                progress(int(finished / total * 100), f"{finished} / {total} Horizont-Kacheln berechnet")
+        return
+
+
+@dataclass
+class HorizonRaster:
+    """
+    Answers horizon queries from a precomputed horizon raster (see HorizonRasterBuilder).
+
+    The horizon of a point is interpolated bilinearly between the four surrounding grid nodes and linearly between
+    the stored heights above the terrain (clamped to the stored range). The arrays are memory-mapped and not pickled.
+
+    Attributes
+    ----------
+    folder : str
+        Folder written by HorizonRasterBuilder.
+
+    Methods
+    -------
+    contains(easting: float, northing: float) -> bool:
+        True if the four surrounding grid nodes are computed.
+
+    matches(number_of_lines: int, line_length: float | int, number_of_segments: int) -> bool:
+        True if the raster was built with these parameters.
+
+    lookup(easting: float, northing: float, gnss_height: float) -> tuple[list, list]:
+        Returns (azimuths, elevation_angles) in gon.
+    """
+    folder: str
+    _metadata: dict | None = field(default=None, init=False, repr=False)
+    _horizon: np.ndarray | None = field(default=None, init=False, repr=False)
+    _ground: np.ndarray | None = field(default=None, init=False, repr=False)
+    _done: np.ndarray | None = field(default=None, init=False, repr=False)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['_horizon'] = None
+        state['_ground'] = None
+        state['_done'] = None
+        return state
+
+    def open(self) -> None:
+        if self._horizon is None:
+            metadata_path = os.path.join(self.folder, METADATA_FILE)
+            if not os.path.exists(metadata_path):
+                raise FileNotFoundError(f"Kein Horizont-Raster in {self.folder} gefunden!")
+            with open(metadata_path) as f:
+                self._metadata = json.load(f)
+            self._horizon = np.load(os.path.join(self.folder, HORIZON_FILE), mmap_mode='r')
+            self._ground = np.load(os.path.join(self.folder, GROUND_FILE), mmap_mode='r')
+            self._done = np.load(os.path.join(self.folder, DONE_FILE), mmap_mode='r')
+        return
+
+    def get_metadata(self) -> dict:
+        self.open()
+        return self._metadata
+
+    def get_cell(self, easting: float, northing: float) -> tuple[int, int, float, float]:
+        """
+        Returns the lower left grid node (row, col) of the cell containing the point and the position inside the cell (0-1).
+        """
+        metadata = self.get_metadata()
+        x = (easting - metadata["origin_easting"]) / metadata["spacing"]
+        y = (northing - metadata["origin_northing"]) / metadata["spacing"]
+
+        # points on the last row/column belong to the cell below/left
+        col = min(int(np.floor(x)), metadata["cols"] - 2)
+        row = min(int(np.floor(y)), metadata["rows"] - 2)
+        return (row, col, x - col, y - row)
+
+    def contains(self, easting: float, northing: float) -> bool:
+        metadata = self.get_metadata()
+        if metadata["rows"] < 2 or metadata["cols"] < 2:
+            return False
+
+        row, col, dx, dy = self.get_cell(easting=easting, northing=northing)
+        if row < 0 or col < 0 or dx > 1 or dy > 1:
+            return False
+
+        chunk_size = metadata["chunk_size"]
+        return bool(all(self._done[node_row // chunk_size, node_col // chunk_size] for node_row in (row, row + 1) for node_col in (col, col + 1)))
+
+    def matches(self, number_of_lines: int, line_length: float | int, number_of_segments: int) -> bool:
+        # a raster built for another distance or fan answers with the wrong reach and azimuths
+        metadata = self.get_metadata()
+        return len(metadata["azimuths"]) == int(number_of_lines) and float(metadata["line_length"]) == float(line_length) and metadata["number_of_segments"] == int(number_of_segments)
+
+    def lookup(self, easting: float, northing: float, gnss_height: float) -> tuple[list, list]:
+        if not self.contains(easting=easting, northing=northing):
+            raise EOFError(f"Punkt {easting} / {northing} liegt ausserhalb des Horizont-Rasters!")
+
+        metadata = self.get_metadata()
+        height_offsets = np.asarray(metadata["height_offsets"])
+        row, col, dx, dy = self.get_cell(easting=easting, northing=northing)
+
+        elevation_angles = np.zeros(len(metadata["azimuths"]))
+        for node_row, node_col, weight in ((row, col, (1 - dx) * (1 - dy)), (row, col + 1, dx * (1 - dy)), (row + 1, col, (1 - dx) * dy), (row + 1, col + 1, dx * dy)):
+            # height of the GNSS above the terrain of the node, interpolated between the stored offsets
+            offset_idx = np.interp(gnss_height - self._ground[node_row, node_col], height_offsets, np.arange(len(height_offsets)))
+            lower = min(int(offset_idx), len(height_offsets) - 2) if len(height_offsets) > 1 else 0
+            fraction = offset_idx - lower
+            node_angles = self._horizon[node_row, node_col, lower].astype(np.float64)
+            if len(height_offsets) > 1:
+                node_angles = (1 - fraction) * node_angles + fraction * self._horizon[node_row, node_col, lower + 1]
+            elevation_angles += weight * node_angles
+
+        return (list(metadata["azimuths"]), list(elevation_angles))
@@ -0,0 +1,308 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import time
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.SpatialIndex import DiskTileSelector
+from backend.roughplanning.Downloader import WMS_URL, DATA_URL
+from backend.roughplanning.DEM import LazyTileDEM
+from backend.roughplanning.Merger import RasterMerger
+from backend.roughplanning.RoughPlanning import RoughPlanning
+from backend.roughplanning.HorizonCache import create_entry
+
+if TYPE_CHECKING:
+    from backend.roughplanning.Pipeline import PlanningSettings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    points TEXT NOT NULL,
+    tiles TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS results (name TEXT PRIMARY KEY, job_id INTEGER NOT NULL, entry TEXT NOT NULL);
+"""
+
+
+def create_jobs(points: list[GNSS_Point], radius: float | int, batch_size: int = 16) -> list[tuple[list[GNSS_Point], list[str]]]:
+    """
+    Splits points into batches of neighbouring points and returns them with the tilekeys of their analysis disks.
+    """
+    if batch_size < 1:
+        raise ValueError("Attribute 'batch_size' must be positive.")
+
+    # points of the same tile end up in the same batch, so a worker merges few tiles per job
+    ordered = sorted(points, key=lambda point: (int(point.easting // 1000), int(point.northing // 1000), point.easting, point.northing))
+    jobs = []
+    for first in range(0, len(ordered), batch_size):
+        batch = ordered[first:first + batch_size]
+        jobs.append((batch, sorted(DiskTileSelector(points=batch, radius=radius).get_tile_keys())))
+    return jobs
+
+
+@dataclass
+class Job:
+    """
+    Points claimed by a worker.
+
+    Attributes
+    ----------
+    id : int
+        Row of the job in the queue.
+
+    points : list[GNSS_Point]
+        Points to plan.
+
+    tiles : list[str]
+        Tilekeys of the analysis disks of the points.
+    """
+    id: int
+    points: list[GNSS_Point]
+    tiles: list[str]
+
+
+@dataclass
+class JobQueue:
+    """
+    Queue of planning jobs in a SQLite file, shared by a coordinator and any number of workers.
+
+    The coordinator submits the points of a session as jobs. A worker claims a job together with a lease, renews
+    the lease while it plans and commits the horizons in one transaction. A job whose lease expired (worker
+    crashed or node lost) is claimed again by another worker. Committing is idempotent: horizons are stored per
+    point name and a job already done is not changed, so a late commit of a presumed dead worker does no harm.
+    For several nodes the file has to lie on a shared filesystem with working file locks, and the clocks of the
+    nodes have to be synchronized (leases are absolute times).
+
+    Attributes
+    ----------
+    path : str
+        SQLite file of the queue.
+
+    max_attempts : int
+        A job failing this often, or whose lease expired after this many claims, is marked as failed instead of
+        being claimed again. Default 3.
+
+    Methods
+    -------
+    submit(points: list[GNSS_Point], parameters: dict, radius: float | int, batch_size: int) -> int:
+        Creates the jobs of a session and returns their number. The queue has to be empty.
+
+    claim(worker: str, lease_seconds: float) -> Job | None:
+        Leases the next pending (or expired) job, None if there is none.
+
+    expire_leases(now: float) -> None:
+        Marks jobs whose lease expired after their last attempt as failed.
+
+    renew(job_id: int, worker: str, lease_seconds: float) -> bool:
+        Extends the lease, False if the job was taken over by another worker.
+
+    complete(job_id: int, horizons: dict[str, dict]) -> bool:
+        Stores the horizons of a job, False if it was already completed.
+
+    fail(job_id: int, worker: str, error: str) -> None:
+        Releases a job after an error.
+
+    get_parameters() -> dict:
+        Returns the planning parameters of the submitted session.
+
+    get_progress() -> dict[str, int]:
+        Returns the number of jobs per state (pending, leased, done, failed).
+
+    get_horizons() -> dict[str, tuple[list, list]]:
+        Returns (azimuths, elevation_angles) in gon per planned point name.
+    """
+    path: str
+    max_attempts: int = 3
+
+    def __post_init__(self) -> None:
+        # connection per process, writers wait for each other instead of failing
+        self.connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.connection.executescript(SCHEMA)
+
+    def transaction(self) -> sqlite3.Connection:
+        # takes the write lock at the start, a claim reads and updates the job without interference
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def submit(self, points: list[GNSS_Point], parameters: dict, radius: float | int, batch_size: int = 16) -> int:
+        jobs = create_jobs(points=points, radius=radius, batch_size=batch_size)
+        connection = self.transaction()
+        try:
+            if connection.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]:
+                raise ValueError("Die Warteschlange enthält bereits Aufträge!")
+            connection.execute("INSERT INTO meta (key, value) VALUES ('parameters', ?)", (json.dumps(parameters),))
+            connection.executemany("INSERT INTO jobs (points, tiles) VALUES (?, ?)", [(json.dumps([[point.name, point.easting, point.northing, point.floor_height, point.antenna_height] for point in batch]), json.dumps(tiles)) for batch, tiles in jobs])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return len(jobs)
+
+    def claim(self, worker: str, lease_seconds: float = 300) -> Job | None:
+        now = time.time()
+        connection = self.transaction()
+        try:
+            self.expire_leases(now=now)
+            row = connection.execute("SELECT id, points, tiles FROM jobs WHERE (state = 'pending' OR (state = 'leased' AND lease_until < ?)) AND attempts < ? ORDER BY id LIMIT 1", (now, self.max_attempts)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE jobs SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?", (worker, now + lease_seconds, row[0]))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        points = [GNSS_Point(name=name, easting=easting, northing=northing, floor_height=floor_height, antenna_height=antenna_height) for name, easting, northing, floor_height, antenna_height in json.loads(row[1])]
+        return Job(id=row[0], points=points, tiles=json.loads(row[2]))
+
+    def expire_leases(self, now: float) -> None:
+        # the worker died without fail(), after the last attempt the job is given up instead of staying leased forever
+        self.connection.execute("UPDATE jobs SET state = 'failed', lease_until = NULL, error = 'Lease von ' || worker || ' nach ' || attempts || ' Versuchen abgelaufen' WHERE state = 'leased' AND lease_until < ? AND attempts >= ?", (now, self.max_attempts))
+        return
+
+    def renew(self, job_id: int, worker: str, lease_seconds: float = 300) -> bool:
+        cursor = self.connection.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND state = 'leased' AND worker = ?", (time.time() + lease_seconds, job_id, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, horizons: dict[str, dict]) -> bool:
+        connection = self.transaction()
+        try:
+            if connection.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] == 'done':
+                connection.execute("COMMIT")
+                return False # committed by another worker, same points and parameters -> same horizons
+            connection.executemany("INSERT OR REPLACE INTO results (name, job_id, entry) VALUES (?, ?, ?)", [(name, job_id, json.dumps(entry)) for name, entry in horizons.items()])
+            connection.execute("UPDATE jobs SET state = 'done', lease_until = NULL, error = NULL WHERE id = ?", (job_id,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return True
+
+    def fail(self, job_id: int, worker: str, error: str) -> None:
+        self.connection.execute("UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, lease_until = NULL, error = ? WHERE id = ? AND state = 'leased' AND worker = ?", (self.max_attempts, error, job_id, worker))
+        return
+
+    def get_parameters(self) -> dict:
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'parameters'").fetchone()
+        if row is None:
+            raise ValueError("Die Warteschlange enthält keine Aufträge!")
+        return json.loads(row[0])
+
+    def get_progress(self) -> dict[str, int]:
+        progress = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        now = time.time()
+        self.expire_leases(now=now)
+        for state, lease_until in self.connection.execute("SELECT state, lease_until FROM jobs"):
+            # an expired lease is pending again
+            progress['pending' if state == 'leased' and lease_until < now else state] += 1
+        return progress
+
+    def get_errors(self) -> dict[int, str]:
+        self.expire_leases(now=time.time())
+        return {job_id: error for job_id, error in self.connection.execute("SELECT id, error FROM jobs WHERE state = 'failed'")}
+
+    def get_horizons(self) -> dict[str, tuple[list, list]]:
+        horizons = {}
+        for name, entry in self.connection.execute("SELECT name, entry FROM results"):
+            entry = json.loads(entry)
+            horizons[name] = (entry["azimuths"], entry["elevation_angles"])
+        return horizons
+
+    def close(self) -> None:
+        self.connection.close()
+        return
+
+
+@dataclass
+class JobWorker:
+    """
+    Claims jobs of a JobQueue and plans their points until the queue is empty.
+
+    The tiles of a job are fetched into the tile cache of the node (shared with LazyTileDEM), merged into one
+    window and every point is planned with RoughPlanning on it. The lease is renewed after every point; if the job
+    was taken over meanwhile the worker drops it.
+
+    Attributes
+    ----------
+    queue : JobQueue
+        Queue to work on.
+
+    settings : PlanningSettings
+        Parameters of the submitted session (JobQueue.get_parameters).
+
+    raster_directory : str
+        Folder of the tiles (raster/tiles) and job windows (raster/jobs/<id>) of this node.
+
+    wms_url, data_url : str
+        Addresses of the tile services.
+
+    worker : str | None
+        Name of the worker in the queue. Default: <host>-<process id>.
+
+    lease_seconds : float
+        Duration of a lease, has to exceed the time needed for one point. Default 300.
+
+    Methods
+    -------
+    run(progress: Callable[[Job], None] | None) -> int:
+        Works until no job is left and returns the number of completed jobs.
+
+    execute(job: Job) -> dict[str, dict] | None:
+        Plans the points of a job, None if the lease was lost.
+    """
+    queue: JobQueue
+    settings: "PlanningSettings"
+    raster_directory: str
+    wms_url: str = WMS_URL
+    data_url: str = DATA_URL
+    worker: str | None = None
+    lease_seconds: float = 300
+
+    def __post_init__(self) -> None:
+        if self.worker is None:
+            self.worker = f"{socket.gethostname()}-{os.getpid()}"
+        self.tile_dem = LazyTileDEM(cache_folder=os.path.join(self.raster_directory, "tiles"), wms_url=self.wms_url, data_url=self.data_url)
+
+    def run(self, progress: Callable[[Job], None] | None = None) -> int:
+        completed = 0
+        while (job := self.queue.claim(worker=self.worker, lease_seconds=self.lease_seconds)) is not None:
+            try:
+                horizons = self.execute(job=job)
+            except Exception as error: # another worker retries the job
+                self.queue.fail(job_id=job.id, worker=self.worker, error=f"{type(error).__name__}: {error}")
+                continue
+            if horizons is not None and self.queue.complete(job_id=job.id, horizons=horizons):
+                completed += 1
+                if progress is not None:
+                    progress(job)
+        return completed
+
+    def execute(self, job: Job) -> dict[str, dict] | None:
+        folder = os.path.join(self.raster_directory, "jobs", str(job.id))
+        file_paths = [self.tile_dem.fetch_tile(i=int(tile_key.split("_")[0]), j=int(tile_key.split("_")[1])) for tile_key in job.tiles]
+        merger = RasterMerger(path=folder, storage=self.settings.dem_storage, file_paths=file_paths)
+        merger.merge_raster()
+
+        horizons = {}
+        executor = self.settings.get_executor()
+        try:
+            for point in job.points:
+                rough_planner = RoughPlanning(point=point, dem_path=merger.merged_path, method=self.settings.method, executor=executor)
+                azimuths, elevation_angles = rough_planner.plan(number_of_lines=int(self.settings.number_of_lines), line_length=self.settings.distance, number_of_segments=self.settings.get_number_of_segments(), kernel=self.settings.kernel, refinement_threshold=self.settings.refinement_threshold, refinement_depth=self.settings.refinement_depth)
+                horizons[point.name] = create_entry(point=point, azimuths=azimuths, elevation_angles=elevation_angles)
+                if not self.queue.renew(job_id=job.id, worker=self.worker, lease_seconds=self.lease_seconds):
+                    return None # lease expired and job claimed by another worker
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        return horizons
@@ -1,16 +1,90 @@
 from dataclasses import dataclass
+from typing import Literal
+import numpy as np
 import rasterio
 import glob
 import os
+import shutil
 
 import rasterio.merge
 
+from backend.roughplanning.GNSS import GNSS_Point
+
+PYRAMID_BLOCK_SIZES = (4, 16, 64, 256) # pixels per pyramid cell, each level pools the previous one by 4
+QUANTIZATION_SCALE = 0.01 # centimetres
+
+def get_pyramid_path(raster_path: str) -> str:
+    return os.path.splitext(raster_path)[0] + "_pyramid.npz"
+
+def max_pool(array: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Max-pools a 2D array by factor in both directions, the border is padded with NaN which is ignored.
+    """
+    height = -(-array.shape[0] // factor) * factor
+    width = -(-array.shape[1] // factor) * factor
+
+    padded = np.full((height, width), np.nan, dtype=array.dtype)
+    padded[:array.shape[0], :array.shape[1]] = array
+
+    blocks = padded.reshape(height // factor, factor, width // factor, factor)
+    return np.fmax.reduce(np.fmax.reduce(blocks, axis=3), axis=1)
+
+
+def quantize_heights(band: np.ma.MaskedArray, dtype: type) -> tuple[np.ndarray, float, float, int]:
+    """
+    Stores heights as centimetres relative to the middle of their range (height = value * scale + offset).
+
+    Returns
+    -------
+    tuple[np.ndarray, float, float, int]
+        quantized array, scale, offset and nodata value (smallest value of dtype)
+    """
+    info = np.iinfo(dtype)
+    if band.count() == 0:
+        return (np.full(band.shape, info.min, dtype=dtype), QUANTIZATION_SCALE, 0.0, int(info.min))
+
+    low = float(band.min())
+    high = float(band.max())
+    offset = round((low + high) / 2, 2)
+
+    # int16 covers 655 m in centimetres, larger height ranges are stored as int32
+    if (high - offset) / QUANTIZATION_SCALE >= info.max or (low - offset) / QUANTIZATION_SCALE <= info.min:
+        if dtype is np.int16:
+            return quantize_heights(band=band, dtype=np.int32)
+        raise ValueError("Höhenbereich für die Quantisierung zu gross!")
+
+    quantized = np.round((band.filled(offset).astype(np.float64) - offset) / QUANTIZATION_SCALE).astype(dtype)
+    quantized[np.ma.getmaskarray(band)] = info.min
+    return (quantized, QUANTIZATION_SCALE, offset, int(info.min))
+
+
 @dataclass
 class RasterMerger:
+    """
+    Merges the downloaded tiles of a folder to raster.tif and builds its max-height pyramid.
+
+    Attributes
+    ----------
+    path : str
+        Folder containing the downloaded tiles.
+
+    storage : Literal['NATIVE', 'FLOAT32', 'INT16', 'INT32']
+        Data type of raster.tif. NATIVE keeps the type of the tiles, INT16/INT32 store centimetres with
+        scale/offset metadata (int16 halves float32, larger height ranges fall back to int32). Default NATIVE.
+
+    file_paths : list[str] | None
+        Tiles to merge. Default None -> all *.tif in path.
+
+    bounds : tuple[float, float, float, float] | None
+        (left, bottom, right, top) of the mosaic, e.g. the window around a single point. Default None -> union of the tiles.
+    """
     path: str
+    storage: Literal['NATIVE', 'FLOAT32', 'INT16', 'INT32'] = 'NATIVE'
+    file_paths: list[str] | None = None
+    bounds: tuple[float, float, float, float] | None = None
 
     def merge_raster(self) -> None:
-        file_paths = glob.glob(os.path.join(self.path, '*.tif'))
+        file_paths = self.file_paths if self.file_paths is not None else glob.glob(os.path.join(self.path, '*.tif'))
 
         src_files_to_mosaic = []
 
@@ -18,23 +92,79 @@ class RasterMerger:
             src = rasterio.open(file_path)
             src_files_to_mosaic.append(src)
 
-        mosaic, out_trans = rasterio.merge.merge(src_files_to_mosaic)
+        mosaic, out_trans = rasterio.merge.merge(src_files_to_mosaic, bounds=self.bounds)
+        nodata = src.nodata
+
+        scale, offset = (1.0, 0.0)
+        if self.storage == 'FLOAT32':
+            mosaic = mosaic.astype(np.float32)
+        elif self.storage in ('INT16', 'INT32'):
+            band = np.ma.masked_equal(mosaic[0], nodata) if nodata is not None else np.ma.masked_invalid(mosaic[0])
+            quantized, scale, offset, nodata = quantize_heights(band=band, dtype=np.int16 if self.storage == 'INT16' else np.int32)
+            mosaic = quantized[None]
+        elif self.storage != 'NATIVE':
+            raise AttributeError("Unsupported storage. Use 'NATIVE', 'FLOAT32', 'INT16' or 'INT32'!")
 
         out_meta = src.meta.copy()
         out_meta.update({
             "driver": "GTiff",
+            "dtype": mosaic.dtype,
+            "nodata": nodata,
             "height": mosaic.shape[1],
             "width": mosaic.shape[2],
-            "transform": out_trans
+            "transform": out_trans,
+            "tiled": True, # square blocks for windowed reads (BlockHorizonScheduler)
+            "blockxsize": 256,
+            "blockysize": 256
         })
+        for src in src_files_to_mosaic:
+            src.close()
         
         self.merged_path = os.path.join(self.path, "raster.tif")
+        os.makedirs(self.path, exist_ok=True)
 
         output_file = self.merged_path
         with rasterio.open(output_file, "w", **out_meta) as dest:
             dest.write(mosaic)
+            dest.scales = (scale,)
+            dest.offsets = (offset,)
+
+        self.build_pyramid()
 
         return
+
+    def build_pyramid(self, block_sizes: tuple = PYRAMID_BLOCK_SIZES) -> None:
+        """
+        Builds a max-height pyramid of the merged raster and saves it next to it (raster_pyramid.npz).
+
+        Every cell of a level holds the maximal height of block_size x block_size pixels of raster.tif.
+        The horizon engine uses it to skip samples which cannot exceed the current maximal elevation angle.
+        Cells containing nodata are +inf: their pixels are always sampled, like without the pyramid.
+        """
+        self.merged_path = os.path.join(self.path, "raster.tif")
+
+        with rasterio.open(self.merged_path) as src:
+            band = src.read(1, masked=True)
+            scale = src.scales[0]
+            offset = src.offsets[0]
+
+        # float32 keeps the exact values of float32 rasters, larger types are not rounded down
+        dtype = np.result_type(band.dtype, np.float32)
+        if scale != 1 or offset != 0:
+            # pyramid in meters, from the stored (rounded) heights
+            band = band.astype(np.float64) * scale + offset
+        array = band.astype(dtype).filled(np.inf)
+        array[np.isnan(array)] = np.inf
+
+        levels = {}
+        previous_block = 1
+        for block_size in block_sizes:
+            array = max_pool(array=array, factor=block_size // previous_block)
+            levels[f"level_{block_size}"] = array
+            previous_block = block_size
+
+        np.savez(get_pyramid_path(raster_path=self.merged_path), block_sizes=np.array(block_sizes), **levels)
+        return
     
     def remove_downloads(self) -> None:
         # list all files in dir
@@ -44,7 +174,51 @@ class RasterMerger:
 
             
             # remove downloads
-            files_to_remove = [os.path.join(self.path, file) for file in files if not os.path.join(self.path, file) == self.merged_path]
+            keep = [self.merged_path, get_pyramid_path(raster_path=self.merged_path)]
+            files_to_remove = [os.path.join(self.path, file) for file in files if not os.path.join(self.path, file) in keep]
             _ = [os.remove(file) for file in files_to_remove]
         
         return
+
+
+@dataclass
+class RasterCatalog:
+    """
+    Keeps track of the per-cluster mosaics (<path>/cluster_<idx>/raster.tif) of a project.
+    The per-point windows of OverlappedPlanner (<path>/points/<name>/raster.tif) are removed by clear() as well.
+    """
+    path: str
+
+    def get_cluster_path(self, idx: int) -> str:
+        return os.path.join(self.path, f"cluster_{idx}")
+
+    def get_raster_paths(self) -> list[str]:
+        raster_paths = sorted(glob.glob(os.path.join(self.path, "cluster_*", "raster.tif")))
+
+        # projects loaded before clustering only contain a single mosaic
+        legacy_path = os.path.join(self.path, "raster.tif")
+        if os.path.exists(legacy_path):
+            raster_paths.append(legacy_path)
+
+        return raster_paths
+
+    def get_dem_path(self, point: GNSS_Point) -> str:
+        for raster_path in self.get_raster_paths():
+            with rasterio.open(raster_path) as src:
+                bounds = src.bounds
+            if bounds.left <= point.easting <= bounds.right and bounds.bottom <= point.northing <= bounds.top:
+                return raster_path
+
+        raise FileNotFoundError(f"Kein DEM für Punkt {point.name} gefunden!")
+
+    def clear(self) -> None:
+        # remove all mosaics and downloads of a previous run, the tile cache of LazyTileDEM is kept
+        for cluster_path in glob.glob(os.path.join(self.path, "cluster_*")) + glob.glob(os.path.join(self.path, "points")):
+            shutil.rmtree(cluster_path)
+
+        legacy_path = os.path.join(self.path, "raster.tif")
+        for file in [legacy_path, get_pyramid_path(raster_path=legacy_path)]:
+            if os.path.exists(file):
+                os.remove(file)
+
+        return
@@ -0,0 +1,198 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+import asyncio
+import json
+import math
+import os
+import shutil
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.BBOX import BBOX
+from backend.roughplanning.SpatialIndex import DiskTileSelector
+from backend.roughplanning.Downloader import LoadRasterDEM, SWISSSURFACE3D
+from backend.roughplanning.Merger import RasterMerger
+from backend.roughplanning.RoughPlanning import RoughPlanning
+from backend.roughplanning.Horizon import start_numba_threads
+from backend.roughplanning.HorizonCache import HorizonCache
+
+from backend.roughplanning.helper_functions.timing import StageTimer
+
+if TYPE_CHECKING:
+    from backend.roughplanning.Pipeline import PlanningSettings
+
+
+@dataclass
+class OverlappedPlanner:
+    """
+    Discovers, downloads, merges and plans at the same time instead of one stage after the other.
+
+    Tile lookups (GetFeatureInfo) feed a bounded download queue as soon as they return. A point enters the bounded
+    planning queue once every tile of its analysis disk is downloaded, its window is merged to
+    raster/points/<name>/raster.tif, planned while other tiles are still in flight and deleted again. Requests and
+    merges run in threads of the event loop, planning on one dedicated thread, so the loop keeps starting lookups and
+    downloads meanwhile. The numba threads are started on the calling thread first: launched from a helper thread
+    they keep the interpreter from exiting. If a stage fails, the others are cancelled and the error is raised.
+
+    Attributes
+    ----------
+    points : list[GNSS_Point]
+        Points to plan.
+
+    settings : PlanningSettings
+        Parameters of the run (LINES engine). The POOL kernel is replaced by the array kernels, worker processes
+        must not be forked while downloads run in threads.
+
+    raster_directory : str
+        Project folder raster/, tiles are kept in raster/tiles (shared with LazyTileDEM).
+
+    wms_url, data_url : str
+        Addresses of the tile services.
+
+    timer : StageTimer
+        Records merge and planning per point.
+
+    cache : HorizonCache | None
+        Points with a valid cached horizon are not planned. Default None.
+
+    download_workers : int
+        Number of parallel downloads. Default 8.
+
+    queue_size : int
+        Capacity of the queues between the stages. Default 16.
+
+    Methods
+    -------
+    run() -> dict[str, tuple[list, list]]:
+        Returns (azimuths, elevation_angles) in gon per planned point name. Points with a valid cached horizon are skipped.
+    """
+    points: list[GNSS_Point]
+    settings: "PlanningSettings"
+    raster_directory: str
+    wms_url: str
+    data_url: str
+    timer: StageTimer = field(default_factory=StageTimer)
+    download_workers: int = 8
+    queue_size: int = 16
+    cache: HorizonCache | None = None
+    tile_versions: dict = field(default_factory=dict, init=False)
+
+    def __post_init__(self) -> None:
+        self.tile_folder = os.path.join(self.raster_directory, "tiles")
+        self.loader = LoadRasterDEM(bbox=BBOX(Emin=0, Emax=0, Nmin=0, Nmax=0), download_folder=self.tile_folder, wms_url=self.wms_url, data_url=self.data_url, cache_folder=os.path.join(self.raster_directory, "http_cache"), max_workers=self.download_workers)
+
+    def run(self) -> dict[str, tuple[list, list]]:
+        start_numba_threads()
+        self.planning_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planning")
+        try:
+            with self.loader.batch():
+                return asyncio.run(self.plan())
+        finally:
+            self.planning_thread.shutdown()
+
+    async def plan(self) -> dict[str, tuple[list, list]]:
+        radius = self.settings.distance
+        keys_per_point = {point.name: set(DiskTileSelector(points=[point], radius=radius).get_tile_keys()) for point in self.points}
+        waiting = {} # tilekey -> points still missing it
+        for point in self.points:
+            for tile_key in keys_per_point[point.name]:
+                waiting.setdefault(tile_key, []).append(point)
+
+        tile_paths = {}
+        download_queue = asyncio.Queue(maxsize=self.queue_size)
+        plan_queue = asyncio.Queue(maxsize=self.queue_size)
+        requests = asyncio.Semaphore(self.download_workers)
+        horizons = {}
+
+        async def resolve(tile_key: str, path: str | None) -> None:
+            # tile downloaded (or not available) -> points with a complete disk are ready
+            if path is not None:
+                tile_paths[tile_key] = path
+            for point in waiting.pop(tile_key, []):
+                keys_per_point[point.name].discard(tile_key)
+                if not keys_per_point[point.name]:
+                    await plan_queue.put(point)
+
+        async def query(tile_key: str) -> tuple[str, list]:
+            e, n = (int(value) * 1000 for value in tile_key.split("_"))
+            async with requests:
+                return (tile_key, await asyncio.to_thread(self.loader.query_tiles, e + 500, n + 500))
+
+        async def discover() -> None:
+            for lookup in asyncio.as_completed([query(tile_key) for tile_key in sorted(waiting)]):
+                tile_key, tiles = await lookup
+                if not tiles:
+                    await resolve(tile_key=tile_key, path=None) # outside the coverage
+                    continue
+                self.tile_versions[tile_key] = tiles[0][1]
+                await download_queue.put((tile_key, tiles[0]))
+            for _ in range(self.download_workers):
+                await download_queue.put(None)
+
+        async def download() -> None:
+            while (item := await download_queue.get()) is not None:
+                tile_key, tile = item
+                path = await asyncio.to_thread(self.loader.download_tile, tile)
+                await resolve(tile_key=tile_key, path=path)
+
+        async def produce() -> None:
+            await asyncio.gather(discover(), *[download() for _ in range(self.download_workers)])
+            await plan_queue.put(None)
+
+        async def consume() -> None:
+            loop = asyncio.get_running_loop()
+            while (point := await plan_queue.get()) is not None:
+                merged_path = await asyncio.to_thread(self.merge_point, point, tile_paths)
+                if merged_path is not None:
+                    horizons[point.name] = await loop.run_in_executor(self.planning_thread, self.plan_point, point, merged_path)
+                    await asyncio.to_thread(self.remove_window, point)
+
+        producer = asyncio.create_task(produce())
+        consumer = asyncio.create_task(consume())
+        try:
+            # returns when both are finished or one of them failed
+            done, _ = await asyncio.wait([producer, consumer], return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            # a failed consumer would leave the producers blocked on the full queue and vice versa
+            producer.cancel()
+            consumer.cancel()
+
+        os.makedirs(self.raster_directory, exist_ok=True)
+        with open(os.path.join(self.raster_directory, "tile_versions.json"), "w") as f:
+            json.dump(self.tile_versions, f)
+        return horizons
+
+    def get_window(self, point: GNSS_Point) -> tuple[float, float, float, float]:
+        # analysis disk plus one pixel, on the pixel grid of the tiles
+        pixel_size = SWISSSURFACE3D.resolution
+        margin = self.settings.distance + pixel_size
+        return (math.floor((point.easting - margin) / pixel_size) * pixel_size, math.floor((point.northing - margin) / pixel_size) * pixel_size, math.ceil((point.easting + margin) / pixel_size) * pixel_size, math.ceil((point.northing + margin) / pixel_size) * pixel_size)
+
+    def merge_point(self, point: GNSS_Point, tile_paths: dict[str, str]) -> str | None:
+        parameters = self.settings.get_horizon_parameters()
+        if self.cache is not None and self.cache.get(point=point, parameters=parameters, tile_versions=self.tile_versions) is not None:
+            return None # served from the cache by plan_all
+
+        file_paths = [tile_paths[tile_key] for tile_key in DiskTileSelector(points=[point], radius=self.settings.distance).get_tile_keys() if tile_key in tile_paths]
+        if not file_paths:
+            return None
+
+        folder = os.path.join(self.raster_directory, "points", point.name)
+        with self.timer.stage("merge", point=point.name):
+            merger = RasterMerger(path=folder, storage=self.settings.dem_storage, file_paths=file_paths, bounds=self.get_window(point=point))
+            merger.merge_raster()
+        return merger.merged_path
+
+    def remove_window(self, point: GNSS_Point) -> None:
+        # the window is only needed for planning, the tiles stay in raster/tiles
+        shutil.rmtree(os.path.join(self.raster_directory, "points", point.name), ignore_errors=True)
+        return
+
+    def plan_point(self, point: GNSS_Point, dem_path: str) -> tuple[list, list]:
+        with self.timer.stage("planning", point=point.name):
+            rough_planner = RoughPlanning(point=point, dem_path=dem_path, method=self.settings.method)
+            kernel = 'NUMBA' if self.settings.kernel == 'POOL' else self.settings.kernel # no fork from a threaded process
+            azimuths, elevation_angles = rough_planner.plan(number_of_lines=int(self.settings.number_of_lines), line_length=self.settings.distance, number_of_segments=self.settings.get_number_of_segments(), kernel=kernel, refinement_threshold=self.settings.refinement_threshold, refinement_depth=self.settings.refinement_depth)
+        return (azimuths, elevation_angles)
@@ -9,7 +9,7 @@ from backend.roughplanning.GNSS import GNSS_Point
 class PDFCreator:
     results_path: str
 
-    def create_protocol(self, points: list[GNSS_Point], projectname: str, projectleader: str, distance: int, segment_length: int, no_lines: int, cutoff: int) -> None:
+    def create_protocol(self, points: list[GNSS_Point], projectname: str, projectleader: str, distance: int, segment_length: int, no_lines: int, cutoff: int, dop_summaries: dict[str, dict] | None = None) -> None:
         if not projectname: projectname = "Nicht angegeben"
         if not projectleader: projectleader = "Nicht angegeben"
 
@@ -18,6 +18,8 @@ class PDFCreator:
 
         for point in points:
             self.create_point_page(pdf=pdf, point=point)
+            if dop_summaries and point.name in dop_summaries:
+                self.create_dop_page(pdf=pdf, point=point, summary=dop_summaries[point.name])
 
 
         pdf.output(os.path.join(self.results_path, "results.pdf"))
@@ -79,6 +81,22 @@ class PDFCreator:
 
         return
 
+
+    def create_dop_page(self, pdf: FPDF, point: GNSS_Point, summary: dict) -> None:
+        pdf.add_page()
+        pdf.set_font('helvetica', '', 16)
+        pdf.cell(w=60, text=f"DOP Punkt:", ln=0)
+        pdf.cell(w=30, text=f"{point.name}", ln=1, align='r')
+        pdf.set_font('helvetica', '', 12)
+        pdf.cell(w=60, text=f"PDOP min / mittel / max:", ln=0)
+        pdf.cell(w=60, text=f"{summary['pdop_min']:.1f} / {summary['pdop_mean']:.1f} / {summary['pdop_max']:.1f}", ln=1, align='r')
+        pdf.cell(w=60, text=f"Anteil PDOP <= {summary['threshold']:g}:", ln=0)
+        pdf.cell(w=60, text=f"{summary['share_below_threshold'] * 100:.0f} %", ln=1, align='r')
+
+        dop_image = self.find_image(name=f"dop{point.name}.png")
+        pdf.image(name=dop_image, x=10, y=40, w=220)
+
+        return
     
     def find_image(self, name: str) -> str | None:
         files = glob.glob(os.path.join(self.results_path, name))
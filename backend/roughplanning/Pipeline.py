@@ -0,0 +1,552 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Literal
+import csv
+import json
+import os
+
+from backend.roughplanning.GNSS import GNSS_Session, GNSS_Point
+from backend.roughplanning.BBOX import BBOXCreator, BBOX
+from backend.roughplanning.SpatialIndex import DiskTileSelector
+from backend.roughplanning.Downloader import LoadRasterDEM, WMS_URL, DATA_URL, ALTI_DATA_URL, SWISSALTI3D
+from backend.roughplanning.Merger import RasterMerger, RasterCatalog
+from backend.roughplanning.DEM import LazyTileDEM, RasterDEM, HybridDEM
+from backend.roughplanning.RoughPlanning import RoughPlanning
+from backend.roughplanning.HorizonRaster import HorizonRaster
+from backend.roughplanning.HorizonCache import HorizonCache, FAR_TILE_PREFIX, read_tile_versions, read_heights
+from backend.roughplanning.RunJournal import RunJournal
+from backend.roughplanning.Executor import Executor
+from backend.roughplanning.OverlappedPipeline import OverlappedPlanner
+from backend.roughplanning.BlockScheduler import BlockHorizonScheduler
+from backend.roughplanning.SiteSearch import SiteSearch
+from backend.roughplanning.Almanac import Almanac, VisibilityForecast, PointVisibility, read_almanac
+from backend.roughplanning.DOP import DOPSeries, compute_dop
+from backend.roughplanning.SessionScheduler import ObservationScheduler
+
+from backend.roughplanning.helper_functions.timing import StageTimer
+
+# matplotlib and fpdf are imported when the diagrams are drawn and the protocol is created
+if TYPE_CHECKING:
+    from backend.roughplanning.RoughPlanDrawer import RoughPlanDrawer
+
+@dataclass
+class PlanningSettings:
+    """
+    Parameters of a rough planning run (values of the sliders in the UI).
+
+    Attributes
+    ----------
+    distance : int
+        Analysis distance (line_length) [Meters].
+
+    segment_resolution : int
+        Distance between two samples on a line [Meters].
+
+    number_of_lines : int
+        Number of azimuths.
+
+    cutoff : int
+        Cut-off angle [gon].
+
+    method : Literal['RANSAC', 'CONVENTIONAL']
+        Method for rough planning. Default CONVENTIONAL.
+
+    engine : Literal['LINES', 'BLOCKS']
+        LINES plans point by point, BLOCKS computes all points of a mosaic at once reading every DEM block once
+        (BlockHorizonScheduler, CONVENTIONAL only). Default LINES.
+
+    kernel : Literal['POOL', 'NUMPY', 'NUMBA']
+        Computation of the LINES engine, see RoughPlanning.plan. Default POOL.
+
+    refinement_threshold : float | None
+        If set, number_of_lines is a coarse fan refined where neighbouring elevation angles differ by more
+        than this value [gon] (LINES engine only). Default None.
+
+    refinement_depth : int
+        Maximal number of bisections per interval of the coarse fan. Default 4.
+
+    antenna_heights : list[float] | None
+        If set, the horizon of every point is additionally computed for these antenna heights in the same
+        DEM traversal and drawn as panorama<name>_<height>m.png / polar<name>_<height>m.png (LINES engine only,
+        no refinement). Default None.
+
+    horizon_raster : str | None
+        Folder of a precomputed horizon raster (HorizonRasterBuilder). Points inside it are looked up instead of
+        ray cast (LINES engine). Default None.
+
+    site_search_radius : float | None
+        If set, the position with the least obstructed sky within this radius [Meters] is searched for every point
+        (SiteSearch) and written to results/sites.csv. The DEM is loaded with this additional margin. Default None.
+
+    site_search_spacing : float
+        Distance between two candidate positions [Meters]. Default 1.
+
+    almanacs : list[tuple[str, str]] | None
+        (prefix, path) of YUMA/SEM almanacs, e.g. [('G', 'gps.alm'), ('E', 'galileo.alm')]. If set, the satellite
+        visibility of every point is forecast (VisibilityForecast) and written to results/visibility.csv. Default None.
+
+    forecast_start : datetime | None
+        Start of the forecast (UTC). Default None -> today 00:00 UTC.
+
+    forecast_hours : float
+        Length of the forecast [hours]. Default 24.
+
+    forecast_step : float
+        Distance between two epochs of the forecast [minutes]. Default 1.
+
+    dop_threshold : float
+        PDOP threshold for the DOP page of the protocol and the scheduler. Default 6.
+
+    receivers : int | None
+        If set (and almanacs are given), the occupations of all points are scheduled for this number of receivers
+        (ObservationScheduler) and written to results/timetable.csv. Default None.
+
+    occupation_minutes : float
+        Minimal occupation time per point [minutes]. Default 60.
+
+    changeover_minutes : float
+        Time between two occupations of a receiver [minutes]. Default 30.
+
+    near_radius : float | None
+        If set, swissSURFACE3D is only loaded up to this distance [Meters] around the points, the terrain beyond is
+        sampled from swissALTI3D tiles fetched on demand (HybridDEM, LINES engine). Default None.
+
+    dem_storage : Literal['NATIVE', 'FLOAT32', 'INT16', 'INT32']
+        Data type of the merged DEM (RasterMerger). INT16 stores centimetres and quarters the memory of a float64
+        DEM, the horizon engine works on the stored values directly. Default NATIVE.
+
+    cache_results : bool
+        Reuse the horizons of results/horizon_cache.json for points whose parameters and DEM tile versions
+        (temporalkey) are unchanged; load_dem only downloads the tiles of the other points. Default True.
+
+    executor : Literal['SERIAL', 'THREAD', 'PROCESS', 'FORKSERVER'] | None
+        Runs the lines of the POOL kernel. Default None -> GNSS_PLANNER_EXECUTOR, processes otherwise.
+
+    workers : int | None
+        Number of threads or processes of the executor. Default None -> sized from the CPUs and the DEM memory.
+    """
+    distance: int
+    segment_resolution: int
+    number_of_lines: int
+    cutoff: int
+    method: Literal['RANSAC', 'CONVENTIONAL'] = 'CONVENTIONAL'
+    projectname: str = ""
+    projectleader: str = ""
+    engine: Literal['LINES', 'BLOCKS'] = 'LINES'
+    kernel: Literal['POOL', 'NUMPY', 'NUMBA'] = 'POOL'
+    refinement_threshold: float | None = None
+    refinement_depth: int = 4
+    antenna_heights: list[float] | None = None
+    horizon_raster: str | None = None
+    site_search_radius: float | None = None
+    site_search_spacing: float = 1.0
+    almanacs: list[tuple[str, str]] | None = None
+    forecast_start: datetime | None = None
+    forecast_hours: float = 24
+    forecast_step: float = 1
+    dop_threshold: float = 6.0
+    receivers: int | None = None
+    occupation_minutes: float = 60
+    changeover_minutes: float = 30
+    near_radius: float | None = None
+    dem_storage: Literal['NATIVE', 'FLOAT32', 'INT16', 'INT32'] = 'NATIVE'
+    cache_results: bool = True
+    executor: Literal['SERIAL', 'THREAD', 'PROCESS', 'FORKSERVER'] | None = None
+    workers: int | None = None
+
+    def get_executor(self) -> Executor:
+        return Executor(backend=self.executor, workers=self.workers)
+
+    def get_number_of_segments(self) -> int:
+        return int(self.distance / self.segment_resolution)
+
+    def get_surface_radius(self) -> float:
+        if self.near_radius is not None and self.engine == 'LINES':
+            # the coarse model beyond the near radius is fetched on demand
+            return min(self.near_radius, self.distance)
+        return self.distance
+
+    def get_far_radius(self) -> float | None:
+        # disk of the swissALTI3D tiles sampled beyond the near radius, None if the surface model covers the distance
+        if self.get_surface_radius() < self.distance:
+            return self.distance
+        return None
+
+    def get_dem_margin(self) -> float:
+        if not self.site_search_radius:
+            return self.get_surface_radius()
+        # candidates of the site search need the analysis distance around the shifted position
+        return self.distance + self.site_search_radius
+
+    def get_horizon_parameters(self) -> dict:
+        # everything a cached horizon depends on besides the point and the DEM tiles
+        return {"distance": self.distance, "segment_resolution": self.segment_resolution, "number_of_lines": self.number_of_lines, "method": self.method, "engine": self.engine, "kernel": self.kernel, "refinement_threshold": self.refinement_threshold, "refinement_depth": self.refinement_depth, "antenna_heights": self.antenna_heights, "horizon_raster": self.horizon_raster, "near_radius": self.near_radius, "dem_storage": self.dem_storage}
+
+
+@dataclass
+class RoughPlanningPipeline:
+    """
+    Loads the DEM and plans all points of a session, used by the Qt UI and for headless runs.
+
+    Attributes
+    ----------
+    session : GNSS_Session
+        Points to plan.
+
+    parent_directory : str
+        Project folder containing raster/ and results/.
+
+    settings : PlanningSettings
+        Parameters of the run.
+
+    timer : StageTimer
+        Records the duration of every stage. The summary is written to results/timing.json.
+
+    progress : Callable[[int, str], None] | None
+        Called with (percentage, text) to report progress, e.g. to update the progress bar of the UI.
+
+    wms_url, data_url : str
+        Addresses of the tile services, may point to a local fixture server.
+
+    far_data_url : str
+        Address of the swissALTI3D download used beyond settings.near_radius, may point to a local fixture server.
+
+    Methods
+    -------
+    load_dem() -> None:
+        Downloads and merges the DEM for every point-cluster of the session.
+
+    plan_all(planned: dict | None, resume: bool) -> None:
+        Plans all points, draws the diagrams and creates the protocol. Horizons in planned are only drawn. Every
+        finished point is recorded in results/journal.jsonl, with resume the points of an interrupted run are
+        taken from it instead of being planned again.
+
+    run_overlapped(resume: bool) -> None:
+        Downloads and plans at the same time (OverlappedPlanner), then draws and creates the protocol.
+    """
+    session: GNSS_Session
+    parent_directory: str
+    settings: PlanningSettings
+    timer: StageTimer = field(default_factory=StageTimer)
+    progress: Callable[[int, str], None] | None = None
+    wms_url: str = WMS_URL
+    data_url: str = DATA_URL
+    far_data_url: str = ALTI_DATA_URL
+
+    def __post_init__(self) -> None:
+        self.raster_directory = os.path.join(self.parent_directory, "raster")
+        self.results_directory = os.path.join(self.parent_directory, "results")
+        self.tile_versions_path = os.path.join(self.raster_directory, "tile_versions.json")
+        self.cache_path = os.path.join(self.results_directory, "horizon_cache.json")
+        self.journal_path = os.path.join(self.results_directory, "journal.jsonl")
+        if not os.path.exists(self.results_directory):
+            os.makedirs(self.results_directory)
+
+        self.horizons: dict[str, tuple[list, list]] = {} # (azimuths, elevation_angles) per planned point
+        self.epochs: list[datetime] = []
+        self.visibilities: dict[str, PointVisibility] = {}
+        self.dops: dict[str, DOPSeries] = {}
+
+        if self.timer.profile_dir is None:
+            self.timer.profile_dir = os.path.join(self.results_directory, "profiles")
+
+    def report_progress(self, value: int, text: str) -> None:
+        if self.progress is not None:
+            self.progress(value, text)
+        return
+
+    def write_timing_report(self) -> None:
+        self.timer.write_report(path=os.path.join(self.results_directory, "timing.json"))
+        return
+
+    def load_dem(self) -> None:
+        self.report_progress(0, "Berechne BBoxen")
+        creator = BBOXCreator(session=self.session)
+        bboxes: list[BBOX] = creator.get_cluster_bboxes(distance=self.settings.get_dem_margin()) # one buffered bbox per point-cluster
+
+        catalog = RasterCatalog(path=self.raster_directory)
+        catalog.clear()
+        cache = self.get_cache()
+        tile_versions = {}
+        far_dem = self.get_far_dem()
+        far_tiles = []
+
+        for bbox_idx, bbox in enumerate(bboxes):
+            percentage_counter = 10 + int(bbox_idx / len(bboxes) * 90) # for progressBar and label
+            cluster_directory = catalog.get_cluster_path(idx=bbox_idx)
+
+            self.report_progress(percentage_counter, f"{bbox_idx + 1} / {len(bboxes)} Lade DEM herunter")
+            with self.timer.stage("tile_discovery", cluster=bbox_idx):
+                cluster_points = [point for point in self.session.get_points() if bbox.contains(easting=point.easting, northing=point.northing)]
+                selector = DiskTileSelector(points=cluster_points, radius=self.settings.get_dem_margin()) # only tiles reachable by a profile line
+                loader: LoadRasterDEM = LoadRasterDEM(bbox=bbox, download_folder=cluster_directory, wms_url=self.wms_url, data_url=self.data_url, cache_folder=os.path.join(self.raster_directory, "http_cache"))
+                tiles: list = loader.get_tiles(tile_origins=selector.get_tile_origins())
+                tile_versions.update(dict(tiles))
+
+                if self.settings.get_far_radius() is not None:
+                    # versions of the coarse tiles beyond the near radius, a republished one invalidates cached horizons
+                    far_selector = DiskTileSelector(points=cluster_points, radius=self.settings.get_far_radius())
+                    far_loader = LoadRasterDEM(bbox=bbox, download_folder=far_dem.cache_folder, wms_url=self.wms_url, data_url=self.far_data_url, product=SWISSALTI3D, cache_folder=os.path.join(self.raster_directory, "http_cache"))
+                    cluster_far_tiles = far_loader.get_tiles(tile_origins=far_selector.get_tile_origins())
+                    far_tiles += cluster_far_tiles
+                    tile_versions.update({FAR_TILE_PREFIX + tile_key: temporalkey for tile_key, temporalkey in cluster_far_tiles})
+
+            if cache is not None and not self.settings.site_search_radius:
+                # only the tiles of points without a valid cached horizon are needed
+                stale_points = [point for point in cluster_points if cache.get(point=point, parameters=self.settings.get_horizon_parameters(), tile_versions=tile_versions) is None]
+                if not stale_points:
+                    continue
+                stale_keys = DiskTileSelector(points=stale_points, radius=self.settings.get_dem_margin()).get_tile_keys()
+                tiles = [tile for tile in tiles if tile[0] in stale_keys]
+
+            with self.timer.stage("download", cluster=bbox_idx, tiles=len(tiles)):
+                loader.load_raster(tiles=tiles)
+
+            self.report_progress(percentage_counter, f"{bbox_idx + 1} / {len(bboxes)} Füge Raster zusammen")
+            with self.timer.stage("merge", cluster=bbox_idx):
+                merger = RasterMerger(path=cluster_directory, storage=self.settings.dem_storage)
+                merger.merge_raster()
+                merger.remove_downloads()
+
+        # outdated coarse tiles are fetched again when they are sampled
+        far_dem.remove_outdated_tiles(tiles=far_tiles)
+
+        os.makedirs(self.raster_directory, exist_ok=True)
+        with open(self.tile_versions_path, "w") as f:
+            json.dump(tile_versions, f)
+
+        self.write_timing_report()
+        self.report_progress(100, "DEM heruntergeladen")
+        return
+
+    def run_overlapped(self, download_workers: int = 8, queue_size: int = 16, resume: bool = False) -> None:
+        if self.settings.engine != 'LINES' or self.settings.antenna_heights or self.settings.near_radius is not None or self.settings.site_search_radius or self.settings.horizon_raster:
+            # these options need the cluster mosaics or the plan_all loop
+            if not resume or not RasterCatalog(path=self.raster_directory).get_raster_paths():
+                self.load_dem()
+            self.plan_all(resume=resume)
+            return
+
+        points = self.session.get_points()
+        if resume:
+            # points finished before the interruption need neither tiles nor planning
+            journal = RunJournal(path=self.journal_path)
+            journal.start(parameters=self.settings.get_horizon_parameters(), resume=True)
+            points = [point for point in points if journal.get_completed(point=point) is None]
+        else:
+            RasterCatalog(path=self.raster_directory).clear()
+        self.report_progress(0, "Lade DEM herunter und plane Punkte")
+        planner = OverlappedPlanner(points=points, settings=self.settings, raster_directory=self.raster_directory, wms_url=self.wms_url, data_url=self.data_url, timer=self.timer, download_workers=download_workers, queue_size=queue_size, cache=self.get_cache())
+        planned = planner.run()
+        self.plan_all(planned=planned, resume=resume)
+        return
+
+    def plan_all(self, planned: dict[str, tuple[list, list]] | None = None, resume: bool = False) -> None:
+        number_of_lines = int(self.settings.number_of_lines)
+        line_length = self.settings.distance
+        number_of_segments = self.settings.get_number_of_segments()
+
+        points = self.session.get_points()
+        catalog = RasterCatalog(path=self.raster_directory)
+        lazy_dem = LazyTileDEM(cache_folder=os.path.join(self.raster_directory, "tiles"), wms_url=self.wms_url, data_url=self.data_url)
+        far_dem = self.get_far_dem()
+        from backend.roughplanning.RoughPlanDrawer import RoughPlanDrawer
+
+        drawer = RoughPlanDrawer()
+        horizon_raster = HorizonRaster(folder=self.settings.horizon_raster) if self.settings.horizon_raster else None
+        cache = self.get_cache()
+        tile_versions = read_tile_versions(path=self.tile_versions_path)
+        parameters = self.settings.get_horizon_parameters()
+        executor = self.settings.get_executor()
+        journal = RunJournal(path=self.journal_path)
+        journal.start(parameters=parameters, resume=resume)
+
+        planned = dict(planned or {})
+        if self.settings.engine == 'BLOCKS' and self.settings.method == 'CONVENTIONAL' and self.settings.refinement_threshold is None:
+            # points with a valid cached horizon may lie in a mosaic which does not cover their disk
+            stale_points = [point for point in points if journal.get_completed(point=point) is None and (cache is None or cache.get(point=point, parameters=parameters, tile_versions=tile_versions) is None)]
+            planned = self.plan_blocks(catalog=catalog, points=stale_points)
+
+        for pt_idx, point in enumerate(points):
+            percentage_counter = int(pt_idx / len(points) * 100) # for progressBar and label
+            self.report_progress(percentage_counter, f"{pt_idx + 1} / {len(points)} Grobplanung.")
+
+            horizons_per_height = {}
+            journaled = journal.get_completed(point=point) if point.name not in planned else None
+            cached = cache.get(point=point, parameters=parameters, tile_versions=tile_versions) if cache is not None and point.name not in planned and journaled is None else None
+            if point.name in planned:
+                azimuths, elevation_angles = planned[point.name]
+            elif journaled is not None:
+                # finished before the run was interrupted
+                azimuths, elevation_angles = journaled["azimuths"], journaled["elevation_angles"]
+                horizons_per_height = read_heights(entry=journaled)
+            elif cached is not None:
+                azimuths, elevation_angles = cached["azimuths"], cached["elevation_angles"]
+                horizons_per_height = read_heights(entry=cached)
+            else:
+                with self.timer.stage("planning", point=point.name):
+                    try:
+                        rough_planner = RoughPlanning(point=point, dem_path=catalog.get_dem_path(point=point), method=self.settings.method, horizon_raster=horizon_raster, executor=executor)
+                    except FileNotFoundError:
+                        # no DEM loaded for this point -> fetch tiles on demand while sampling
+                        rough_planner = RoughPlanning(point=point, dem_path="", method=self.settings.method, dem_provider=lazy_dem, horizon_raster=horizon_raster, executor=executor)
+                    if self.settings.near_radius is not None:
+                        # fine model near the point, coarse terrain model beyond
+                        rough_planner.dem_provider = HybridDEM(near=rough_planner.get_dem(), far=far_dem, easting=point.easting, northing=point.northing, near_radius=self.settings.near_radius)
+                    if self.settings.antenna_heights and self.settings.method == 'CONVENTIONAL' and self.settings.refinement_threshold is None:
+                        # own antenna height for the protocol, all heights in one pass
+                        antenna_heights = list(dict.fromkeys([point.antenna_height] + list(self.settings.antenna_heights)))
+                        horizons_per_height = rough_planner.plan_antenna_heights(antenna_heights=antenna_heights, number_of_lines=number_of_lines, line_length=line_length, number_of_segments=number_of_segments, kernel=self.settings.kernel)
+                        azimuths, elevation_angles = horizons_per_height.pop(point.antenna_height)
+                    else:
+                        azimuths, elevation_angles = rough_planner.plan(number_of_lines=number_of_lines, line_length=line_length, number_of_segments=number_of_segments, kernel=self.settings.kernel, refinement_threshold=self.settings.refinement_threshold, refinement_depth=self.settings.refinement_depth)
+
+            # copies, the drawer appends the closing point to the lists
+            self.horizons[point.name] = (list(azimuths), list(elevation_angles))
+            if journaled is None:
+                journal.append(point=point, azimuths=azimuths, elevation_angles=elevation_angles, horizons_per_height=horizons_per_height)
+            if cache is not None and cached is None:
+                cache.put(point=point, parameters=parameters, tile_versions=tile_versions, azimuths=azimuths, elevation_angles=elevation_angles, horizons_per_height=horizons_per_height)
+
+            with self.timer.stage("drawing", point=point.name):
+                panorama_path = os.path.join(self.results_directory, f"panorama{point.name}.png")
+                polar_path = os.path.join(self.results_directory, f"polar{point.name}.png")
+                drawer.draw_panorama_diagram(azimuths=azimuths, elevation_angles=elevation_angles, min_elevation=self.settings.cutoff, image_path=panorama_path, pointname=point.name)
+                drawer.draw_polar_diagram(azimuths=azimuths, elevation_angles=elevation_angles, min_elevation=self.settings.cutoff, image_path=polar_path, pointname=point.name)
+                self.draw_antenna_heights(drawer=drawer, point=point, horizons_per_height=horizons_per_height)
+
+        if cache is not None:
+            cache.save()
+
+        legend_path = os.path.join(self.results_directory, "legend.png")
+        drawer.save_legend(legend_path=legend_path)
+
+        if self.settings.site_search_radius and self.settings.method == 'CONVENTIONAL':
+            self.search_sites(catalog=catalog)
+
+        if self.settings.almanacs:
+            self.report_progress(99, "Berechne Satellitensichtbarkeit")
+            with self.timer.stage("visibility"):
+                self.forecast_visibility()
+            with self.timer.stage("dop"):
+                self.compute_dops(drawer=drawer)
+            if self.settings.receivers:
+                self.report_progress(99, "Erstelle Messplan")
+                with self.timer.stage("schedule", receivers=self.settings.receivers):
+                    self.schedule_observations()
+
+        self.report_progress(99, "erstelle Protokoll")
+        with self.timer.stage("pdf"):
+            from backend.roughplanning.PDFCreator import PDFCreator
+
+            pdf_creator = PDFCreator(results_path=self.results_directory)
+            dop_summaries = {name: dop.get_summary(threshold=self.settings.dop_threshold) for name, dop in self.dops.items()}
+            pdf_creator.create_protocol(points=points, projectname=self.settings.projectname, projectleader=self.settings.projectleader, distance=self.settings.distance, segment_length=self.settings.segment_resolution, no_lines=self.settings.number_of_lines, cutoff=self.settings.cutoff, dop_summaries=dop_summaries)
+
+        self.write_timing_report()
+        self.report_progress(100, "Grobplanung abgeschlossen")
+        return
+
+    def get_cache(self) -> HorizonCache | None:
+        if not self.settings.cache_results:
+            return None
+        return HorizonCache(path=self.cache_path, radius=self.settings.get_surface_radius(), far_radius=self.settings.get_far_radius())
+
+    def get_far_dem(self) -> LazyTileDEM:
+        # swissALTI3D tiles beyond the near radius and ground heights of the site search, fetched on demand
+        return LazyTileDEM(cache_folder=os.path.join(self.raster_directory, "far_tiles"), wms_url=self.wms_url, data_url=self.far_data_url, pixel_size=SWISSALTI3D.resolution, product=SWISSALTI3D)
+
+    def forecast_visibility(self) -> None:
+        """
+        Forecasts the satellite visibility of all planned points and writes the number of visible satellites per epoch to results/visibility.csv.
+        """
+        almanac = Almanac.concatenate([read_almanac(path=path, prefix=prefix) for prefix, path in self.settings.almanacs])
+        start = self.settings.forecast_start or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        forecast = VisibilityForecast(almanac=almanac, start=start, duration=self.settings.forecast_hours, step=self.settings.forecast_step, cutoff=self.settings.cutoff)
+
+        self.epochs = forecast.get_epochs()
+        self.visibilities = forecast.forecast(points=self.session.get_points(), horizons=self.horizons)
+
+        with open(os.path.join(self.results_directory, "visibility.csv"), "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["epoch"] + list(self.visibilities))
+            counts = [visibility.get_visible_counts() for visibility in self.visibilities.values()]
+            for epoch_idx, epoch in enumerate(self.epochs):
+                writer.writerow([epoch.isoformat()] + [int(count[epoch_idx]) for count in counts])
+        return
+
+    def compute_dops(self, drawer: "RoughPlanDrawer") -> None:
+        """
+        Computes the DOP time series of all points with a visibility forecast and draws dop<name>.png for the protocol.
+        """
+        for name, visibility in self.visibilities.items():
+            dop = compute_dop(visibility=visibility)
+            self.dops[name] = dop
+            drawer.draw_dop_diagram(epochs=self.epochs, pdop=dop.pdop, hdop=dop.hdop, vdop=dop.vdop, satellites=dop.satellites, threshold=self.settings.dop_threshold, image_path=os.path.join(self.results_directory, f"dop{name}.png"), pointname=name)
+        return
+
+    def schedule_observations(self) -> None:
+        """
+        Schedules the occupations of all points with a DOP time series and writes results/timetable.csv.
+        """
+        scheduler = ObservationScheduler(dops=self.dops, epochs=self.epochs, receivers=self.settings.receivers, occupation=self.settings.occupation_minutes, changeover=self.settings.changeover_minutes, pdop_threshold=self.settings.dop_threshold)
+        scheduler.schedule()
+        scheduler.write_timetable(path=os.path.join(self.results_directory, "timetable.csv"))
+        return
+
+    def draw_antenna_heights(self, drawer: "RoughPlanDrawer", point: GNSS_Point, horizons_per_height: dict[float, tuple[list, list]]) -> None:
+        """
+        Draws the diagrams of the additional antenna heights of a point.
+        """
+        for antenna_height, (azimuths, elevation_angles) in horizons_per_height.items():
+            suffix = f"{point.name}_{antenna_height:g}m"
+            drawer.draw_panorama_diagram(azimuths=azimuths, elevation_angles=elevation_angles, min_elevation=self.settings.cutoff, image_path=os.path.join(self.results_directory, f"panorama{suffix}.png"), pointname=f"{point.name} ({antenna_height:g} m)")
+            drawer.draw_polar_diagram(azimuths=azimuths, elevation_angles=elevation_angles, min_elevation=self.settings.cutoff, image_path=os.path.join(self.results_directory, f"polar{suffix}.png"), pointname=f"{point.name} ({antenna_height:g} m)")
+        return
+
+    def search_sites(self, catalog: RasterCatalog) -> None:
+        """
+        Searches the least obstructed position around every point with a loaded DEM and writes results/sites.csv.
+        """
+        # ground heights of the candidates, the loaded DEM is a surface model
+        terrain = self.get_far_dem()
+        rows = []
+        for pt_idx, point in enumerate(self.session.get_points()):
+            self.report_progress(int(pt_idx / len(self.session.get_points()) * 100), f"{pt_idx + 1} / {len(self.session.get_points())} Standortsuche.")
+            try:
+                dem = RasterDEM(path=catalog.get_dem_path(point=point))
+            except FileNotFoundError:
+                continue # no DEM loaded for this point
+
+            with self.timer.stage("site_search", point=point.name):
+                site_search = SiteSearch(point=point, dem=dem, terrain=terrain, search_radius=self.settings.site_search_radius, spacing=self.settings.site_search_spacing)
+                candidates = site_search.search(number_of_lines=int(self.settings.number_of_lines), line_length=self.settings.distance, number_of_segments=self.settings.get_number_of_segments(), cutoff=self.settings.cutoff, kernel='NUMBA' if self.settings.kernel == 'NUMBA' else 'NUMPY')
+
+            nominal = next(candidate for candidate in candidates if candidate.shift == 0)
+            best = candidates[0]
+            rows.append([point.name, f"{point.easting:.2f}", f"{point.northing:.2f}", f"{nominal.obstructed_fraction:.4f}", f"{best.point.easting:.2f}", f"{best.point.northing:.2f}", f"{best.point.floor_height:.2f}", f"{best.shift:.2f}", f"{best.obstructed_fraction:.4f}"])
+
+        with open(os.path.join(self.results_directory, "sites.csv"), "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "easting", "northing", "obstructed", "best_easting", "best_northing", "best_floor_height", "shift", "best_obstructed"])
+            writer.writerows(rows)
+        return
+
+    def plan_blocks(self, catalog: RasterCatalog, points: list[GNSS_Point]) -> dict[str, tuple[list, list]]:
+        """
+        Plans all given points with a loaded mosaic using one block-wise pass per mosaic. Returns (azimuths, elevation_angles) per point name.
+        """
+        points_per_dem = {}
+        for point in points:
+            try:
+                points_per_dem.setdefault(catalog.get_dem_path(point=point), []).append(point)
+            except FileNotFoundError:
+                continue # planned point by point with tiles fetched on demand
+
+        horizons = {}
+        for dem_idx, (dem_path, points) in enumerate(points_per_dem.items()):
+            self.report_progress(int(dem_idx / len(points_per_dem) * 100), f"{dem_idx + 1} / {len(points_per_dem)} Grobplanung (blockweise).")
+            with self.timer.stage("planning", points=len(points)):
+                scheduler = BlockHorizonScheduler(points=points, dem_path=dem_path)
+                horizons.update(scheduler.plan(number_of_lines=int(self.settings.number_of_lines), line_length=self.settings.distance, number_of_segments=self.settings.get_number_of_segments()))
+        return horizons
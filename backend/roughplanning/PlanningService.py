@@ -0,0 +1,422 @@
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+import http.server
+import json
+import logging
+import math
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import rasterio
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.SpatialIndex import DiskTileSelector
+from backend.roughplanning.Downloader import WMS_URL, DATA_URL
+from backend.roughplanning.DEM import LazyTileDEM
+from backend.roughplanning.Merger import RasterMerger
+from backend.roughplanning.Horizon import get_azimuths, max_elevation_angles_points
+from backend.roughplanning.HorizonCache import get_point_record
+
+if TYPE_CHECKING:
+    from backend.roughplanning.Pipeline import PlanningSettings
+
+logger = logging.getLogger("gnss_planner.service")
+
+STORAGE_DTYPES = {'NATIVE': np.float32, 'FLOAT32': np.float32, 'INT16': np.int16, 'INT32': np.int32}
+LV95_EXTENT = (2_480_000, 1_070_000, 2_840_000, 1_300_000) # area covered by the swisstopo tiles (min E, min N, max E, max N) [m]
+HEIGHT_RANGE = (-500, 5000) # floor heights [m]
+
+
+def validate_point(point: GNSS_Point) -> None:
+    # requests are checked before they reach the batch loop, a single bad point must not fail the other requests
+    values = {"easting": point.easting, "northing": point.northing, "floor_height": point.floor_height, "antenna_height": point.antenna_height}
+    for name, value in values.items():
+        if isinstance(value, bool) or not math.isfinite(value):
+            raise ValueError(f"Punkt {point.name}: {name} ist keine endliche Zahl")
+
+    min_easting, min_northing, max_easting, max_northing = LV95_EXTENT
+    if not (min_easting <= point.easting <= max_easting and min_northing <= point.northing <= max_northing):
+        raise ValueError(f"Punkt {point.name}: Koordinaten liegen ausserhalb von LV95 (Schweiz)")
+    if not HEIGHT_RANGE[0] <= point.floor_height <= HEIGHT_RANGE[1] or not 0 <= point.antenna_height <= 100:
+        raise ValueError(f"Punkt {point.name}: Höhe oder Antennenhöhe ausserhalb des gültigen Bereichs")
+    return
+
+
+class ServiceHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128 # bursts of concurrent clients are batched, not refused
+
+
+@dataclass
+class PlanRequest:
+    """
+    Points of one call of the service, completed by the batch loop.
+
+    Attributes
+    ----------
+    points : list[GNSS_Point]
+        Points to plan.
+
+    received : float
+        time.perf_counter() at arrival, for the latency.
+
+    horizons : list[tuple[list, list]] | None
+        (azimuths, elevation_angles) in gon per point, in the order of points.
+
+    error : str | None
+        Message if the request failed.
+    """
+    points: list[GNSS_Point]
+    received: float = field(default_factory=time.perf_counter)
+    horizons: list[tuple[list, list]] | None = None
+    error: str | None = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+
+@dataclass
+class ServiceMetrics:
+    """
+    Latency and throughput of the planning service since its start.
+
+    Attributes
+    ----------
+    latency_window : int
+        Number of recent requests the latency percentiles are computed from. Default 1000.
+
+    Methods
+    -------
+    record_request(request: PlanRequest) -> None:
+        Records a completed request.
+
+    record_batch(requests: int, points: int, unique_points: int, windows: int, seconds: float) -> None:
+        Records a processed batch.
+
+    get_summary() -> dict:
+        Returns the counters, latency percentiles [ms] and throughput [points/s].
+    """
+    latency_window: int = 1000
+    requests: int = 0
+    failed_requests: int = 0
+    points: int = 0
+    batches: int = 0
+    planned_points: int = 0
+    busy_seconds: float = 0.0
+    window_hits: int = 0
+    window_misses: int = 0
+
+    def __post_init__(self) -> None:
+        self.started = time.perf_counter()
+        self.latencies = deque(maxlen=self.latency_window)
+        self.lock = threading.Lock()
+
+    def record_request(self, request: PlanRequest) -> None:
+        with self.lock:
+            self.requests += 1
+            self.failed_requests += request.error is not None
+            self.points += len(request.points)
+            self.latencies.append(time.perf_counter() - request.received)
+        return
+
+    def record_batch(self, requests: int, points: int, unique_points: int, windows: int, seconds: float) -> None:
+        with self.lock:
+            self.batches += 1
+            self.planned_points += unique_points
+            self.busy_seconds += seconds
+        logger.info(json.dumps({"batch": self.batches, "requests": requests, "points": points, "unique_points": unique_points, "windows": windows, "seconds": seconds}))
+        return
+
+    def get_summary(self) -> dict:
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            uptime = time.perf_counter() - self.started
+            return {
+                "uptime_seconds": uptime,
+                "requests": self.requests,
+                "failed_requests": self.failed_requests,
+                "points": self.points,
+                "batches": self.batches,
+                "mean_batch_points": self.planned_points / self.batches if self.batches else 0.0,
+                "latency_ms": {name: float(np.percentile(latencies, q)) if len(latencies) else None for name, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))},
+                "throughput_points_per_second": self.points / uptime if uptime > 0 else 0.0,
+                "planning_points_per_second": self.planned_points / self.busy_seconds if self.busy_seconds > 0 else 0.0,
+                "window_hits": self.window_hits,
+                "window_misses": self.window_misses,
+            }
+
+
+@dataclass
+class PlanningService:
+    """
+    Plans points on request over a local HTTP/JSON interface, for other tools calling the planner.
+
+    The service keeps its state between requests: the merged DEM windows of the last analysis disks stay in memory
+    and the kernels are compiled at the start. Requests arriving within batch_window are collected into one batch,
+    the points of the batch are grouped by the DEM tiles of their analysis disk and every group is planned in one
+    call of the batched kernel on its window. Identical points of different requests are planned once.
+    Planning runs on the thread calling serve(), the HTTP requests are answered by daemon threads.
+
+    Endpoints
+    ---------
+    POST /plan : {"points": [{"name", "easting", "northing", "floor_height", "antenna_height"}, ...]}
+        Returns {"points": [{"name", "azimuths", "elevation_angles"}, ...]} in gon, in the order of the request.
+
+    GET /metrics : counters, latency percentiles and throughput (ServiceMetrics.get_summary).
+
+    GET /health : {"status": "ok"}.
+
+    Attributes
+    ----------
+    settings : PlanningSettings
+        Parameters of every planned point (distance, segment_resolution, number_of_lines, kernel, dem_storage).
+        Only the CONVENTIONAL method without refinement is served.
+
+    raster_directory : str
+        Project folder raster/, tiles are kept in raster/tiles (shared with LazyTileDEM) and the merged windows in
+        raster/service/<tiles>/raster.tif.
+
+    wms_url, data_url : str
+        Addresses of the tile services.
+
+    batch_window : float
+        Time the first request of a batch waits for further requests [seconds]. Default 0.02.
+
+    max_batch_points : int
+        A batch is closed early when it holds this many points. Default 256.
+
+    max_windows : int
+        Number of DEM windows kept in memory (least recently used ones are dropped). Default 4.
+
+    Methods
+    -------
+    serve(host: str, port: int) -> None:
+        Answers requests until interrupted (Ctrl+C).
+
+    plan(points: list[GNSS_Point]) -> list[tuple[list, list]]:
+        Submits points from another thread and waits for their horizons, raises RuntimeError if planning failed.
+
+    process_batch(requests: list[PlanRequest]) -> None:
+        Plans all points of the requests and completes them, every request gets its horizons or an error.
+
+    plan_requests(requests: list[PlanRequest]) -> tuple[int, int]:
+        Plans the points of the requests grouped by window, returns the number of unique points and windows.
+    """
+    settings: "PlanningSettings"
+    raster_directory: str
+    wms_url: str = WMS_URL
+    data_url: str = DATA_URL
+    batch_window: float = 0.02
+    max_batch_points: int = 256
+    max_windows: int = 4
+
+    def __post_init__(self) -> None:
+        if self.settings.method != 'CONVENTIONAL' or self.settings.refinement_threshold is not None:
+            raise ValueError("Der Dienst unterstützt nur die konventionelle Methode ohne Verfeinerung!")
+
+        self.kernel = 'NUMBA' if self.settings.kernel == 'POOL' else self.settings.kernel # batched kernel, no worker processes
+        self.tile_dem = LazyTileDEM(cache_folder=os.path.join(self.raster_directory, "tiles"), wms_url=self.wms_url, data_url=self.data_url)
+        self.requests = queue.Queue()
+        self.windows = OrderedDict() # tile keys -> (array, transform, scale, offset)
+        self.metrics = ServiceMetrics()
+        self.stopped = threading.Event()
+
+    def warm_up(self) -> None:
+        # compiles (or loads) the kernel for the data type of the windows before the first request
+        array = np.zeros((8, 8), dtype=STORAGE_DTYPES[self.settings.dem_storage])
+        max_elevation_angles_points(array=array, transform=rasterio.Affine(1, 0, 0, 0, -1, 8), eastings=np.array([4.0]), northings=np.array([4.0]), gnss_heights=np.array([1.0]), azimuths=get_azimuths(number_of_lines=4), line_length=2, number_of_segments=2, kernel=self.kernel)
+        return
+
+    def submit(self, points: list[GNSS_Point]) -> PlanRequest:
+        request = PlanRequest(points=points)
+        self.requests.put(request)
+        return request
+
+    def plan(self, points: list[GNSS_Point]) -> list[tuple[list, list]]:
+        request = self.submit(points=points)
+        request.done.wait()
+        if request.error is not None:
+            raise RuntimeError(request.error)
+        return request.horizons
+
+    def collect_batch(self, timeout: float = 0.5) -> list[PlanRequest]:
+        try:
+            batch = [self.requests.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+
+        points = len(batch[0].points)
+        deadline = time.perf_counter() + self.batch_window
+        while points < self.max_batch_points:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            points += len(request.points)
+        return batch
+
+    def run_batches(self) -> None:
+        while not self.stopped.is_set():
+            batch = self.collect_batch()
+            if batch:
+                self.process_batch(requests=batch)
+        return
+
+    def process_batch(self, requests: list[PlanRequest]) -> None:
+        start = time.perf_counter()
+        try:
+            unique_points, windows = self.plan_requests(requests=requests)
+        except Exception as error: # unexpected, every request of the batch reports it and the service keeps running
+            logger.exception("Stapel fehlgeschlagen")
+            unique_points, windows = 0, 0
+            for request in requests:
+                if request.horizons is None and request.error is None:
+                    request.error = str(error)
+
+        for request in requests:
+            request.done.set()
+            self.metrics.record_request(request=request)
+
+        self.metrics.record_batch(requests=len(requests), points=sum(len(request.points) for request in requests), unique_points=unique_points, windows=windows, seconds=time.perf_counter() - start)
+        return
+
+    def plan_requests(self, requests: list[PlanRequest]) -> tuple[int, int]:
+        # points sharing the tiles of their analysis disk share a window, identical points are planned once
+        groups = {}
+        for request in requests:
+            try:
+                request_groups = [(tuple(sorted(DiskTileSelector(points=[point], radius=self.settings.distance).get_tile_keys())), point) for point in request.points]
+            except Exception as error: # only this request fails
+                request.error = str(error)
+                continue
+            for tile_keys, point in request_groups:
+                groups.setdefault(tile_keys, {}).setdefault(tuple(get_point_record(point=point)), point)
+
+        horizons = {}
+        errors = {}
+        for tile_keys, points in groups.items():
+            try:
+                for record, horizon in zip(points, self.plan_group(tile_keys=tile_keys, points=list(points.values()))):
+                    horizons[record] = horizon
+            except Exception as error: # the service keeps running, the requests of the group report the error
+                errors.update({record: str(error) for record in points})
+
+        for request in requests:
+            if request.error is not None:
+                continue
+            records = [tuple(get_point_record(point=point)) for point in request.points]
+            failed = [errors[record] for record in records if record in errors]
+            if failed:
+                request.error = failed[0]
+            else:
+                request.horizons = [horizons[record] for record in records]
+        return sum(len(points) for points in groups.values()), len(groups)
+
+    def get_window(self, tile_keys: tuple[str, ...]) -> tuple[np.ndarray, rasterio.Affine, float, float]:
+        if tile_keys in self.windows:
+            self.windows.move_to_end(tile_keys)
+            self.metrics.window_hits += 1
+            return self.windows[tile_keys]
+        self.metrics.window_misses += 1
+
+        folder = os.path.join(self.raster_directory, "service", "-".join(tile_keys))
+        merged_path = os.path.join(folder, "raster.tif")
+        if not os.path.exists(merged_path):
+            # tiles on disk are reused like in LazyTileDEM, missing ones are downloaded
+            file_paths = [self.tile_dem.fetch_tile(i=int(tile_key.split("_")[0]), j=int(tile_key.split("_")[1])) for tile_key in tile_keys]
+            RasterMerger(path=folder, storage=self.settings.dem_storage, file_paths=file_paths).merge_raster()
+
+        with rasterio.open(merged_path) as src:
+            window = (src.read(1), src.transform, float(src.scales[0]), float(src.offsets[0]))
+
+        self.windows[tile_keys] = window
+        if len(self.windows) > self.max_windows:
+            self.windows.popitem(last=False)
+        return window
+
+    def plan_group(self, tile_keys: tuple[str, ...], points: list[GNSS_Point]) -> list[tuple[list, list]]:
+        array, transform, scale, offset = self.get_window(tile_keys=tile_keys)
+        number_of_lines = int(self.settings.number_of_lines)
+        line_length = self.settings.distance
+        number_of_segments = self.settings.get_number_of_segments()
+
+        # if segmentsize is smaller than the actual width of a cell -> segmentsize will be overwritten with cell size
+        if line_length / transform[0] < number_of_segments:
+            number_of_segments = int(line_length / transform[0])
+
+        eastings = np.array([point.easting for point in points], dtype=np.float64)
+        northings = np.array([point.northing for point in points], dtype=np.float64)
+        gnss_heights = np.array([point.floor_height + point.antenna_height for point in points], dtype=np.float64)
+        max_alphas = max_elevation_angles_points(array=array, transform=transform, eastings=eastings, northings=northings, gnss_heights=gnss_heights, azimuths=get_azimuths(number_of_lines=number_of_lines), line_length=line_length, number_of_segments=int(number_of_segments), kernel=self.kernel, scale=scale, offset=offset)
+
+        azimuths = [400 / number_of_lines * i for i in range(number_of_lines)]
+        return [(list(azimuths), list(angles * 200 / np.pi)) for angles in max_alphas]
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        self.warm_up()
+        self.server = ServiceHTTPServer((host, port), self.create_handler())
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            self.run_batches()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+        return
+
+    def stop(self) -> None:
+        self.stopped.set()
+        return
+
+    def create_handler(self) -> type:
+        service = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass # batches are logged by ServiceMetrics
+
+            def send_json(self, status: int, content: dict) -> None:
+                body = json.dumps(content).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                if self.path == "/metrics":
+                    self.send_json(200, service.metrics.get_summary())
+                elif self.path == "/health":
+                    self.send_json(200, {"status": "ok"})
+                else:
+                    self.send_json(404, {"error": "Unbekannter Pfad"})
+
+            def do_POST(self) -> None:
+                if self.path != "/plan":
+                    self.send_json(404, {"error": "Unbekannter Pfad"})
+                    return
+                try:
+                    content = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    points = [GNSS_Point(**point) for point in content["points"]]
+                    for point in points:
+                        validate_point(point=point)
+                except (ValueError, TypeError, KeyError) as error:
+                    self.send_json(400, {"error": f"Ungültige Anfrage: {error}"})
+                    return
+
+                request = service.submit(points=points)
+                request.done.wait()
+                if request.error is not None:
+                    self.send_json(422, {"error": request.error})
+                    return
+                self.send_json(200, {"points": [{"name": point.name, "azimuths": azimuths, "elevation_angles": elevation_angles} for point, (azimuths, elevation_angles) in zip(points, request.horizons)]})
+
+        return Handler
@@ -1,8 +1,6 @@
 from dataclasses import dataclass
 from backend.roughplanning.GNSS import GNSS_Session, GNSS_Point
 
-from PyQt5.QtWidgets import QTreeWidget, QTreeWidgetItem
-
 
 @dataclass
 class ReadPoints:
@@ -11,6 +9,8 @@ class ReadPoints:
         with open(path) as file:
             data = file.read().split("\n")
             for line in data:
+                if not line.strip(): # e.g. trailing newline
+                    continue
                 name, easting, northing, floorheight, antennaheight = line.split(",")
                 if name and easting and northing and floorheight and antennaheight:
                     gnss_session.add_point(GNSS_Point(name=str(name), easting=float(easting), northing=float(northing), floor_height=float(floorheight), antenna_height=float(antennaheight)))
@@ -20,7 +20,9 @@ class ReadPoints:
     
 @dataclass
 class WritePoints:
-    def write_table(self, session: GNSS_Session, target: QTreeWidget) -> None:
+    def write_table(self, session: GNSS_Session, target: "QTreeWidget") -> None:
+        from PyQt5.QtWidgets import QTreeWidgetItem # imported here, reading points must work without Qt (headless runs)
+
         for point in session.points:
             item = QTreeWidgetItem()
             item.setText(0, str(point.name))
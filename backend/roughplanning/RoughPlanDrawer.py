@@ -94,15 +94,21 @@ class RoughPlanDrawer:
         -------
         None
         """
+        # the horizon is drawn at its own azimuths (irregular after adaptive refinement) and closed at 400 gon
+        azimuths = np.asarray(azimuths, dtype=float)
+        elevation_angles = np.asarray(elevation_angles, dtype=float)
+        inside = azimuths < 400 # draw_panorama_diagram may have closed the lists already
+        order = np.argsort(azimuths[inside], kind='stable')
+        azimuths = azimuths[inside][order]
+        elevation_angles = elevation_angles[inside][order]
+        azimuths = np.append(azimuths, azimuths[0] + 400)
+        elevation_angles = np.append(elevation_angles, elevation_angles[0])
+
         # Convert azimuths and elevation angles to radians
-        azimuths_rad = np.deg2rad(np.array(azimuths) * 9 / 10)
-        elevation_angles_rad = (100 - np.array(elevation_angles)) * np.pi / 200
+        azimuths_rad = np.deg2rad(azimuths * 9 / 10)
+        elevation_angles_rad = (100 - elevation_angles) * np.pi / 200
         min_elevation_rad = (100 - min_elevation) * np.pi / 200
 
-        # Interpolation
-        interpolated_azimuths_rad = np.linspace(azimuths_rad[0], azimuths_rad[-1], 100)
-        interpolated_elevation_angles_rad = np.interp(interpolated_azimuths_rad, azimuths_rad, elevation_angles_rad)
-
         # Create a polar plot
         fig, ax = plt.subplots(subplot_kw={'projection': 'polar'})
 
@@ -111,13 +117,14 @@ class RoughPlanDrawer:
         ax.set_theta_direction(-1)  # Set the direction of the angles to clockwise
 
         # Plot the elevation angles
-        ax.plot(interpolated_azimuths_rad, interpolated_elevation_angles_rad, color='grey')
-        ax.fill_between(interpolated_azimuths_rad, interpolated_elevation_angles_rad, np.pi / 2, color='grey', alpha=0.5)
+        ax.plot(azimuths_rad, elevation_angles_rad, color='grey')
+        ax.fill_between(azimuths_rad, elevation_angles_rad, np.pi / 2, color='grey', alpha=0.5)
 
-        # Plot the cutoff line
-        cut_off_rad = np.full_like(interpolated_elevation_angles_rad, min_elevation_rad)
-        ax.plot(interpolated_azimuths_rad, cut_off_rad, color='red')
-        ax.fill_between(interpolated_azimuths_rad, cut_off_rad, np.pi / 2, color='red', alpha=0.5)
+        # Plot the cutoff line (a full circle, independent of the azimuths of the horizon)
+        circle_rad = np.linspace(0, 2 * np.pi, 361)
+        cut_off_rad = np.full_like(circle_rad, min_elevation_rad)
+        ax.plot(circle_rad, cut_off_rad, color='red')
+        ax.fill_between(circle_rad, cut_off_rad, np.pi / 2, color='red', alpha=0.5)
 
         # Customize the plot
         ax.set_ylim(0, np.pi / 2)  # Set the limit for the radial coordinate (0 to 100 gon)
@@ -182,6 +189,53 @@ class RoughPlanDrawer:
         return
     
     
+    def draw_dop_diagram(self, epochs: list, pdop: np.ndarray, hdop: np.ndarray, vdop: np.ndarray, satellites: np.ndarray, threshold: float, image_path: str, pointname: str) -> None:
+        """
+        Draws the DOP time series and the number of visible satellites of a point.
+
+        Parameters
+        ----------
+        epochs : list[datetime]
+            Epochs of the forecast (UTC).
+
+        pdop, hdop, vdop : np.ndarray
+            DOP values per epoch, NaN where less than 4 satellites are visible.
+
+        satellites : np.ndarray
+            Number of visible satellites per epoch.
+
+        threshold : float
+            PDOP threshold, drawn as horizontal line.
+
+        image_path : str
+            Path to save the diagram image.
+
+        pointname : str
+            Name of the point, used in the diagram title.
+        """
+        fig, (ax_dop, ax_sat) = plt.subplots(2, 1, sharex=True, figsize=(10, 6), gridspec_kw={'height_ratios': [2, 1]})
+
+        ax_dop.plot(epochs, pdop, color='black', label='PDOP')
+        ax_dop.plot(epochs, hdop, color='blue', label='HDOP')
+        ax_dop.plot(epochs, vdop, color='green', label='VDOP')
+        ax_dop.axhline(threshold, color='red', label=f'Grenzwert PDOP {threshold:g}')
+        ax_dop.set_ylim([0, max(2 * threshold, 1)])
+        ax_dop.set_ylabel('DOP')
+        ax_dop.set_title(f'DOP {pointname}')
+        ax_dop.legend(loc='upper right')
+        ax_dop.grid(True)
+
+        ax_sat.step(epochs, satellites, color='grey', where='post')
+        ax_sat.set_ylabel('Anzahl Satelliten')
+        ax_sat.set_xlabel('Zeit [UTC]')
+        ax_sat.grid(True)
+
+        fig.autofmt_xdate()
+        fig.savefig(image_path)
+        plt.close(fig)  # Close the figure to release memory
+
+        return
+
     def draw_polar_preview(self, num_lines, min_elevation, line_length):
         """
         Draw a polar diagram with radial lines and axis labels in cardinal directions.
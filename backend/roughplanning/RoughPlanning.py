@@ -4,15 +4,18 @@ Code by Fabian Rüfenacht.
 Codedocumentation assisted by ChatGPT version 3.5
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Literal, List
 import rasterio
 import numpy as np
 import rasterio.transform
-from multiprocessing import Pool
 
 from backend.roughplanning.GNSS import GNSS_Point
 from backend.roughplanning.ObjectDefinition import TransformParam, Point2D, Line2D, PointLineSegment, Profile
+from backend.roughplanning.DEM import RasterDEM, LazyTileDEM, HybridDEM
+from backend.roughplanning.HorizonRaster import HorizonRaster
+from backend.roughplanning.Horizon import max_elevation_angles, max_elevation_angles_heights, get_azimuths
+from backend.roughplanning.Executor import Executor
 
 def process_line(args):
     self, line, number_of_segments = args
@@ -22,6 +25,12 @@ def process_line(args):
     max_alpha = self.get_max_angle(profile=profile)  # get maximal elevation angle for each line
     return max_alpha * 200 / np.pi  # return elevation angle
 
+def process_line_heights(args):
+    self, line, number_of_segments, gnss_heights = args
+    segments = self.segment_line(number_of_segments=number_of_segments, line=line)  # segment per line
+    max_alphas = self.get_max_angles_heights(line_points=segments, gnss_heights=gnss_heights)  # maximal elevation angle per height
+    return max_alphas * 200 / np.pi  # return elevation angles
+
 @dataclass
 class RoughPlanning:
     """
@@ -38,6 +47,18 @@ class RoughPlanning:
     method : Literal['RANSAC', 'CONVENTIONAL']
         Method for rough planning: RANSAC or CONVENTIONAL.
 
+    dem_provider : RasterDEM | LazyTileDEM | HybridDEM | None
+        Provider used to sample heights. Default None -> RasterDEM reading dem_path.
+
+    horizon_raster : HorizonRaster | None
+        Precomputed horizons. Points inside it are answered by interpolation instead of ray casting
+        (CONVENTIONAL without refinement, only if number_of_lines, line_length and the segments match the raster).
+        Default None.
+
+    executor : Executor
+        Runs the lines of the POOL kernel (serial, threads or processes, sized from the CPUs and the DEM memory).
+        Default Executor() -> backend from GNSS_PLANNER_EXECUTOR, processes otherwise.
+
     Methods
     -------
     __post_init__()
@@ -46,6 +67,12 @@ class RoughPlanning:
     plan() -> None:
         Performs rough planning based on the selected method ('RANSAC' or 'CONVENTIONAL').
 
+    plan_antenna_heights(antenna_heights: list[float], number_of_lines: int, line_length: float | int, number_of_segments: int) -> dict[float, tuple[list, list]]:
+        Computes the horizon for several antenna heights from one traversal of the DEM.
+
+    get_dem() -> RasterDEM | LazyTileDEM:
+        Returns the DEM provider used for sampling heights.
+
     read_raster() -> TransformParam:
         Reads and returns transformation parameters from the digital elevation model (DEM).
 
@@ -87,6 +114,9 @@ class RoughPlanning:
     point: GNSS_Point
     dem_path: str
     method: Literal['RANSAC', 'CONVENTIONAL']
+    dem_provider: RasterDEM | LazyTileDEM | HybridDEM | None = None
+    horizon_raster: HorizonRaster | None = None
+    executor: Executor = field(default_factory=Executor)
 
     def __post_init__(self) -> None:
         """
@@ -94,16 +124,23 @@ class RoughPlanning:
         """
         GNSS_Point._validate_type('point', self.point, GNSS_Point)
 
+        if self.dem_provider is None:
+            self.dem_provider = RasterDEM(path=self.dem_path)
+
 # ------------------------------------------------- Main Entry -------------------------------------------------
 
-    def plan(self, number_of_lines: float | int, line_length: float | int, number_of_segments: float | int) -> None:
+    def plan(self, number_of_lines: float | int, line_length: float | int, number_of_segments: float | int, kernel: Literal['POOL', 'NUMPY', 'NUMBA'] = 'POOL', refinement_threshold: float | None = None, refinement_depth: int = 4) -> None:
         """
         Main entry point --> performs analysis with RANSAC or CONVENTIONAL based on Initialisation of class RoughPlanning.
+
+        kernel selects how CONVENTIONAL is computed: POOL processes the lines in a multiprocessing pool, NUMPY and NUMBA
+        use the array kernels of Horizon (NUMBA falls back to NUMPY if numba is not installed).
+        If refinement_threshold [gon] is set, number_of_lines is the coarse fan of the adaptive mode (see plan_adaptive).
         """
         if self.method == 'RANSAC':
             azimuths, elevation_angles = self.plan_ransac()
         elif self.method == 'CONVENTIONAL':
-            azimuths, elevation_angles = self.plan_conventional(number_of_lines=number_of_lines, line_length=line_length, number_of_segments=number_of_segments)
+            azimuths, elevation_angles = self.plan_conventional(number_of_lines=number_of_lines, line_length=line_length, number_of_segments=number_of_segments, kernel=kernel, refinement_threshold=refinement_threshold, refinement_depth=refinement_depth)
         else:
             raise AttributeError("Unsupported method. Use 'RANSAC' or 'CONVENTIONAL'!")
         
@@ -112,29 +149,140 @@ class RoughPlanning:
 
 # ------------------------------------------------ CONVENTIONAL ------------------------------------------------
 
-    def plan_conventional(self, number_of_lines: float | int, line_length: float | int, number_of_segments: float | int) -> tuple:
+    def plan_conventional(self, number_of_lines: float | int, line_length: float | int, number_of_segments: float | int, kernel: Literal['POOL', 'NUMPY', 'NUMBA'] = 'POOL', refinement_threshold: float | None = None, refinement_depth: int = 4) -> tuple:
         """
         Entrypoint for CONVENTIONAL method.
         """
-        transformation: TransformParam = self.read_raster()
-        pix_size: float = transformation.pix_size_u  # pixel-size for transformation of line
+        pix_size: float = self.get_dem().get_pixel_size()  # pixel-size for transformation of line
 
         # if segmentsize is smaller than the actual width of a cell -> segmentsize will be overwritten with cell size
         if line_length / pix_size < number_of_segments:
-            number_of_segments = line_length / pix_size
+            number_of_segments = int(line_length / pix_size)
+
+        # the horizon raster only answers for the parameters it was built with, ray casting otherwise
+        if self.horizon_raster is not None and refinement_threshold is None and self.horizon_raster.matches(number_of_lines=number_of_lines, line_length=line_length, number_of_segments=number_of_segments) and self.horizon_raster.contains(easting=self.point.easting, northing=self.point.northing):
+            return self.horizon_raster.lookup(easting=self.point.easting, northing=self.point.northing, gnss_height=self.point.floor_height + self.point.antenna_height)
 
-        # get lines, azimuths and initialize elevation angles
-        lines = self.create_lines(number_of_lines=number_of_lines, line_length=line_length)
+        if refinement_threshold is not None:
+            return self.plan_adaptive(number_of_lines=number_of_lines, line_length=line_length, number_of_segments=number_of_segments, kernel=kernel, threshold=refinement_threshold, max_depth=refinement_depth)
+
+        # get azimuths and elevation angles
         azimuths = [400 / number_of_lines * i for i in range(number_of_lines)]
+        elevation_angles = self.get_elevation_angles(azimuths=list(get_azimuths(number_of_lines=number_of_lines)), line_length=line_length, number_of_segments=number_of_segments, kernel=kernel)
+
+        return (azimuths, elevation_angles)
+
+    def plan_adaptive(self, number_of_lines: int, line_length: float | int, number_of_segments: int, kernel: Literal['POOL', 'NUMPY', 'NUMBA'], threshold: float, max_depth: int) -> tuple:
+        """
+        Computes the horizon on a coarse fan of number_of_lines azimuths and bisects only the azimuth intervals
+        whose neighbouring elevation angles differ by more than threshold.
+
+        Parameters
+        ----------
+        threshold : float
+            Maximal difference [gon] of the elevation angles of two neighbouring azimuths before the interval is bisected.
+
+        max_depth : int
+            Maximal number of bisections of an interval of the coarse fan.
+
+        Returns
+        -------
+        tuple
+            (azimuths, elevation_angles) in gon, azimuths sorted but irregularly spaced.
+        """
+        azimuths = list(get_azimuths(number_of_lines=number_of_lines))
+        elevation_angles = self.get_elevation_angles(azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments, kernel=kernel)
+
+        for _ in range(max_depth):
+            # neighbour of the last azimuth is the first one (full circle)
+            next_azimuths = azimuths[1:] + [2 * np.pi]
+            next_angles = elevation_angles[1:] + elevation_angles[:1]
+            midpoints = [(azimuth + next_azimuth) / 2 for azimuth, next_azimuth, angle, next_angle in zip(azimuths, next_azimuths, elevation_angles, next_angles) if abs(angle - next_angle) > threshold]
+            if not midpoints:
+                break
+
+            # all new azimuths of a level in one batch
+            midpoint_angles = self.get_elevation_angles(azimuths=midpoints, line_length=line_length, number_of_segments=number_of_segments, kernel=kernel)
+            horizon = sorted(zip(azimuths + midpoints, elevation_angles + midpoint_angles))
+            azimuths = [azimuth for azimuth, _ in horizon]
+            elevation_angles = [angle for _, angle in horizon]
+
+        return ([azimuth * 200 / np.pi for azimuth in azimuths], elevation_angles)
+
+    def get_elevation_angles(self, azimuths: list[float], line_length: float | int, number_of_segments: int, kernel: Literal['POOL', 'NUMPY', 'NUMBA'] = 'POOL') -> list[float]:
+        """
+        Computes the elevation angles [gon] of the lines at the given azimuths [rad].
+        """
+        # array kernels need the whole DEM in memory, tiles fetched on demand are processed line by line
+        if kernel != 'POOL' and isinstance(self.get_dem(), RasterDEM):
+            return self.plan_kernel(azimuths=azimuths, line_length=line_length, number_of_segments=number_of_segments, kernel=kernel)
+
+        lines = self.create_lines(number_of_lines=len(azimuths), line_length=line_length, azimuths=azimuths)
         
         # Prepare arguments for process_line
         args = [(self, line, number_of_segments) for line in lines]
 
-        # Use multiprocessing to process lines in parallel
-        with Pool() as pool:
-            elevation_angles = pool.map(process_line, args)
+        # process lines in parallel, every worker process holds its own copy of the DEM
+        elevation_angles = self.executor.map(process_line, args, worker_memory=self.get_dem().get_memory_size())
 
-        return (azimuths, elevation_angles)
+        return elevation_angles
+
+    def plan_kernel(self, azimuths: list[float], line_length: float | int, number_of_segments: int, kernel: Literal['NUMPY', 'NUMBA']) -> list[float]:
+        """
+        Computes the elevation angles [gon] of the lines at the given azimuths [rad] with an array kernel of Horizon on the DEM in memory.
+        """
+        array, transform = self.get_dem().get_array()
+        scale, offset = self.get_dem().get_scale_offset()
+
+        # Height of GNSS at its position to calculate height difference between itself and the terrain-points
+        gnss_height = self.point.floor_height + self.point.antenna_height
+        max_alphas = max_elevation_angles(array=array, transform=transform, easting=self.point.easting, northing=self.point.northing, gnss_height=gnss_height, number_of_lines=len(azimuths), line_length=line_length, number_of_segments=int(number_of_segments), kernel=kernel, azimuths=np.array(azimuths), scale=scale, offset=offset)
+
+        return list(max_alphas * 200 / np.pi)
+
+    def plan_antenna_heights(self, antenna_heights: list[float], number_of_lines: int, line_length: float | int, number_of_segments: int, kernel: Literal['POOL', 'NUMPY', 'NUMBA'] = 'POOL') -> dict[float, tuple[list, list]]:
+        """
+        Computes the horizon (CONVENTIONAL) for several antenna heights at once, e.g. tripod vs. mast.
+
+        The terrain heights and distances of the samples are shared by all antenna heights, so the DEM is
+        traversed once and only the reduction to elevation angles is done per height.
+
+        Parameters
+        ----------
+        antenna_heights : list[float]
+            Antenna heights above floor_height [Meters]. The antenna_height of the point is ignored.
+
+        Returns
+        -------
+        dict[float, tuple[list, list]]
+            (azimuths, elevation_angles) in gon per antenna height.
+        """
+        if not antenna_heights:
+            raise ValueError("Mindestens eine Antennenhöhe angeben!")
+
+        pix_size: float = self.get_dem().get_pixel_size()  # pixel-size for transformation of line
+
+        # if segmentsize is smaller than the actual width of a cell -> segmentsize will be overwritten with cell size
+        if line_length / pix_size < number_of_segments:
+            number_of_segments = int(line_length / pix_size)
+
+        gnss_heights = [self.point.floor_height + antenna_height for antenna_height in antenna_heights]
+        azimuths = get_azimuths(number_of_lines=number_of_lines)
+
+        if kernel != 'POOL' and isinstance(self.get_dem(), RasterDEM):
+            array, transform = self.get_dem().get_array()
+            scale, offset = self.get_dem().get_scale_offset()
+            max_alphas = max_elevation_angles_heights(array=array, transform=transform, easting=self.point.easting, northing=self.point.northing, gnss_heights=gnss_heights, azimuths=azimuths, line_length=line_length, number_of_segments=int(number_of_segments), kernel=kernel, scale=scale, offset=offset)
+            elevation_angles = max_alphas * 200 / np.pi
+        else:
+            lines = self.create_lines(number_of_lines=number_of_lines, line_length=line_length, azimuths=list(azimuths))
+            args = [(self, line, number_of_segments, gnss_heights) for line in lines]
+
+            # process lines in parallel, every worker process holds its own copy of the DEM
+            elevation_angles = np.array(self.executor.map(process_line_heights, args, worker_memory=self.get_dem().get_memory_size())).T # heights x lines
+
+        azimuths_gon = [400 / number_of_lines * i for i in range(number_of_lines)]
+        return {antenna_height: (list(azimuths_gon), list(angles)) for antenna_height, angles in zip(antenna_heights, elevation_angles)}
         
     def read_raster(self) -> TransformParam:
         """
@@ -184,9 +332,19 @@ class RoughPlanning:
 
         # create line-element
         line_points = [PointLineSegment(easting=line.start_point.easting + e, northing=line.start_point.northing + n, distance_from_start=np.sqrt(e**2 + n**2)) for e, n in zip(easting_line, northing_line)]
+
+        # coarse DEM beyond the near radius: one sample per coarse pixel is enough
+        if isinstance(self.get_dem(), HybridDEM):
+            line_points = self.get_dem().thin_samples(line_points=line_points)
         return line_points
 
-    def transform_linesegments(self, line_points: list[PointLineSegment]) -> None:
+    def get_dem(self) -> RasterDEM | LazyTileDEM | HybridDEM:
+        """
+        Returns the DEM provider used for sampling heights.
+        """
+        return self.dem_provider
+
+    def transform_linesegments(self, line_points: list[PointLineSegment], chunk_size: int = 64) -> None:
         """
         Transforms a list of PointLineSegment objects by calculating their height and elevation angle based on raster data.
 
@@ -195,37 +353,105 @@ class RoughPlanning:
         line_points : List[PointLineSegment]
             A list of PointLineSegment objects representing points along a line.
 
+        chunk_size : int
+            Number of points sampled at once. Default 64.
+
         Returns
         -------
         None
 
         Notes
         -----
-        This method requires a raster file to be read beforehand to establish the transformation parameters.
+        The heights are sampled chunk by chunk from the DEM provider.
         The transformation updates the height_difference and elevation_angle attributes of each PointLineSegment object in place.
+        If the provider knows an upper bound of its heights (max_height), sampling stops as soon as no remaining point
+        can exceed the current maximal elevation angle. With a max-height pyramid, points whose pyramid cell cannot
+        exceed the current maximal elevation angle are skipped as well. The unevaluated points are removed from
+        line_points in place, the maximal elevation angle of the line is unchanged by this.
         """
-        # get transformer Object (own implementation) -> create transformation Object (rasterio implementation) -> create transformer Object to apply on coord (rasterio implementation)
-        transform = self.read_raster()
-        transform = rasterio.Affine(
-                            transform.pix_size_u,
-                            transform.shear_u,
-                            transform.translate_e,
-                            transform.shear_v,
-                            transform.pix_size_v,
-                            transform.translate_n
-                        )
-        transformer = rasterio.transform.AffineTransformer(transform)
-
-        # iterate over each point of the delivered line, get pixel-value and make calcs (next comment)
-        for idx, line_point in enumerate(line_points):
-            index = transformer.rowcol(xs=line_points[idx].easting, ys=line_points[idx].northing)
-            # works  so far
-        
+        dem = self.get_dem()
+        block_sizes = dem.get_pyramid_block_sizes()
+
+        # Height of GNSS at its position to calculate height difference between itself and the terrain-points
+        gnss_height = self.point.floor_height + self.point.antenna_height
+        max_alpha = -np.pi / 2
+        evaluated = []
+
+        for start in range(0, len(line_points), chunk_size):
+            # early-out: even a point at max_height at the next distance cannot beat the current angle
+            if dem.max_height is not None and start > 0:
+                bound = np.arctan((dem.max_height - gnss_height) / line_points[start].distance_from_start)
+                if bound <= max_alpha:
+                    break
+
+            chunk = line_points[start:start + chunk_size]
+            eastings = np.array([line_point.easting for line_point in chunk])
+            northings = np.array([line_point.northing for line_point in chunk])
+            distances = np.array([line_point.distance_from_start for line_point in chunk])
+
+            # max-height pyramid: coarse to fine, only keep points whose block could exceed the current angle
+            keep = np.ones(len(chunk), dtype=bool)
+            for block_size in block_sizes:
+                block_heights = dem.sample_max(eastings=eastings[keep], northings=northings[keep], block_size=block_size)
+                keep[keep] = np.arctan((block_heights - gnss_height) / distances[keep]) > max_alpha
+                if not keep.any():
+                    break
+            if not keep.any():
+                continue
+
+            chunk = [line_point for line_point, use in zip(chunk, keep) if use]
+            heights = dem.sample(eastings=eastings[keep], northings=northings[keep])
+
             # make calcs -> update height and elevation-angle information in PointLineSegment-Object
-            self.get_raster_height(index=index, line_point=line_point)
-                    
+            for line_point, pixel_value in zip(chunk, heights):
+                line_point.update_height(new_height=pixel_value - gnss_height)
+                max_alpha = max(max_alpha, line_point.elevation_angle)
+            evaluated += chunk
+
+        line_points[:] = evaluated
         return
 
+    def get_max_angles_heights(self, line_points: list[PointLineSegment], gnss_heights: list[float], chunk_size: int = 64) -> np.ndarray:
+        """
+        Returns the maximal elevation angle [rad] of a line per GNSS height, sampling every point of the line at most once.
+
+        The early-out and the max-height pyramid of transform_linesegments are applied as long as any height could
+        still get a larger angle.
+        """
+        dem = self.get_dem()
+        block_sizes = dem.get_pyramid_block_sizes()
+
+        gnss_heights = np.asarray(gnss_heights, dtype=np.float64)[:, None]
+        max_alphas = np.full((len(gnss_heights), 1), -np.pi / 2)
+
+        for start in range(0, len(line_points), chunk_size):
+            # early-out: even a point at max_height at the next distance cannot beat the current angle of any height
+            if dem.max_height is not None and start > 0:
+                bounds = np.arctan((dem.max_height - gnss_heights) / line_points[start].distance_from_start)
+                if (bounds <= max_alphas).all():
+                    break
+
+            chunk = line_points[start:start + chunk_size]
+            eastings = np.array([line_point.easting for line_point in chunk])
+            northings = np.array([line_point.northing for line_point in chunk])
+            distances = np.array([line_point.distance_from_start for line_point in chunk])
+
+            # max-height pyramid: only keep points whose block could exceed the current angle of any height
+            keep = np.ones(len(chunk), dtype=bool)
+            for block_size in block_sizes:
+                block_heights = dem.sample_max(eastings=eastings[keep], northings=northings[keep], block_size=block_size)
+                keep[keep] = (np.arctan((block_heights - gnss_heights) / distances[keep]) > max_alphas).any(axis=0)
+                if not keep.any():
+                    break
+            if not keep.any():
+                continue
+
+            heights = dem.sample(eastings=eastings[keep], northings=northings[keep])
+            alphas = np.arctan((heights - gnss_heights) / distances[keep])
+            max_alphas = np.fmax(max_alphas, np.nanmax(alphas, axis=1, keepdims=True))
+
+        return max_alphas[:, 0]
+
     def get_raster_height(self, index: tuple[float, float], line_point: PointLineSegment) -> None:
         """
         Retrieves the height information from a raster file at a specified index and updates a PointLineSegment object.
@@ -262,7 +488,7 @@ class RoughPlanning:
                 raise EOFError(f"Expansion DEM not sufficient!{width} {index[0]} {height} {index[1]}")
 
             # read value of pixel on first (1) band
-            pixel_value = src.read(1)[index]
+            pixel_value = src.read(1)[index] * src.scales[0] + src.offsets[0]
 
             # Height of GNSS at its position to calculate height difference between itself and the terrain-points
             gnss_height = self.point.floor_height + self.point.antenna_height
@@ -284,7 +510,7 @@ class RoughPlanning:
 
 # --------------------------------------------------- shared ---------------------------------------------------
   
-    def create_lines(self, number_of_lines: int, line_length: float) -> List[Line2D]:
+    def create_lines(self, number_of_lines: int, line_length: float, azimuths: list[float] | None = None) -> List[Line2D]:
         """
         Creates multiple lines originating from a GNSS position (center_point) in different azimuth directions.
 
@@ -296,6 +522,9 @@ class RoughPlanning:
         line_length : float
             Length of each line in meters.
 
+        azimuths : list[float] | None
+            Azimuths [rad] of the lines. Default None -> number_of_lines uniformly spaced azimuths.
+
         Returns
         -------
         List[Line2D]
@@ -318,7 +547,8 @@ class RoughPlanning:
         center_point = Point2D(easting=self.point.get_easting(), northing=self.point.get_northing())
 
         # calculate azimuths based on the number of lines
-        azimuths = [2 * np.pi / number_of_lines * i for i in range(number_of_lines)]
+        if azimuths is None:
+            azimuths = [2 * np.pi / number_of_lines * i for i in range(number_of_lines)]
 
         # calculate partial distances (easting and northing) for each line
         delta_easts = [line_length * np.sin(azimuth) for azimuth in azimuths]
@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+import json
+import os
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.HorizonCache import create_entry, get_point_record
+
+RUN_JOURNAL_VERSION = 1
+
+
+@dataclass
+class RunJournal:
+    """
+    Append-only journal of a planning run, one JSON line per finished point.
+
+    The first line holds the parameters of the run. Every point is written and synced to disk as soon as its
+    horizon is known, so a run interrupted by a crash or power loss can be resumed: completed points are read
+    back and only the remaining points are planned.
+
+    Attributes
+    ----------
+    path : str
+        Journal file (e.g. results/journal.jsonl).
+
+    Methods
+    -------
+    start(parameters: dict, resume: bool) -> dict[str, dict]:
+        Starts a new journal or, with resume, returns the completed points of the existing one by name. A missing or
+        empty journal (interrupted while the header was written) is started anew.
+
+    read_header() -> dict | None:
+        Returns the first line of the journal, None if there is no complete one.
+
+    matches(parameters: dict) -> bool:
+        Checks whether the journal was written by a run with these parameters and can be resumed.
+
+    get_completed(point: GNSS_Point) -> dict | None:
+        Returns the journal entry of a point completed before the resume, None if it has to be planned.
+
+    append(point: GNSS_Point, azimuths: list, elevation_angles: list, horizons_per_height: dict | None) -> None:
+        Records a finished point.
+    """
+    path: str
+
+    def start(self, parameters: dict, resume: bool = False) -> dict[str, dict]:
+        parameters = json.loads(json.dumps(parameters))
+        self.completed = {}
+
+        if resume and self.read_header() is not None:
+            self.completed = self.read(parameters=parameters)
+            return self.completed
+
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"version": RUN_JOURNAL_VERSION, "parameters": parameters}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return self.completed
+
+    def read_header(self) -> dict | None:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r") as f:
+            line = f.readline()
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError:
+            # empty or cut off, no point was recorded before the header was complete
+            return None
+
+    def matches(self, parameters: dict) -> bool:
+        header = self.read_header() or {}
+        return header.get("version") == RUN_JOURNAL_VERSION and header.get("parameters") == json.loads(json.dumps(parameters))
+
+    def read(self, parameters: dict) -> dict[str, dict]:
+        with open(self.path, "r") as f:
+            lines = f.read().splitlines()
+
+        if not self.matches(parameters=parameters):
+            raise ValueError("Das Journal wurde mit anderen Parametern erstellt, Fortsetzen nicht möglich!")
+
+        completed = {}
+        for line_idx, line in enumerate(lines[1:], start=1):
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # last line cut off by the interruption, removed so new points are appended after a complete line
+                with open(self.path, "w") as f:
+                    f.write("\n".join(lines[:line_idx]) + "\n")
+                break
+            completed[entry["name"]] = entry
+        return completed
+
+    def get_completed(self, point: GNSS_Point) -> dict | None:
+        entry = self.completed.get(point.name)
+        if entry is None or entry["point"] != get_point_record(point=point):
+            return None
+        return entry
+
+    def append(self, point: GNSS_Point, azimuths: list, elevation_angles: list, horizons_per_height: dict | None = None) -> None:
+        entry = {"name": point.name, **create_entry(point=point, azimuths=azimuths, elevation_angles=elevation_angles, horizons_per_height=horizons_per_height)}
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return
@@ -0,0 +1,250 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+import csv
+import math
+
+import numpy as np
+
+from backend.roughplanning.DOP import DOPSeries
+
+@dataclass
+class Occupation:
+    """
+    A point occupied by a receiver.
+
+    Attributes
+    ----------
+    point : str
+        Point name.
+
+    receiver : int
+        Receiver number (1-based).
+
+    start, end : datetime
+        Time window of the occupation (UTC).
+    """
+    point: str
+    receiver: int
+    start: datetime
+    end: datetime
+
+
+@dataclass
+class ObservationScheduler:
+    """
+    Proposes which point is occupied by which receiver when, so that every occupation lies in a window with
+    good satellite geometry (PDOP <= threshold and enough satellites during the whole occupation).
+
+    A greedy list scheduler assigns the next point to the receiver that becomes free first, taking the point whose
+    next feasible window starts earliest (the least flexible one on ties). A local search then moves points away
+    from the receiver finishing last as long as this shortens the session. Feasible start epochs are precomputed
+    per point, so evaluating a start is a lookup and hundreds of points over several days stay cheap.
+
+    Attributes
+    ----------
+    dops : dict[str, DOPSeries]
+        DOP time series per point name.
+
+    epochs : list[datetime]
+        Epochs of the DOP time series, equally spaced.
+
+    receivers : int
+        Number of receivers.
+
+    occupation : float
+        Minimal occupation time per point [minutes].
+
+    changeover : float
+        Time between two occupations of a receiver (dismantling, transfer, set-up) [minutes]. Default 0.
+
+    pdop_threshold : float
+        Maximal PDOP during an occupation. Default 6.
+
+    min_satellites : int
+        Minimal number of visible satellites during an occupation. Default 4.
+
+    max_iterations : int
+        Maximal number of improving moves of the local search. Default 1000.
+
+    Methods
+    -------
+    schedule() -> list[Occupation]:
+        Returns the occupations sorted by receiver and start.
+
+    get_unscheduled() -> list[str]:
+        Returns the points without a feasible occupation in the last schedule.
+
+    write_timetable(path: str) -> None:
+        Writes the last schedule as CSV.
+    """
+    dops: dict[str, DOPSeries]
+    epochs: list[datetime]
+    receivers: int
+    occupation: float
+    changeover: float = 0
+    pdop_threshold: float = 6.0
+    min_satellites: int = 4
+    max_iterations: int = 1000
+    sequences: list[list[int]] = field(default_factory=list, init=False)
+    unscheduled: list[int] = field(default_factory=list, init=False)
+
+    def __post_init__(self) -> None:
+        if self.receivers < 1:
+            raise ValueError("Mindestens ein Empfänger wird benötigt!")
+        if len(self.epochs) < 2:
+            raise ValueError("Mindestens zwei Epochen werden benötigt!")
+
+        self.names = list(self.dops)
+        step = (self.epochs[1] - self.epochs[0]).total_seconds() / 60
+        self.occupation_epochs = max(1, math.ceil(self.occupation / step))
+        self.changeover_epochs = math.ceil(self.changeover / step)
+        self.next_start, self.flexibility = self.get_feasible_starts()
+
+    def get_feasible_starts(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns for every point and epoch t the first feasible start >= t (number of epochs if none) and the number of feasible starts >= t.
+        """
+        number_of_epochs = len(self.epochs)
+        next_start = np.full((len(self.names), number_of_epochs + 1), number_of_epochs)
+        flexibility = np.zeros((len(self.names), number_of_epochs + 1), dtype=int)
+
+        for point_idx, name in enumerate(self.names):
+            dop = self.dops[name]
+            good = (np.nan_to_num(dop.pdop, nan=np.inf) <= self.pdop_threshold) & (dop.satellites >= self.min_satellites)
+
+            # feasible start: all epochs of the occupation are good
+            counts = np.concatenate(([0], np.cumsum(good)))
+            feasible = np.zeros(number_of_epochs, dtype=bool)
+            if number_of_epochs >= self.occupation_epochs:
+                feasible[:number_of_epochs - self.occupation_epochs + 1] = counts[self.occupation_epochs:] - counts[:-self.occupation_epochs] == self.occupation_epochs
+
+            starts = np.where(feasible, np.arange(number_of_epochs), number_of_epochs)
+            next_start[point_idx, :-1] = np.minimum.accumulate(starts[::-1])[::-1]
+            flexibility[point_idx, :-1] = np.cumsum(feasible[::-1])[::-1]
+
+        return (next_start, flexibility)
+
+    def simulate(self, sequence: list[int], bound: int | None = None) -> tuple[list[int], int] | None:
+        """
+        Returns the start epochs of a receiver's sequence and the epoch it is free again, None if a point does not fit
+        (or the receiver would be busy beyond bound).
+        """
+        number_of_epochs = len(self.epochs)
+        free = 0
+        starts = []
+        for point_idx in sequence:
+            start = self.next_start[point_idx, min(free, number_of_epochs)]
+            if start >= number_of_epochs:
+                return None
+            starts.append(int(start))
+            free = start + self.occupation_epochs + self.changeover_epochs
+            if bound is not None and free > bound:
+                return None
+        return (starts, int(free))
+
+    def get_cost(self, ends: list[int]) -> tuple[int, int]:
+        # makespan first, then the sum of all finishing times (frees receivers early)
+        return (max(ends), sum(ends))
+
+    def schedule(self) -> list[Occupation]:
+        self.sequences, self.unscheduled = self.schedule_greedy()
+        self.improve()
+        return self.get_occupations()
+
+    def schedule_greedy(self) -> tuple[list[list[int]], list[int]]:
+        number_of_epochs = len(self.epochs)
+        sequences = [[] for _ in range(self.receivers)]
+        free = np.zeros(self.receivers, dtype=int)
+        active = np.ones(self.receivers, dtype=bool)
+        remaining = np.ones(len(self.names), dtype=bool)
+
+        while remaining.any() and active.any():
+            receiver = int(np.argmin(np.where(active, free, np.iinfo(int).max)))
+            time = min(int(free[receiver]), number_of_epochs)
+
+            starts = np.where(remaining, self.next_start[:, time], number_of_epochs)
+            if starts.min() >= number_of_epochs:
+                active[receiver] = False # nothing fits on this receiver anymore
+                continue
+
+            # earliest start, least flexible point on ties
+            candidates = np.flatnonzero(starts == starts.min())
+            point_idx = int(candidates[np.argmin(self.flexibility[candidates, time])])
+
+            sequences[receiver].append(point_idx)
+            remaining[point_idx] = False
+            free[receiver] = starts[point_idx] + self.occupation_epochs + self.changeover_epochs
+
+        return (sequences, [int(point_idx) for point_idx in np.flatnonzero(remaining)])
+
+    def improve(self) -> None:
+        """
+        Local search: inserts unscheduled points where they fit and relocates points of the receiver finishing last.
+        """
+        for _ in range(self.max_iterations):
+            if not self.insert_unscheduled() and not self.relocate_last():
+                break
+        return
+
+    def insert_unscheduled(self) -> bool:
+        for point_idx in self.unscheduled:
+            for receiver, sequence in enumerate(self.sequences):
+                for position in range(len(sequence) + 1):
+                    candidate = sequence[:position] + [point_idx] + sequence[position:]
+                    if self.simulate(candidate) is not None:
+                        self.sequences[receiver] = candidate
+                        self.unscheduled.remove(point_idx)
+                        return True
+        return False
+
+    def relocate_last(self) -> bool:
+        ends = [self.simulate(sequence)[1] for sequence in self.sequences]
+        cost = self.get_cost(ends)
+        last = int(np.argmax(ends))
+
+        for position, point_idx in enumerate(self.sequences[last]):
+            shortened = self.sequences[last][:position] + self.sequences[last][position + 1:]
+            shortened_end = self.simulate(shortened)
+            if shortened_end is None:
+                continue
+
+            for receiver in range(self.receivers):
+                target = shortened if receiver == last else self.sequences[receiver]
+                for insert in range(len(target) + 1):
+                    if receiver == last and insert == position:
+                        continue
+                    # a receiver busy beyond the current makespan cannot improve the schedule
+                    extended = self.simulate(target[:insert] + [point_idx] + target[insert:], bound=cost[0])
+                    if extended is None:
+                        continue
+
+                    new_ends = list(ends)
+                    new_ends[last] = shortened_end[1]
+                    new_ends[receiver] = extended[1]
+                    if self.get_cost(new_ends) < cost:
+                        self.sequences[last] = shortened
+                        self.sequences[receiver] = target[:insert] + [point_idx] + target[insert:]
+                        return True
+        return False
+
+    def get_occupations(self) -> list[Occupation]:
+        step = self.epochs[1] - self.epochs[0]
+        occupations = []
+        for receiver, sequence in enumerate(self.sequences):
+            starts, _ = self.simulate(sequence)
+            for point_idx, start in zip(sequence, starts):
+                occupations.append(Occupation(point=self.names[point_idx], receiver=receiver + 1, start=self.epochs[start], end=self.epochs[start] + step * self.occupation_epochs))
+        return occupations
+
+    def get_unscheduled(self) -> list[str]:
+        return [self.names[point_idx] for point_idx in self.unscheduled]
+
+    def write_timetable(self, path: str) -> None:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["receiver", "point", "start", "end"])
+            for occupation in self.get_occupations():
+                writer.writerow([occupation.receiver, occupation.point, occupation.start.isoformat(), occupation.end.isoformat()])
+            for name in self.get_unscheduled():
+                writer.writerow(["", name, "", ""]) # no window with good geometry
+        return
@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.DEM import RasterDEM, LazyTileDEM
+from backend.roughplanning.Horizon import get_azimuths, max_elevation_angles_points
+
+
+def get_obstructed_fraction(elevation_angles: np.ndarray, cutoff: float | int) -> np.ndarray:
+    """
+    Returns the fraction of the sky above the cut-off angle hidden by the horizon (solid angle) per row of
+    elevation_angles [gon] (uniformly spaced azimuths in the last axis).
+    """
+    cutoff_rad = cutoff * np.pi / 200
+    horizon = np.clip(np.asarray(elevation_angles) * np.pi / 200, cutoff_rad, np.pi / 2)
+
+    # solid angle of the sky between the elevations a and b is proportional to sin(b) - sin(a)
+    return np.mean((np.sin(horizon) - np.sin(cutoff_rad)) / (1 - np.sin(cutoff_rad)), axis=-1)
+
+
+@dataclass
+class SiteCandidate:
+    """
+    Position evaluated by SiteSearch.
+
+    Attributes
+    ----------
+    point : GNSS_Point
+        Candidate position, same name and antenna height as the nominal point.
+
+    shift : float
+        Distance from the nominal point [Meters].
+
+    obstructed_fraction : float
+        Fraction of the sky above the cut-off angle hidden by the horizon (0-1).
+
+    azimuths, elevation_angles : list[float]
+        Horizon of the candidate [gon].
+    """
+    point: GNSS_Point
+    shift: float
+    obstructed_fraction: float
+    azimuths: list[float]
+    elevation_angles: list[float]
+
+
+@dataclass
+class SiteSearch:
+    """
+    Searches the position with the least obstructed sky on a grid around a nominal point.
+
+    All candidates are evaluated in one batched horizon computation on the DEM held in memory.
+    A candidate keeps the height of the nominal point above the terrain (floor_height - terrain height at the nominal
+    point). The DEM is a surface model incl. buildings and vegetation: candidates where it lies more than
+    max_surface_offset above or below the terrain (roofs, tree tops) cannot be set up on and are not evaluated.
+
+    Attributes
+    ----------
+    point : GNSS_Point
+        Nominal point.
+
+    dem : RasterDEM
+        DEM around the point, has to contain the search radius plus the analysis distance.
+
+    terrain : RasterDEM | LazyTileDEM
+        Terrain model without buildings and vegetation (e.g. swissALTI3D) giving the ground height of the candidates.
+
+    search_radius : float
+        Maximal shift of the point [Meters].
+
+    spacing : float
+        Distance between two candidates [Meters]. Default 1.
+
+    max_surface_offset : float
+        Maximal difference between DEM and terrain at a candidate [Meters]. Default 1.5 (covers the sampling of the
+        2 m terrain grid on slopes).
+
+    Methods
+    -------
+    get_candidates() -> tuple[np.ndarray, np.ndarray]:
+        Returns eastings and northings of the candidates, the nominal point first.
+
+    search(number_of_lines: int, line_length: float | int, number_of_segments: int, cutoff: float | int) -> list[SiteCandidate]:
+        Returns all candidates on the ground, best first (the nominal point is always evaluated).
+    """
+    point: GNSS_Point
+    dem: RasterDEM
+    terrain: RasterDEM | LazyTileDEM
+    search_radius: float
+    spacing: float = 1.0
+    max_surface_offset: float = 1.5
+
+    def __post_init__(self) -> None:
+        if not isinstance(self.dem, RasterDEM):
+            raise TypeError("Die Standortsuche benötigt ein geladenes DEM (RasterDEM).")
+        if self.spacing <= 0:
+            raise ValueError("Attribute 'spacing' must be positive.")
+
+    def get_candidates(self) -> tuple[np.ndarray, np.ndarray]:
+        steps = np.arange(1, int(self.search_radius // self.spacing) + 1) * self.spacing
+        offsets = np.concatenate((-steps[::-1], [0.0], steps))
+        delta_e, delta_n = np.meshgrid(offsets, offsets)
+        inside = (delta_e**2 + delta_n**2 <= self.search_radius**2) & ((delta_e != 0) | (delta_n != 0))
+
+        eastings = np.concatenate(([self.point.easting], self.point.easting + delta_e[inside]))
+        northings = np.concatenate(([self.point.northing], self.point.northing + delta_n[inside]))
+        return (eastings, northings)
+
+    def search(self, number_of_lines: int, line_length: float | int, number_of_segments: int, cutoff: float | int, kernel: Literal['NUMPY', 'NUMBA'] = 'NUMBA') -> list[SiteCandidate]:
+        pix_size = self.dem.get_pixel_size()
+
+        # if segmentsize is smaller than the actual width of a cell -> segmentsize will be overwritten with cell size
+        if line_length / pix_size < number_of_segments:
+            number_of_segments = int(line_length / pix_size)
+
+        eastings, northings = self.get_candidates()
+        surface = self.dem.sample(eastings=eastings, northings=northings).astype(np.float64)
+        ground = np.asarray(self.terrain.sample(eastings=eastings, northings=northings), dtype=np.float64)
+
+        # candidates on roofs and in trees are dropped, the nominal point is kept for comparison
+        on_ground = np.abs(surface - ground) <= self.max_surface_offset
+        on_ground[0] = True
+        eastings, northings, ground = eastings[on_ground], northings[on_ground], ground[on_ground]
+        floor_heights = ground + (self.point.floor_height - ground[0])
+
+        array, transform = self.dem.get_array()
+        scale, offset = self.dem.get_scale_offset()
+        max_alphas = max_elevation_angles_points(array=array, transform=transform, eastings=eastings, northings=northings, gnss_heights=floor_heights + self.point.antenna_height, azimuths=get_azimuths(number_of_lines=number_of_lines), line_length=line_length, number_of_segments=int(number_of_segments), kernel=kernel, scale=scale, offset=offset)
+        elevation_angles = max_alphas * 200 / np.pi
+        obstructed = get_obstructed_fraction(elevation_angles=elevation_angles, cutoff=cutoff)
+        shifts = np.hypot(eastings - self.point.easting, northings - self.point.northing)
+
+        azimuths = [400 / number_of_lines * i for i in range(number_of_lines)]
+        candidates = [SiteCandidate(point=GNSS_Point(name=self.point.name, easting=float(easting), northing=float(northing), floor_height=float(floor_height), antenna_height=self.point.antenna_height), shift=float(shift), obstructed_fraction=float(fraction), azimuths=list(azimuths), elevation_angles=list(angles)) for easting, northing, floor_height, shift, fraction, angles in zip(eastings, northings, floor_heights, shifts, obstructed, elevation_angles)]
+
+        # least obstructed first, the smaller shift wins ties
+        return sorted(candidates, key=lambda candidate: (candidate.obstructed_fraction, candidate.shift))
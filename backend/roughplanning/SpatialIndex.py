@@ -0,0 +1,152 @@
+from dataclasses import dataclass, field
+import math
+
+from backend.roughplanning.GNSS import GNSS_Session, GNSS_Point
+
+@dataclass
+class PointGridIndex:
+    """
+    Uniform grid over the points of a GNSS_Session for fast neighbourhood queries.
+
+    Attributes
+    ----------
+    session : GNSS_Session
+        Session containing the points to index.
+
+    cell_size : float | int
+        Edge length of a grid cell in meters.
+
+    Methods
+    -------
+    get_cell(easting: float, northing: float) -> tuple[int, int]:
+        Returns the grid cell containing a coordinate.
+
+    get_neighbours(point: GNSS_Point, distance: float | int) -> list[GNSS_Point]:
+        Returns all points whose easting and northing both differ by at most distance.
+
+    get_clusters(distance: float | int) -> list[list[GNSS_Point]]:
+        Groups the points into clusters whose buffered bounding-boxes overlap.
+    """
+    session: GNSS_Session
+    cell_size: float | int
+    cells: dict = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.cell_size <= 0:
+            raise ValueError("Attribute 'cell_size' must be positive.")
+
+        for point in self.session.get_points():
+            self.cells.setdefault(self.get_cell(easting=point.easting, northing=point.northing), []).append(point)
+
+    def get_cell(self, easting: float, northing: float) -> tuple[int, int]:
+        return (math.floor(easting / self.cell_size), math.floor(northing / self.cell_size))
+
+    def get_neighbours(self, point: GNSS_Point, distance: float | int) -> list[GNSS_Point]:
+        # number of cells to search in each direction
+        reach = math.ceil(distance / self.cell_size)
+        cell_e, cell_n = self.get_cell(easting=point.easting, northing=point.northing)
+
+        neighbours = []
+        for i in range(cell_e - reach, cell_e + reach + 1):
+            for j in range(cell_n - reach, cell_n + reach + 1):
+                for candidate in self.cells.get((i, j), []):
+                    if candidate is point:
+                        continue
+                    if abs(candidate.easting - point.easting) <= distance and abs(candidate.northing - point.northing) <= distance:
+                        neighbours.append(candidate)
+        return neighbours
+
+    def get_clusters(self, distance: float | int) -> list[list[GNSS_Point]]:
+        """
+        Groups points whose boxes buffered by distance overlap (union-find over grid neighbours).
+
+        Parameters
+        ----------
+        distance : float | int
+            Buffer distance in meters. Two points belong to the same cluster if their buffered boxes overlap.
+
+        Returns
+        -------
+        list[list[GNSS_Point]]
+            Clusters of points, in order of their first point in the session.
+        """
+        points = self.session.get_points()
+        positions = {id(point): idx for idx, point in enumerate(points)}
+        parents = list(range(len(points)))
+
+        def find(idx: int) -> int:
+            while parents[idx] != idx:
+                parents[idx] = parents[parents[idx]] # path halving
+                idx = parents[idx]
+            return idx
+
+        for idx, point in enumerate(points):
+            for neighbour in self.get_neighbours(point=point, distance=2 * distance):
+                root_a = find(idx)
+                root_b = find(positions[id(neighbour)])
+                if root_a != root_b:
+                    parents[max(root_a, root_b)] = min(root_a, root_b)
+
+        clusters = {}
+        for idx, point in enumerate(points):
+            clusters.setdefault(find(idx), []).append(point)
+
+        return list(clusters.values())
+
+
+@dataclass
+class DiskTileSelector:
+    """
+    Selects the raster-tiles reachable by the profile lines of a set of points.
+
+    Instead of a buffered rectangle, the union of the disks with radius line_length around every point is used,
+    so tiles in the corners of a bounding-box that no line can reach are not requested.
+
+    Attributes
+    ----------
+    points : list[GNSS_Point]
+        Points whose analysis disks are covered.
+
+    radius : float | int
+        Radius of each disk (line_length) in meters.
+
+    tile_size : float | int
+        Edge length of a raster-tile in meters. Default 1000 m (swissSURFACE3D).
+    """
+    points: list[GNSS_Point]
+    radius: float | int
+    tile_size: float | int = 1000
+
+    def get_tile_origins(self) -> list[tuple[float, float]]:
+        """
+        Returns the lower-left corners (easting, northing) of all tiles intersecting the union of disks, sorted.
+        """
+        origins = set()
+
+        for point in self.points:
+            # tile-range of the bounding square of the disk, widened by one tile: a sample exactly on the
+            # lower/left border of a tile is read from the neighbouring tile by the raster transform
+            e_first = math.floor((point.easting - self.radius) / self.tile_size) - 1
+            e_last = math.floor((point.easting + self.radius) / self.tile_size)
+            n_first = math.floor((point.northing - self.radius) / self.tile_size) - 1
+            n_last = math.floor((point.northing + self.radius) / self.tile_size)
+
+            for i in range(e_first, e_last + 1):
+                for j in range(n_first, n_last + 1):
+                    if (i, j) not in origins and self.intersects_tile(point=point, i=i, j=j):
+                        origins.add((i, j))
+
+        return [(i * self.tile_size, j * self.tile_size) for i, j in sorted(origins)]
+
+    def get_tile_keys(self) -> list[str]:
+        """
+        Returns the swisstopo tilekeys ("<E>_<N>", lower-left corner in km) of get_tile_origins.
+        """
+        return [f"{int(e // 1000)}_{int(n // 1000)}" for e, n in self.get_tile_origins()]
+
+    def intersects_tile(self, point: GNSS_Point, i: int, j: int) -> bool:
+        # closest point of the tile to the disk center
+        closest_e = min(max(point.easting, i * self.tile_size), (i + 1) * self.tile_size)
+        closest_n = min(max(point.northing, j * self.tile_size), (j + 1) * self.tile_size)
+
+        return (closest_e - point.easting)**2 + (closest_n - point.northing)**2 <= self.radius**2
@@ -0,0 +1,51 @@
+import numpy as np
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+def lv95_to_wgs84(easting: np.ndarray | float, northing: np.ndarray | float, height: np.ndarray | float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Approximate transformation LV95/LN02 -> WGS84 (swisstopo formulas, accuracy ~1 m, enough for satellite geometry).
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        latitude [deg], longitude [deg], ellipsoidal height [Meters]
+    """
+    y = (np.asarray(easting, dtype=np.float64) - 2_600_000) / 1e6
+    x = (np.asarray(northing, dtype=np.float64) - 1_200_000) / 1e6
+
+    # results in 10000" -> * 100 / 36 = degrees
+    longitude = (2.6779094 + 4.728982 * y + 0.791484 * y * x + 0.1306 * y * x**2 - 0.0436 * y**3) * 100 / 36
+    latitude = (16.9023892 + 3.238272 * x - 0.270978 * y**2 - 0.002528 * x**2 - 0.0447 * y**2 * x - 0.0140 * x**3) * 100 / 36
+    ellipsoidal_height = np.asarray(height, dtype=np.float64) + 49.55 - 12.60 * y - 22.64 * x
+
+    return (latitude, longitude, ellipsoidal_height)
+
+
+def wgs84_to_ecef(latitude: np.ndarray, longitude: np.ndarray, height: np.ndarray) -> np.ndarray:
+    """
+    Returns the earth-centered, earth-fixed coordinates (... x 3) [Meters] of WGS84 positions (degrees, ellipsoidal height).
+    """
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    radius = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(lat)**2) # prime vertical radius of curvature
+
+    return np.stack(((radius + height) * np.cos(lat) * np.cos(lon), (radius + height) * np.cos(lat) * np.sin(lon), (radius * (1 - WGS84_E2) + height) * np.sin(lat)), axis=-1)
+
+
+def get_enu_rotation(latitude: np.ndarray | float, longitude: np.ndarray | float) -> np.ndarray:
+    """
+    Returns the rotation matrices (... x 3 x 3) from ECEF differences to local east, north, up.
+    """
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    zeros = np.zeros_like(lat)
+
+    return np.stack((
+        np.stack((-np.sin(lon), np.cos(lon), zeros), axis=-1),
+        np.stack((-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)), axis=-1),
+        np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1),
+    ), axis=-2)
@@ -0,0 +1,25 @@
+from contextlib import contextmanager
+from typing import IO, Iterator
+import os
+import tempfile
+
+
+@contextmanager
+def open_atomic(path: str, mode: str = "wb") -> Iterator[IO]:
+    """
+    Opens a uniquely named temporary file next to path and moves it onto path when the block ends without error.
+
+    Threads and processes writing the same file each get their own temporary file, readers only ever see a
+    complete file.
+    """
+    folder, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(dir=folder or ".", prefix=f"{name}.", suffix=".part")
+    os.chmod(temp_path, 0o644) # mkstemp creates the file readable by the owner only
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+from contextlib import contextmanager
+import cProfile
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger("gnss_planner.timing")
+
+PROFILE_ENV = "GNSS_PLANNER_PROFILE" # "cprofile" or "pyinstrument"
+
+@dataclass
+class StageTimer:
+    """
+    Records the duration of the pipeline stages and emits one JSON log record per finished stage.
+
+    Attributes
+    ----------
+    profiler : str | None
+        None (default: taken from the environment variable GNSS_PLANNER_PROFILE), 'cprofile' or 'pyinstrument'.
+        If set, every stage in profile_stages is profiled.
+
+    profile_stages : list[str] | None
+        Stages to profile. None profiles all stages.
+
+    profile_dir : str | None
+        Folder for the profiler output (<stage>_<idx>.prof / .html). Default: current directory.
+
+    Methods
+    -------
+    stage(name: str, **info):
+        Context manager measuring a stage. info is stored with the event (e.g. point=...).
+
+    get_summary() -> dict:
+        Returns count, total, mean and max duration per stage.
+
+    write_report(path: str) -> None:
+        Writes all events and the summary as JSON.
+    """
+    profiler: str | None = None
+    profile_stages: list[str] | None = None
+    profile_dir: str | None = None
+    events: list[dict] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if self.profiler is None:
+            self.profiler = os.environ.get(PROFILE_ENV) or None
+        if self.profiler not in (None, 'cprofile', 'pyinstrument'):
+            raise ValueError("Unsupported profiler. Use 'cprofile' or 'pyinstrument'!")
+
+    @contextmanager
+    def stage(self, name: str, **info):
+        profiler = self.start_profiler(name=name)
+        start = time.perf_counter()
+        started_at = time.time()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.stop_profiler(profiler=profiler, name=name)
+
+            event = {"stage": name, "start": started_at, "seconds": duration, **info}
+            self.events.append(event)
+            logger.info(json.dumps(event))
+
+    def start_profiler(self, name: str):
+        if self.profiler is None or (self.profile_stages is not None and name not in self.profile_stages):
+            return None
+
+        if self.profiler == 'pyinstrument':
+            try:
+                import pyinstrument # optional dependency
+            except ImportError:
+                logger.warning(json.dumps({"warning": "pyinstrument not installed, using cProfile"}))
+                self.profiler = 'cprofile'
+            else:
+                profiler = pyinstrument.Profiler()
+                profiler.start()
+                return profiler
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop_profiler(self, profiler, name: str) -> None:
+        if profiler is None:
+            return
+
+        profile_dir = self.profile_dir or os.getcwd()
+        os.makedirs(profile_dir, exist_ok=True)
+        idx = sum(1 for event in self.events if event["stage"] == name)
+
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            profiler.dump_stats(os.path.join(profile_dir, f"{name}_{idx}.prof"))
+        else:
+            profiler.stop()
+            with open(os.path.join(profile_dir, f"{name}_{idx}.html"), "w") as f:
+                f.write(profiler.output_html())
+        return
+
+    def get_summary(self) -> dict:
+        summary = {}
+        for event in self.events:
+            entry = summary.setdefault(event["stage"], {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += event["seconds"]
+            entry["max"] = max(entry["max"], event["seconds"])
+
+        for entry in summary.values():
+            entry["mean"] = entry["total"] / entry["count"]
+        return summary
+
+    def write_report(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"summary": self.get_summary(), "events": self.events}, f, indent=2)
+        return
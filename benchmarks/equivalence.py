@@ -0,0 +1,64 @@
+"""
+Checks that all horizon engines return the same elevation angles as the line-by-line POOL computation.
+
+Run from the repository root:
+    python -m benchmarks.equivalence
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from backend.roughplanning.RoughPlanning import RoughPlanning
+from backend.roughplanning.Horizon import HAS_NUMBA
+from backend.roughplanning.BlockScheduler import BlockHorizonScheduler
+
+from benchmarks.synthetic import create_dem, create_session
+
+
+def check(name: str, reference: list, result: list, tolerance: float) -> bool:
+    difference = np.max(np.abs(np.array(reference) - np.array(result)))
+    ok = difference <= tolerance
+    print(f"{'ok' if ok else 'FAILED':<7} {name:<40} max. difference {difference:.3g} gon")
+    return ok
+
+
+def run(args: argparse.Namespace) -> bool:
+    work_folder = tempfile.mkdtemp(prefix="gnss_equivalence_")
+    dem_path = create_dem(path=os.path.join(work_folder, "raster.tif"), easting=2_600_000, northing=1_200_000, width=4000, height=4000, seed=args.seed)
+    session = create_session(number_of_points=args.points, easting=2_600_000 + args.distance, northing=1_200_000 + args.distance, extent=2000 - 2 * args.distance, seed=args.seed)
+
+    blocks = BlockHorizonScheduler(points=session.get_points(), dem_path=dem_path).plan(number_of_lines=args.lines, line_length=args.distance, number_of_segments=args.segments)
+
+    ok = True
+    for point in session.get_points():
+        reference = RoughPlanning(point=point, dem_path=dem_path, method="CONVENTIONAL").plan(number_of_lines=args.lines, line_length=args.distance, number_of_segments=args.segments, kernel='POOL')
+
+        for kernel in ['NUMPY', 'NUMBA']:
+            result = RoughPlanning(point=point, dem_path=dem_path, method="CONVENTIONAL").plan(number_of_lines=args.lines, line_length=args.distance, number_of_segments=args.segments, kernel=kernel)
+            name = f"{kernel}{'' if kernel != 'NUMBA' or HAS_NUMBA else ' (NUMPY fallback)'} point {point.name}"
+            ok &= result[0] == reference[0] and check(name=name, reference=reference[1], result=result[1], tolerance=args.tolerance)
+
+        ok &= blocks[point.name][0] == reference[0] and check(name=f"BLOCKS point {point.name}", reference=reference[1], result=blocks[point.name][1], tolerance=args.tolerance)
+
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the horizon engines on a synthetic DEM.")
+    parser.add_argument("--points", type=int, default=3)
+    parser.add_argument("--distance", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=64)
+    parser.add_argument("--segments", type=int, default=500)
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="allowed difference [gon]")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    return 0 if run(args) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Benchmarks for the stages of the planning pipeline on synthetic data.
+
+Run from the repository root:
+    python -m benchmarks.run --points 10 --lines 16 64 --segments 200 1000 --output bench.json
+    python -m benchmarks.run --compare bench.json   # exit code 1 if a stage got slower than the tolerance
+"""
+
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import matplotlib
+matplotlib.use("Agg") # no display needed
+
+from backend.roughplanning.BBOX import BBOXCreator
+from backend.roughplanning.SpatialIndex import DiskTileSelector
+from backend.roughplanning.Downloader import LoadRasterDEM
+from backend.roughplanning.Merger import RasterMerger
+from backend.roughplanning.RoughPlanning import RoughPlanning
+from backend.roughplanning.RoughPlanDrawer import RoughPlanDrawer
+from backend.roughplanning.PDFCreator import PDFCreator
+from backend.roughplanning.Almanac import VisibilityForecast, read_almanac
+from backend.roughplanning.DOP import compute_dop
+from backend.roughplanning.SessionScheduler import ObservationScheduler
+
+from benchmarks.synthetic import create_session, create_almanac
+from benchmarks.stub_server import StubTileServer
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    seconds: float
+    items: int
+    throughput: float # items per second
+    peak_memory_mb: float # resident memory of the benchmark and its worker processes above the start of the stage
+    params: dict = field(default_factory=dict)
+
+
+def get_process_tree_rss(pid: int) -> int:
+    """
+    Returns the resident memory [bytes] of a process and all its descendants (linux /proc), 0 if it has exited.
+    Pages shared with forked workers are split among them (PSS), a plain RSS sum would count them once per worker.
+    """
+    try:
+        rss = None
+        if os.path.exists(f"/proc/{pid}/smaps_rollup"):
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                rss = next((int(line.split()[1]) * 1024 for line in f if line.startswith("Pss:")), None)
+        if rss is None:
+            with open(f"/proc/{pid}/statm") as f:
+                rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        children = []
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except (OSError, ValueError):
+        return 0
+    return rss + sum(get_process_tree_rss(pid=child) for child in children)
+
+
+def measure_peak_memory(func, interval: float = 0.01) -> int:
+    """
+    Runs func once and returns the peak resident memory [bytes] of this process and its worker processes above the
+    memory before the run. Without /proc only the high-water marks of getrusage are available.
+    """
+    if not os.path.exists(f"/proc/{os.getpid()}/task"):
+        func()
+        return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * 1024
+
+    baseline = get_process_tree_rss(pid=os.getpid())
+    peak = baseline
+    done = threading.Event()
+
+    def sample() -> None:
+        nonlocal peak
+        while not done.wait(interval):
+            peak = max(peak, get_process_tree_rss(pid=os.getpid()))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        func()
+    finally:
+        done.set()
+        sampler.join()
+    return max(0, peak - baseline)
+
+
+def measure(name: str, func, items: int = 1, repeat: int = 1, **params) -> BenchmarkResult:
+    """
+    Runs func repeat times and returns the best run time, then runs it once more to measure the peak memory
+    (sampled separately, so the timed runs are not slowed down by the measurement).
+    """
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    peak = measure_peak_memory(func=func)
+
+    result = BenchmarkResult(name=name, seconds=best, items=items, throughput=items / best if best else float("inf"), peak_memory_mb=peak / 2**20, params=params)
+    print(f"{name:<40} {best:>10.4f} s {result.throughput:>12.2f} items/s {result.peak_memory_mb:>10.1f} MB  {params if params else ''}")
+    return result
+
+
+def run(args: argparse.Namespace) -> list[BenchmarkResult]:
+    results = []
+    work_folder = tempfile.mkdtemp(prefix="gnss_bench_")
+    raster_folder = os.path.join(work_folder, "raster")
+    results_folder = os.path.join(work_folder, "results")
+    os.makedirs(results_folder)
+
+    session = create_session(number_of_points=args.points, easting=2_600_000 + args.distance, northing=1_200_000 + args.distance, extent=args.extent, seed=args.seed)
+    points = session.get_points()
+
+    with StubTileServer(tile_folder=os.path.join(work_folder, "server")) as server:
+        # tiles are generated on the first request -> warm up the server so only the client side is measured
+        bbox = BBOXCreator(session=session).get_bbox().puffer_box(distance=args.distance)
+        origins = DiskTileSelector(points=points, radius=args.distance).get_tile_origins()
+        loader = LoadRasterDEM(bbox=bbox, download_folder=raster_folder, wms_url=server.wms_url, data_url=server.data_url)
+        loader.load_raster(tiles=loader.get_tiles(tile_origins=origins))
+        RasterMerger(path=raster_folder).remove_downloads()
+
+        tiles = []
+        def get_tiles():
+            tiles[:] = loader.get_tiles(tile_origins=origins)
+        results.append(measure("get_tiles", get_tiles, items=len(origins), repeat=args.repeat))
+
+        results.append(measure("load_raster", lambda: loader.load_raster(tiles=tiles), items=len(tiles), repeat=args.repeat))
+
+    merger = RasterMerger(path=raster_folder, storage=args.storage)
+    results.append(measure("merge_raster", merger.merge_raster, items=len(tiles), repeat=1, storage=args.storage))
+    merger.remove_downloads()
+    dem_path = os.path.join(raster_folder, "raster.tif")
+
+    azimuths, elevation_angles = [], []
+    for kernel in args.kernels:
+        if kernel == 'NUMBA':
+            # compile outside of the measurement
+            RoughPlanning(point=points[0], dem_path=dem_path, method="CONVENTIONAL").plan(number_of_lines=4, line_length=args.distance, number_of_segments=10, kernel=kernel)
+        for number_of_lines in args.lines:
+            for number_of_segments in args.segments:
+                def plan():
+                    for point in points:
+                        planner = RoughPlanning(point=point, dem_path=dem_path, method="CONVENTIONAL")
+                        azimuths[:], elevation_angles[:] = planner.plan(number_of_lines=number_of_lines, line_length=args.distance, number_of_segments=number_of_segments, kernel=kernel)
+                results.append(measure("plan_conventional", plan, items=len(points), repeat=args.repeat, number_of_lines=number_of_lines, number_of_segments=number_of_segments, kernel=kernel))
+
+    # satellite positions are part of the measurement (computed once per forecast)
+    almanac = read_almanac(path=create_almanac(path=os.path.join(work_folder, "almanac.yuma")))
+    horizons = {point.name: (list(azimuths), list(elevation_angles)) for point in points}
+    def visibility():
+        VisibilityForecast(almanac=almanac, start=datetime(2024, 1, 31), duration=args.hours, step=1, cutoff=10).forecast(points=points, horizons=horizons)
+    results.append(measure("visibility", visibility, items=len(points), repeat=args.repeat, hours=args.hours))
+
+    forecast = VisibilityForecast(almanac=almanac, start=datetime(2024, 1, 31), duration=args.hours, step=1, cutoff=10)
+    visibilities = forecast.forecast(points=points, horizons=horizons)
+    dops = {}
+    def dop():
+        dops.update({name: compute_dop(visibility=point_visibility) for name, point_visibility in visibilities.items()})
+    results.append(measure("dop", dop, items=len(points), repeat=args.repeat, hours=args.hours))
+    results.append(measure("schedule", lambda: ObservationScheduler(dops=dops, epochs=forecast.get_epochs(), receivers=args.receivers, occupation=60, changeover=30).schedule(), items=len(points), repeat=args.repeat, hours=args.hours, receivers=args.receivers))
+
+    drawer = RoughPlanDrawer()
+    def draw():
+        for point in points:
+            drawer.draw_panorama_diagram(azimuths=list(azimuths), elevation_angles=list(elevation_angles), min_elevation=10, image_path=os.path.join(results_folder, f"panorama{point.name}.png"), pointname=point.name)
+            drawer.draw_polar_diagram(azimuths=list(azimuths), elevation_angles=list(elevation_angles), min_elevation=10, image_path=os.path.join(results_folder, f"polar{point.name}.png"), pointname=point.name)
+        drawer.save_legend(legend_path=os.path.join(results_folder, "legend.png"))
+    results.append(measure("draw", draw, items=len(points), repeat=args.repeat))
+
+    pdf_creator = PDFCreator(results_path=results_folder)
+    results.append(measure("create_protocol", lambda: pdf_creator.create_protocol(points=points, projectname="Benchmark", projectleader="", distance=args.distance, segment_length=1, no_lines=args.lines[-1], cutoff=10), items=len(points), repeat=args.repeat))
+
+    # peak resident memory incl. worker processes of the multiprocessing pool (kB on linux)
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MB (main), {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.1f} MB (workers)")
+    return results
+
+
+def compare(results: list[BenchmarkResult], baseline_path: str, tolerance: float) -> bool:
+    """
+    Compares the run times with a previously written result file. Returns False if any stage regressed.
+    """
+    with open(baseline_path) as f:
+        baseline = {(entry["name"], json.dumps(entry["params"], sort_keys=True)): entry for entry in json.load(f)["results"]}
+
+    ok = True
+    for result in results:
+        reference = baseline.get((result.name, json.dumps(result.params, sort_keys=True)))
+        if reference is None:
+            continue
+        ratio = result.seconds / reference["seconds"]
+        if ratio > 1 + tolerance:
+            print(f"REGRESSION {result.name} {result.params}: {reference['seconds']:.4f} s -> {result.seconds:.4f} s ({ratio:.2f}x)")
+            ok = False
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the GNSS planning pipeline on synthetic DEMs.")
+    parser.add_argument("--points", type=int, default=5, help="number of points in the session")
+    parser.add_argument("--extent", type=float, default=1000, help="edge length of the square the points are placed in [m]")
+    parser.add_argument("--distance", type=int, default=500, help="analysis distance (line_length) [m]")
+    parser.add_argument("--lines", type=int, nargs="+", default=[16, 64], help="number_of_lines values")
+    parser.add_argument("--segments", type=int, nargs="+", default=[100, 500], help="number_of_segments values")
+    parser.add_argument("--kernels", nargs="+", choices=['POOL', 'NUMPY', 'NUMBA'], default=['POOL', 'NUMPY', 'NUMBA'], help="kernels of plan_conventional")
+    parser.add_argument("--storage", choices=['NATIVE', 'FLOAT32', 'INT16', 'INT32'], default='NATIVE', help="data type of the merged DEM")
+    parser.add_argument("--hours", type=float, default=24, help="length of the visibility forecast [h] (1 min epochs)")
+    parser.add_argument("--receivers", type=int, default=3, help="receivers of the schedule stage")
+    parser.add_argument("--repeat", type=int, default=1, help="repetitions per stage, the best run is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON file of a previous run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against --compare (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": [asdict(result) for result in results]}, f, indent=2)
+
+    if args.compare and not compare(results=results, baseline_path=args.compare, tolerance=args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Measures the launch of the desktop application: interpreter start, imports of main.py and creation of the main window,
+with the precompiled UI and with uic.loadUi. Every run starts a fresh interpreter, the best run is reported.
+
+Run from the repository root (no display needed, Qt uses the offscreen platform):
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --check   # exit code 1 if a heavy module is imported at launch
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# must not be imported before the first preview, planning run or protocol
+HEAVY_MODULES = ("matplotlib", "rasterio", "fpdf", "numba", "scipy", "PyQt5.uic")
+
+LAUNCH = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+app = QApplication([])
+if {parse_ui}:
+    main.get_ui_hash = lambda path: "" # as if the .ui was changed since it was compiled
+window = main.MainWindow()
+created = time.perf_counter()
+print(json.dumps({{"import": imported - start, "window": created - imported, "modules": [name for name in {heavy} if name in sys.modules]}}))
+"""
+
+FIRST_PLANNING = """
+import json, sys, time
+start = time.perf_counter()
+import backend.roughplanning.Pipeline
+print(json.dumps({{"import": time.perf_counter() - start, "window": 0.0, "modules": [name for name in {heavy} if name in sys.modules]}}))
+"""
+
+
+def measure(name: str, code: str, repeat: int) -> dict:
+    environment = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", code], env=environment, capture_output=True, text=True, check=True).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        run["total"] = time.perf_counter() - start # incl. interpreter start and exit
+        runs.append(run)
+
+    best = min(runs, key=lambda run: run["total"])
+    print(f"{name:<32} {best['total']:>8.3f} s total {best['import']:>8.3f} s imports {best['window']:>8.3f} s window  {', '.join(best['modules']) or '-'}")
+    return {"name": name, **best}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the launch of the GNSS Planner UI.")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per measurement, the best run is reported")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--check", action="store_true", help="fail if matplotlib, rasterio, fpdf, numba or uic are imported at launch")
+    args = parser.parse_args()
+
+    try:
+        import PyQt5.QtWidgets
+    except ImportError:
+        print("PyQt5 ist nicht installiert, der Start der Oberfläche kann nicht gemessen werden.")
+        return 1
+
+    heavy = repr(HEAVY_MODULES)
+    results = [
+        measure("launch (precompiled UI)", LAUNCH.format(parse_ui=False, heavy=heavy), repeat=args.repeat),
+        measure("launch (uic.loadUi)", LAUNCH.format(parse_ui=True, heavy=heavy), repeat=args.repeat),
+        measure("first planning (Pipeline import)", FIRST_PLANNING.format(heavy=heavy), repeat=args.repeat),
+    ]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version, "results": results}, f, indent=2)
+
+    if args.check and results[0]["modules"]:
+        print(f"Beim Start importiert: {', '.join(results[0]['modules'])}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Local stand-in for the swisstopo WMS (GetFeatureInfo) and the swissSURFACE3D download, serving synthetic tiles.
+"""
+
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+import hashlib
+import http.server
+import os
+import re
+import threading
+import time
+
+from benchmarks.synthetic import create_tile
+
+FEATURE_INFO = """<?xml version="1.0" encoding="UTF-8"?>
+<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs" xmlns:gml="http://www.opengis.net/gml" xmlns:ogr="http://ogr.maptools.org/">
+<gml:featureMember><ogr:swisssurface3d><ogr:tilekey>{tilekey}</ogr:tilekey><ogr:temporalkey>{temporalkey}</ogr:temporalkey></ogr:swisssurface3d></gml:featureMember>
+</wfs:FeatureCollection>"""
+
+
+@dataclass
+class StubTileServer:
+    """
+    HTTP server answering GetFeatureInfo requests with the tile at the requested position and serving tile downloads.
+    Every response carries an ETag (hash of the body) and a Last-Modified date, conditional requests with a matching
+    If-None-Match or a later If-Modified-Since are answered with 304.
+
+    Attributes
+    ----------
+    tile_folder : str
+        Folder where the synthetic tiles are created on first request.
+
+    temporalkey : str
+        Temporal key reported for every tile.
+
+    temporalkeys : dict[str, str]
+        Temporal keys of single tiles by tilekey (e.g. {"2600_1200": "2024"}), simulates republished tiles.
+
+    Usage
+    -----
+    with StubTileServer(tile_folder=...) as server:
+        LoadRasterDEM(..., wms_url=server.wms_url, data_url=server.data_url)
+    """
+    tile_folder: str
+    temporalkey: str = "2020"
+    temporalkeys: dict = field(default_factory=dict)
+    requests: list = field(default_factory=list, init=False)
+    not_modified: int = field(default=0, init=False) # number of 304 responses
+
+    def __enter__(self) -> "StubTileServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self.lock = threading.Lock()
+        self.last_modified = time.time()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self.create_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        return
+
+    @property
+    def wms_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/wms"
+
+    @property
+    def data_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/data"
+
+    def create_handler(self) -> type:
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                return
+
+            def do_GET(self) -> None:
+                stub.requests.append(self.path)
+                body = stub.respond(path=self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if stub.is_not_modified(etag=etag, if_none_match=self.headers.get("If-None-Match"), if_modified_since=self.headers.get("If-Modified-Since")):
+                    with stub.lock:
+                        stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", formatdate(stub.last_modified, usegmt=True))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def is_not_modified(self, etag: str, if_none_match: str | None, if_modified_since: str | None) -> bool:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+        if if_modified_since is not None:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= int(self.last_modified)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def get_temporalkey(self, tilekey: str) -> str:
+        return self.temporalkeys.get(tilekey, self.temporalkey)
+
+    def respond(self, path: str) -> bytes | None:
+        bbox = re.search(r"BBOX=([-\d.]+)%2C([-\d.]+)", path)
+        if path.startswith("/wms") and bbox:
+            tilekey = f"{int(float(bbox[1]) // 1000)}_{int(float(bbox[2]) // 1000)}"
+            return FEATURE_INFO.format(tilekey=tilekey, temporalkey=self.get_temporalkey(tilekey=tilekey)).encode()
+
+        tile = re.search(r"_(\d+)-(\d+)_([\d.]+)_2056_5728\.tif$", path)
+        if path.startswith("/data") and tile:
+            # one folder per resolution (swissSURFACE3D 0.5 m, swissALTI3D 2 m)
+            with self.lock: # tiles are generated once, even for parallel requests
+                tile_path = create_tile(folder=os.path.join(self.tile_folder, tile[3]), i=int(tile[1]), j=int(tile[2]), temporalkey=self.get_temporalkey(tilekey=f"{tile[1]}_{tile[2]}"), pixel_size=float(tile[3]))
+            with open(tile_path, "rb") as f:
+                return f.read()
+
+        return None
@@ -0,0 +1,100 @@
+"""
+Synthetic input data for the benchmarks: GeoTIFF DEMs in the swissSURFACE3D tile layout and point sets.
+"""
+
+import os
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from backend.roughplanning.GNSS import GNSS_Session, GNSS_Point
+
+
+def create_dem(path: str, easting: float, northing: float, width: int, height: int, pixel_size: float = 0.5, seed: int = 0, dtype: str = "float32") -> str:
+    """
+    Writes a synthetic DEM (smooth hills with noise) whose upper-left corner lies at (easting, northing + height * pixel_size).
+
+    Parameters
+    ----------
+    path : str
+        Target file.
+    easting, northing : float
+        Lower-left corner of the raster in LV95 [Meters].
+    width, height : int
+        Raster size in pixels.
+    pixel_size : float
+        Pixel size in meters. Default 0.5 m.
+    seed : int
+        Seed of the noise.
+    dtype : str
+        Data type of the written band. Default float32.
+
+    Returns
+    -------
+    str
+        path
+    """
+    rng = np.random.default_rng(seed)
+
+    # hills depend on the absolute coordinates -> neighbouring tiles fit together
+    e = easting + (np.arange(width) + 0.5) * pixel_size
+    n = northing + (np.arange(height)[::-1] + 0.5) * pixel_size
+    ee, nn = np.meshgrid(e, n)
+    dem = 500 + 80 * np.sin(ee / 700) * np.cos(nn / 900) + 30 * np.sin(ee / 230 + nn / 310)
+    dem += rng.normal(scale=0.5, size=dem.shape)
+
+    with rasterio.open(path, "w", driver="GTiff", height=height, width=width, count=1, dtype=dtype, crs="EPSG:2056", transform=from_origin(easting, northing + height * pixel_size, pixel_size, pixel_size)) as dest:
+        dest.write(dem.astype(dtype), 1)
+
+    return path
+
+
+def create_tile(folder: str, i: int, j: int, temporalkey: str = "2020", tile_size: int = 1000, pixel_size: float = 0.5) -> str:
+    """
+    Writes a synthetic 1 km tile named like a download of LoadRasterDEM (<i>-<j>_<temporalkey>.tif).
+    """
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{i}-{j}_{temporalkey}.tif")
+    if not os.path.exists(path):
+        pixels = int(tile_size / pixel_size)
+        create_dem(path=path, easting=i * tile_size, northing=j * tile_size, width=pixels, height=pixels, pixel_size=pixel_size, seed=i * 10007 + j)
+    return path
+
+
+def create_session(number_of_points: int, easting: float, northing: float, extent: float, seed: int = 0) -> GNSS_Session:
+    """
+    Creates a session of randomly placed points within a square of size extent with lower-left corner (easting, northing).
+    """
+    rng = np.random.default_rng(seed)
+    session = GNSS_Session()
+
+    for idx, (e, n) in enumerate(rng.random((number_of_points, 2)) * extent):
+        session.add_point(GNSS_Point(name=f"{idx + 1}", easting=float(easting + e), northing=float(northing + n), floor_height=500.0))
+
+    return session
+
+
+def create_almanac(path: str, number_of_satellites: int = 31, week: int = 2300, toa: float = 405504.0, seed: int = 0) -> str:
+    """
+    Writes a YUMA almanac of a GPS-like constellation (6 orbital planes, 55 deg inclination).
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for idx in range(number_of_satellites):
+            plane, slot = idx % 6, idx // 6
+            f.write(f"******** Week {week % 1024} almanac for PRN-{idx + 1:02d} ********\n")
+            f.write(f"ID:                         {idx + 1:02d}\n")
+            f.write("Health:                     000\n")
+            f.write(f"Eccentricity:               {rng.uniform(0, 0.02):.10E}\n")
+            f.write(f"Time of Applicability(s):  {toa:.4f}\n")
+            f.write(f"Orbital Inclination(rad):   {np.radians(55) + rng.normal(scale=0.01):.10f}\n")
+            f.write("Rate of Right Ascen(r/s):  -0.8000000000E-008\n")
+            f.write(f"SQRT(A)  (m 1/2):           {5153.6 + rng.normal(scale=0.5):.6f}\n")
+            f.write(f"Right Ascen at Week(rad):   {np.pi / 3 * plane - np.pi:.10E}\n")
+            f.write(f"Argument of Perigee(rad):   {rng.uniform(-np.pi, np.pi):.9f}\n")
+            f.write(f"Mean Anom(rad):             {np.mod(2 * np.pi / 6 * slot + plane * 0.5, 2 * np.pi) - np.pi:.10E}\n")
+            f.write("Af0(s):                     0.0000000000E+000\n")
+            f.write("Af1(s/s):                   0.0000000000E+000\n")
+            f.write(f"week:                        {week % 1024}\n\n")
+    return path
@@ -0,0 +1,129 @@
+"""
+Distributes the rough planning of a large session over several processes and nodes with a SQLite job queue.
+
+    python distribute.py submit <queue.sqlite> <points file> --distance 500 --resolution 1 --lines 64 --batch-size 16
+    python distribute.py work <queue.sqlite> <node folder> [--processes 4]      # on every node, as often as wanted
+    python distribute.py status <queue.sqlite>
+    python distribute.py collect <queue.sqlite> <project folder> <points file> --cutoff 10   # diagrams and protocol
+
+The queue file has to lie on a filesystem shared by all nodes.
+"""
+from multiprocessing import Process
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from backend.roughplanning.ReadWritePoints import ReadPoints
+from backend.roughplanning.Pipeline import RoughPlanningPipeline, PlanningSettings
+from backend.roughplanning.JobQueue import JobQueue, JobWorker
+from backend.roughplanning.Downloader import WMS_URL, DATA_URL
+
+
+def submit(args: argparse.Namespace) -> int:
+    session = ReadPoints().read_file(path=args.points)
+    settings = PlanningSettings(distance=args.distance, segment_resolution=args.resolution, number_of_lines=args.lines, cutoff=0, method=args.method, kernel=args.kernel, refinement_threshold=args.refine, refinement_depth=args.refine_depth, dem_storage=args.dem_storage)
+    queue = JobQueue(path=args.queue)
+    jobs = queue.submit(points=session.get_points(), parameters=settings.get_horizon_parameters(), radius=settings.get_dem_margin(), batch_size=args.batch_size)
+    print(f"{jobs} Aufträge mit {len(session.get_points())} Punkten erstellt")
+    return 0
+
+
+def work(queue_path: str, folder: str, wms_url: str, data_url: str, lease: float) -> None:
+    queue = JobQueue(path=queue_path)
+    settings = PlanningSettings(cutoff=0, **queue.get_parameters())
+    worker = JobWorker(queue=queue, settings=settings, raster_directory=os.path.join(folder, "raster"), wms_url=wms_url, data_url=data_url, lease_seconds=lease)
+    completed = worker.run(progress=lambda job: print(f"{worker.worker}: Auftrag {job.id} ({len(job.points)} Punkte) abgeschlossen", flush=True))
+    print(f"{worker.worker}: {completed} Aufträge abgeschlossen, keine weiteren Aufträge", flush=True)
+    queue.close()
+    return
+
+
+def status(args: argparse.Namespace) -> int:
+    queue = JobQueue(path=args.queue)
+    print(json.dumps({"jobs": queue.get_progress(), "points": len(queue.get_horizons()), "errors": queue.get_errors()}, indent=2))
+    return 0
+
+
+def collect(args: argparse.Namespace) -> int:
+    queue = JobQueue(path=args.queue)
+    progress = queue.get_progress()
+    if progress['pending'] or progress['leased']:
+        raise ValueError(f"Es sind noch {progress['pending'] + progress['leased']} Aufträge offen!")
+
+    session = ReadPoints().read_file(path=args.points)
+    settings = PlanningSettings(cutoff=args.cutoff, projectname=args.projectname, projectleader=args.projectleader, cache_results=False, **queue.get_parameters())
+    pipeline = RoughPlanningPipeline(session=session, parent_directory=args.project, settings=settings, progress=lambda value, text: print(f"{value:>3} % {text}"), wms_url=args.wms_url, data_url=args.data_url)
+    # points of failed jobs are planned here with tiles fetched on demand
+    pipeline.plan_all(planned=queue.get_horizons())
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Verteilte GNSS Grobplanung.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = commands.add_parser("submit", help="split a points file into jobs")
+    submit_parser.add_argument("queue", help="SQLite file of the queue (created if missing)")
+    submit_parser.add_argument("points", help="points file (name, easting, northing, floor height, antenna height)")
+    submit_parser.add_argument("--distance", type=int, default=500, help="analysis distance [m]")
+    submit_parser.add_argument("--resolution", type=int, default=1, help="segment resolution [m]")
+    submit_parser.add_argument("--lines", type=int, default=64, help="number of lines")
+    submit_parser.add_argument("--method", choices=['CONVENTIONAL', 'RANSAC'], default='CONVENTIONAL')
+    submit_parser.add_argument("--kernel", choices=['POOL', 'NUMPY', 'NUMBA'], default='POOL', help="computation of the LINES engine on the workers")
+    submit_parser.add_argument("--refine", type=float, help="adaptive azimuths: bisect where neighbouring elevation angles differ by more than this [gon]")
+    submit_parser.add_argument("--refine-depth", type=int, default=4, help="maximal bisections per interval of the coarse fan")
+    submit_parser.add_argument("--dem-storage", choices=['NATIVE', 'FLOAT32', 'INT16', 'INT32'], default='NATIVE', help="data type of the job windows")
+    submit_parser.add_argument("--batch-size", type=int, default=16, help="points per job")
+
+    work_parser = commands.add_parser("work", help="claim and plan jobs until the queue is empty")
+    work_parser.add_argument("queue", help="SQLite file of the queue")
+    work_parser.add_argument("folder", help="folder of this node, tiles are cached in <folder>/raster/tiles")
+    work_parser.add_argument("--processes", type=int, default=1, help="number of worker processes on this node")
+    work_parser.add_argument("--lease", type=float, default=300, help="lease of a job [s], renewed after every point")
+    work_parser.add_argument("--wms-url", default=WMS_URL, help="tile lookup service (e.g. a local fixture server)")
+    work_parser.add_argument("--data-url", default=DATA_URL, help="tile download service")
+
+    status_parser = commands.add_parser("status", help="number of jobs per state")
+    status_parser.add_argument("queue", help="SQLite file of the queue")
+
+    collect_parser = commands.add_parser("collect", help="draw the diagrams and create the protocol from the results")
+    collect_parser.add_argument("queue", help="SQLite file of the queue")
+    collect_parser.add_argument("project", help="project folder (results/ is created inside)")
+    collect_parser.add_argument("points", help="points file of the submitted session")
+    collect_parser.add_argument("--cutoff", type=int, default=10, help="cut-off angle [gon]")
+    collect_parser.add_argument("--projectname", default="")
+    collect_parser.add_argument("--projectleader", default="")
+    collect_parser.add_argument("--wms-url", default=WMS_URL, help="tile lookup service for points of failed jobs")
+    collect_parser.add_argument("--data-url", default=DATA_URL, help="tile download service for points of failed jobs")
+    args = parser.parse_args()
+
+    # one JSON record per finished stage on stderr
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "submit":
+        return submit(args)
+    if args.command == "status":
+        return status(args)
+    if args.command == "collect":
+        return collect(args)
+
+    if args.processes == 1:
+        work(queue_path=args.queue, folder=args.folder, wms_url=args.wms_url, data_url=args.data_url, lease=args.lease)
+        return 0
+
+    # independent workers, each with its own connection to the queue
+    start = time.perf_counter()
+    processes = [Process(target=work, kwargs={"queue_path": args.queue, "folder": args.folder, "wms_url": args.wms_url, "data_url": args.data_url, "lease": args.lease}) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    print(f"{args.processes} Prozesse, {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
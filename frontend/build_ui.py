@@ -0,0 +1,41 @@
+"""
+Compiles the Qt Designer file of the main window into Python, main.py then skips parsing the .ui at every launch.
+
+Run from the repository root after every change of frontend/gnss_planner_dialog_base.ui:
+    python frontend/build_ui.py
+"""
+import hashlib
+import io
+import os
+import sys
+
+UI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gnss_planner_dialog_base.ui")
+COMPILED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gnss_planner_dialog_base_ui.py")
+
+
+def get_ui_hash(path: str = UI_PATH) -> str:
+    # main.py compares it with UI_HASH of the compiled module and parses the .ui if they differ
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build(ui_path: str = UI_PATH, compiled_path: str = COMPILED_PATH) -> None:
+    from PyQt5 import uic
+
+    source = io.StringIO()
+    with open(os.path.relpath(ui_path), encoding="utf-8") as f: # relative, pyuic writes the name into the header
+        uic.compileUi(f, source)
+    with open(compiled_path, "w", encoding="utf-8") as f:
+        f.write(source.getvalue())
+        f.write(f"\n\nUI_HASH = \"{get_ui_hash(path=ui_path)}\"\n")
+    return
+
+
+def main() -> int:
+    build()
+    print(f"{os.path.relpath(UI_PATH)} -> {os.path.relpath(COMPILED_PATH)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
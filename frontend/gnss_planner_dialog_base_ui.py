@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'frontend/gnss_planner_dialog_base.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        MainWindow.setObjectName("MainWindow")
+        MainWindow.resize(819, 676)
+        self.centralwidget = QtWidgets.QWidget(MainWindow)
+        self.centralwidget.setObjectName("centralwidget")
+        self.gridLayout = QtWidgets.QGridLayout(self.centralwidget)
+        self.gridLayout.setObjectName("gridLayout")
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.tabWidget = QtWidgets.QTabWidget(self.centralwidget)
+        self.tabWidget.setEnabled(True)
+        self.tabWidget.setObjectName("tabWidget")
+        self.TAB_createProject = QtWidgets.QWidget()
+        self.TAB_createProject.setObjectName("TAB_createProject")
+        self.gridLayout_2 = QtWidgets.QGridLayout(self.TAB_createProject)
+        self.gridLayout_2.setObjectName("gridLayout_2")
+        self.gridLayout_3 = QtWidgets.QGridLayout()
+        self.gridLayout_3.setObjectName("gridLayout_3")
+        self.LE_pointEditor = QtWidgets.QLineEdit(self.TAB_createProject)
+        self.LE_pointEditor.setEnabled(False)
+        self.LE_pointEditor.setObjectName("LE_pointEditor")
+        self.gridLayout_3.addWidget(self.LE_pointEditor, 2, 1, 1, 1)
+        self.PBU_loadFile = QtWidgets.QPushButton(self.TAB_createProject)
+        self.PBU_loadFile.setEnabled(False)
+        self.PBU_loadFile.setObjectName("PBU_loadFile")
+        self.gridLayout_3.addWidget(self.PBU_loadFile, 2, 0, 1, 1)
+        self.LE_projectEditor = QtWidgets.QLineEdit(self.TAB_createProject)
+        self.LE_projectEditor.setEnabled(False)
+        self.LE_projectEditor.setText("")
+        self.LE_projectEditor.setObjectName("LE_projectEditor")
+        self.gridLayout_3.addWidget(self.LE_projectEditor, 0, 1, 1, 1)
+        self.PBU_openProject = QtWidgets.QPushButton(self.TAB_createProject)
+        self.PBU_openProject.setObjectName("PBU_openProject")
+        self.gridLayout_3.addWidget(self.PBU_openProject, 0, 0, 1, 1)
+        self.line_4 = QtWidgets.QFrame(self.TAB_createProject)
+        self.line_4.setFrameShape(QtWidgets.QFrame.HLine)
+        self.line_4.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.line_4.setObjectName("line_4")
+        self.gridLayout_3.addWidget(self.line_4, 1, 0, 1, 1)
+        self.line_5 = QtWidgets.QFrame(self.TAB_createProject)
+        self.line_5.setFrameShape(QtWidgets.QFrame.HLine)
+        self.line_5.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.line_5.setObjectName("line_5")
+        self.gridLayout_3.addWidget(self.line_5, 1, 1, 1, 1)
+        self.gridLayout_2.addLayout(self.gridLayout_3, 3, 0, 1, 1)
+        self.TW_tablePoints = QtWidgets.QTreeWidget(self.TAB_createProject)
+        self.TW_tablePoints.setEnabled(False)
+        self.TW_tablePoints.setObjectName("TW_tablePoints")
+        self.gridLayout_2.addWidget(self.TW_tablePoints, 4, 0, 1, 1)
+        self.tabWidget.addTab(self.TAB_createProject, "")
+        self.TAB_roughPlanning = QtWidgets.QWidget()
+        self.TAB_roughPlanning.setObjectName("TAB_roughPlanning")
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout(self.TAB_roughPlanning)
+        self.verticalLayout_2.setObjectName("verticalLayout_2")
+        self.groupBox = QtWidgets.QGroupBox(self.TAB_roughPlanning)
+        self.groupBox.setObjectName("groupBox")
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout(self.groupBox)
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.RB_conventional = QtWidgets.QRadioButton(self.groupBox)
+        self.RB_conventional.setChecked(True)
+        self.RB_conventional.setObjectName("RB_conventional")
+        self.horizontalLayout_2.addWidget(self.RB_conventional)
+        self.PB_ransac = QtWidgets.QRadioButton(self.groupBox)
+        self.PB_ransac.setEnabled(False)
+        self.PB_ransac.setChecked(False)
+        self.PB_ransac.setObjectName("PB_ransac")
+        self.horizontalLayout_2.addWidget(self.PB_ransac)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout_2.addItem(spacerItem)
+        self.verticalLayout_2.addWidget(self.groupBox)
+        self.horizontalLayout_4 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_4.setObjectName("horizontalLayout_4")
+        self.label = QtWidgets.QLabel(self.TAB_roughPlanning)
+        self.label.setObjectName("label")
+        self.horizontalLayout_4.addWidget(self.label)
+        self.LE_projectName = QtWidgets.QLineEdit(self.TAB_roughPlanning)
+        self.LE_projectName.setObjectName("LE_projectName")
+        self.horizontalLayout_4.addWidget(self.LE_projectName)
+        self.line = QtWidgets.QFrame(self.TAB_roughPlanning)
+        self.line.setFrameShape(QtWidgets.QFrame.VLine)
+        self.line.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.line.setObjectName("line")
+        self.horizontalLayout_4.addWidget(self.line)
+        self.label_2 = QtWidgets.QLabel(self.TAB_roughPlanning)
+        self.label_2.setObjectName("label_2")
+        self.horizontalLayout_4.addWidget(self.label_2)
+        self.LE_projectLeader = QtWidgets.QLineEdit(self.TAB_roughPlanning)
+        self.LE_projectLeader.setObjectName("LE_projectLeader")
+        self.horizontalLayout_4.addWidget(self.LE_projectLeader)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_4)
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.groupBox_2 = QtWidgets.QGroupBox(self.TAB_roughPlanning)
+        self.groupBox_2.setObjectName("groupBox_2")
+        self.gridLayout_4 = QtWidgets.QGridLayout(self.groupBox_2)
+        self.gridLayout_4.setObjectName("gridLayout_4")
+        self.HS_noLines = QtWidgets.QSlider(self.groupBox_2)
+        self.HS_noLines.setMinimum(0)
+        self.HS_noLines.setMaximum(80)
+        self.HS_noLines.setPageStep(5)
+        self.HS_noLines.setProperty("value", 5)
+        self.HS_noLines.setOrientation(QtCore.Qt.Horizontal)
+        self.HS_noLines.setTickPosition(QtWidgets.QSlider.TicksBelow)
+        self.HS_noLines.setTickInterval(10)
+        self.HS_noLines.setObjectName("HS_noLines")
+        self.gridLayout_4.addWidget(self.HS_noLines, 3, 1, 1, 1)
+        spacerItem1 = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
+        self.gridLayout_4.addItem(spacerItem1, 6, 0, 1, 1)
+        self.line_7 = QtWidgets.QFrame(self.groupBox_2)
+        self.line_7.setFrameShape(QtWidgets.QFrame.HLine)
+        self.line_7.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.line_7.setObjectName("line_7")
+        self.gridLayout_4.addWidget(self.line_7, 4, 1, 1, 1)
+        self.L_distance = QtWidgets.QLabel(self.groupBox_2)
+        self.L_distance.setObjectName("L_distance")
+        self.gridLayout_4.addWidget(self.L_distance, 0, 0, 1, 1)
+        self.L_noLines = QtWidgets.QLabel(self.groupBox_2)
+        self.L_noLines.setObjectName("L_noLines")
+        self.gridLayout_4.addWidget(self.L_noLines, 3, 0, 1, 1)
+        self.HS_distance = QtWidgets.QSlider(self.groupBox_2)
+        self.HS_distance.setMinimum(0)
+        self.HS_distance.setMaximum(5000)
+        self.HS_distance.setSingleStep(100)
+        self.HS_distance.setPageStep(1000)
+        self.HS_distance.setProperty("value", 500)
+        self.HS_distance.setOrientation(QtCore.Qt.Horizontal)
+        self.HS_distance.setTickPosition(QtWidgets.QSlider.TicksBelow)
+        self.HS_distance.setTickInterval(500)
+        self.HS_distance.setObjectName("HS_distance")
+        self.gridLayout_4.addWidget(self.HS_distance, 0, 1, 1, 1)
+        self.line_2 = QtWidgets.QFrame(self.groupBox_2)
+        self.line_2.setFrameShape(QtWidgets.QFrame.HLine)
+        self.line_2.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.line_2.setObjectName("line_2")
+        self.gridLayout_4.addWidget(self.line_2, 1, 1, 1, 1)
+        self.line_3 = QtWidgets.QFrame(self.groupBox_2)
+        self.line_3.setFrameShape(QtWidgets.QFrame.HLine)
+        self.line_3.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.line_3.setObjectName("line_3")
+        self.gridLayout_4.addWidget(self.line_3, 1, 0, 1, 1)
+        self.L_resolution = QtWidgets.QLabel(self.groupBox_2)
+        self.L_resolution.setObjectName("L_resolution")
+        self.gridLayout_4.addWidget(self.L_resolution, 2, 0, 1, 1)
+        self.L_lineView = QtWidgets.QLabel(self.groupBox_2)
+        self.L_lineView.setText("")
+        self.L_lineView.setObjectName("L_lineView")
+        self.gridLayout_4.addWidget(self.L_lineView, 6, 1, 1, 1)
+        self.line_6 = QtWidgets.QFrame(self.groupBox_2)
+        self.line_6.setFrameShape(QtWidgets.QFrame.HLine)
+        self.line_6.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.line_6.setObjectName("line_6")
+        self.gridLayout_4.addWidget(self.line_6, 4, 0, 1, 1)
+        self.HS_resolution = QtWidgets.QSlider(self.groupBox_2)
+        self.HS_resolution.setMaximum(100)
+        self.HS_resolution.setProperty("value", 1)
+        self.HS_resolution.setOrientation(QtCore.Qt.Horizontal)
+        self.HS_resolution.setTickPosition(QtWidgets.QSlider.TicksBelow)
+        self.HS_resolution.setTickInterval(10)
+        self.HS_resolution.setObjectName("HS_resolution")
+        self.gridLayout_4.addWidget(self.HS_resolution, 2, 1, 1, 1)
+        self.L_cutoff = QtWidgets.QLabel(self.groupBox_2)
+        self.L_cutoff.setObjectName("L_cutoff")
+        self.gridLayout_4.addWidget(self.L_cutoff, 5, 0, 1, 1)
+        self.HS_cutoff = QtWidgets.QSlider(self.groupBox_2)
+        self.HS_cutoff.setMaximum(100)
+        self.HS_cutoff.setSliderPosition(10)
+        self.HS_cutoff.setOrientation(QtCore.Qt.Horizontal)
+        self.HS_cutoff.setTickPosition(QtWidgets.QSlider.TicksBelow)
+        self.HS_cutoff.setTickInterval(10)
+        self.HS_cutoff.setObjectName("HS_cutoff")
+        self.gridLayout_4.addWidget(self.HS_cutoff, 5, 1, 1, 1)
+        self.horizontalLayout_5.addWidget(self.groupBox_2)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_5)
+        self.PBU_loadDEM = QtWidgets.QPushButton(self.TAB_roughPlanning)
+        self.PBU_loadDEM.setObjectName("PBU_loadDEM")
+        self.verticalLayout_2.addWidget(self.PBU_loadDEM)
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.PBU_roughPlanningSingle = QtWidgets.QPushButton(self.TAB_roughPlanning)
+        self.PBU_roughPlanningSingle.setObjectName("PBU_roughPlanningSingle")
+        self.horizontalLayout_3.addWidget(self.PBU_roughPlanningSingle)
+        self.PBU_roughPlanningAll = QtWidgets.QPushButton(self.TAB_roughPlanning)
+        self.PBU_roughPlanningAll.setObjectName("PBU_roughPlanningAll")
+        self.horizontalLayout_3.addWidget(self.PBU_roughPlanningAll)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_3)
+        self.tabWidget.addTab(self.TAB_roughPlanning, "")
+        self.horizontalLayout.addWidget(self.tabWidget)
+        self.gridLayout.addLayout(self.horizontalLayout, 0, 0, 1, 1)
+        self.horizontalLayout_6 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_6.setObjectName("horizontalLayout_6")
+        spacerItem2 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout_6.addItem(spacerItem2)
+        self.label_3 = QtWidgets.QLabel(self.centralwidget)
+        self.label_3.setObjectName("label_3")
+        self.horizontalLayout_6.addWidget(self.label_3)
+        self.processLabel = QtWidgets.QLabel(self.centralwidget)
+        self.processLabel.setText("")
+        self.processLabel.setObjectName("processLabel")
+        self.horizontalLayout_6.addWidget(self.processLabel)
+        self.progressBar = QtWidgets.QProgressBar(self.centralwidget)
+        self.progressBar.setStyleSheet("QProgressBar {\n"
+"    border: 1px solid rgb(126, 216, 255);\n"
+"    border-radius: 5px;\n"
+"    background-color: #E0E0E0;\n"
+"    text-align: center;\n"
+"    font-family: Arial;\n"
+"    font-size: 8px;\n"
+"}\n"
+"\n"
+"QProgressBar::chunk {\n"
+"    background-color:  rgb(126, 216, 255);\n"
+"    border-radius: 4px;\n"
+"    width: 20px;\n"
+"    margin: 0.5px;\n"
+"}\n"
+"")
+        self.progressBar.setProperty("value", 100)
+        self.progressBar.setObjectName("progressBar")
+        self.horizontalLayout_6.addWidget(self.progressBar)
+        self.gridLayout.addLayout(self.horizontalLayout_6, 1, 0, 1, 1)
+        MainWindow.setCentralWidget(self.centralwidget)
+
+        self.retranslateUi(MainWindow)
+        self.tabWidget.setCurrentIndex(1)
+        QtCore.QMetaObject.connectSlotsByName(MainWindow)
+
+    def retranslateUi(self, MainWindow):
+        _translate = QtCore.QCoreApplication.translate
+        MainWindow.setWindowTitle(_translate("MainWindow", "MainWindow"))
+        self.PBU_loadFile.setText(_translate("MainWindow", "Punktdatei"))
+        self.PBU_openProject.setText(_translate("MainWindow", "Projekt öffnen"))
+        self.TW_tablePoints.headerItem().setText(0, _translate("MainWindow", "Punktnummer"))
+        self.TW_tablePoints.headerItem().setText(1, _translate("MainWindow", "Ostkoordinate"))
+        self.TW_tablePoints.headerItem().setText(2, _translate("MainWindow", "Nordkoordinate"))
+        self.TW_tablePoints.headerItem().setText(3, _translate("MainWindow", "Höhe"))
+        self.TW_tablePoints.headerItem().setText(4, _translate("MainWindow", "Antennenhöhe"))
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.TAB_createProject), _translate("MainWindow", "Projekt erstellen"))
+        self.groupBox.setTitle(_translate("MainWindow", "Methode:"))
+        self.RB_conventional.setText(_translate("MainWindow", "Konventionell (Raster)"))
+        self.PB_ransac.setText(_translate("MainWindow", "RANSAC (in progress)"))
+        self.label.setText(_translate("MainWindow", "Projektname:"))
+        self.label_2.setText(_translate("MainWindow", "Projekleitung:"))
+        self.groupBox_2.setTitle(_translate("MainWindow", "Analyse Einstellungen:"))
+        self.L_distance.setText(_translate("MainWindow", "Distanz: 500 m"))
+        self.L_noLines.setText(_translate("MainWindow", "Anzahl Linien: 5"))
+        self.L_resolution.setText(_translate("MainWindow", "Auflösung: 1 m"))
+        self.L_cutoff.setText(_translate("MainWindow", "Cut-Off-Winkel: 10 gon"))
+        self.PBU_loadDEM.setText(_translate("MainWindow", "Höhenmodell laden (© swisstopo)"))
+        self.PBU_roughPlanningSingle.setText(_translate("MainWindow", "Einzelpunkt prüfen"))
+        self.PBU_roughPlanningAll.setText(_translate("MainWindow", "alle Punkte prüfen"))
+        self.tabWidget.setTabText(self.tabWidget.indexOf(self.TAB_roughPlanning), _translate("MainWindow", "Grobplanung"))
+        self.label_3.setText(_translate("MainWindow", "Prozess:"))
+
+
+UI_HASH = "a59459eb2f52a1fd0a77341098193a626a5a50e3c45b83442cc53cb05a3ec585"
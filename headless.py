@@ -0,0 +1,84 @@
+"""
+Runs the rough planning without the Qt UI.
+
+    python headless.py <project folder> <points file> --distance 500 --resolution 1 --lines 64 --cutoff 10 [--skip-dem] [--resume] [--profile cprofile]
+"""
+from datetime import datetime
+import argparse
+import logging
+import sys
+
+from backend.roughplanning.ReadWritePoints import ReadPoints
+from backend.roughplanning.Pipeline import RoughPlanningPipeline, PlanningSettings
+from backend.roughplanning.Downloader import WMS_URL, DATA_URL, ALTI_DATA_URL
+from backend.roughplanning.Merger import RasterCatalog
+
+from backend.roughplanning.helper_functions.timing import StageTimer
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="GNSS Grobplanung ohne Benutzeroberfläche.")
+    parser.add_argument("project", help="project folder (raster/ and results/ are created inside)")
+    parser.add_argument("points", help="points file (name, easting, northing, floor height, antenna height)")
+    parser.add_argument("--distance", type=int, default=500, help="analysis distance [m]")
+    parser.add_argument("--resolution", type=int, default=1, help="segment resolution [m]")
+    parser.add_argument("--lines", type=int, default=64, help="number of lines")
+    parser.add_argument("--cutoff", type=int, default=10, help="cut-off angle [gon]")
+    parser.add_argument("--method", choices=['CONVENTIONAL', 'RANSAC'], default='CONVENTIONAL')
+    parser.add_argument("--engine", choices=['LINES', 'BLOCKS'], default='LINES', help="BLOCKS: all points of a mosaic in one block-wise pass")
+    parser.add_argument("--kernel", choices=['POOL', 'NUMPY', 'NUMBA'], default='POOL', help="computation of the LINES engine (NUMBA needs numba, falls back to NUMPY)")
+    parser.add_argument("--executor", choices=['SERIAL', 'THREAD', 'PROCESS', 'FORKSERVER'], help="runs the lines of the POOL kernel (default: GNSS_PLANNER_EXECUTOR or PROCESS)")
+    parser.add_argument("--workers", type=int, help="threads or processes of the executor (default: sized from CPUs and DEM memory)")
+    parser.add_argument("--refine", type=float, help="adaptive azimuths: bisect where neighbouring elevation angles differ by more than this [gon]")
+    parser.add_argument("--refine-depth", type=int, default=4, help="maximal bisections per interval of the coarse fan")
+    parser.add_argument("--antenna-heights", type=float, nargs="+", help="additional antenna heights [m] computed in the same DEM pass, e.g. 1.5 2 5")
+    parser.add_argument("--horizon-raster", help="folder of a precomputed horizon raster (precompute_horizon.py), points inside are looked up")
+    parser.add_argument("--site-search", type=float, help="search the least obstructed position within this radius [m], written to results/sites.csv")
+    parser.add_argument("--site-spacing", type=float, default=1.0, help="distance between candidate positions [m]")
+    parser.add_argument("--almanac", nargs="+", help="YUMA/SEM almanacs for the visibility forecast, optionally with constellation prefix: G=gps.alm E=galileo.alm")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="start of the forecast (UTC, ISO format), default today 00:00")
+    parser.add_argument("--hours", type=float, default=24, help="length of the forecast [h]")
+    parser.add_argument("--step", type=float, default=1, help="epoch interval of the forecast [min]")
+    parser.add_argument("--pdop", type=float, default=6.0, help="PDOP threshold of the DOP page in the protocol")
+    parser.add_argument("--receivers", type=int, help="schedule the occupations for this number of receivers, written to results/timetable.csv")
+    parser.add_argument("--occupation", type=float, default=60, help="minimal occupation time per point [min]")
+    parser.add_argument("--changeover", type=float, default=30, help="time between two occupations of a receiver [min]")
+    parser.add_argument("--near-radius", type=float, help="swissSURFACE3D up to this distance [m], swissALTI3D beyond")
+    parser.add_argument("--dem-storage", choices=['NATIVE', 'FLOAT32', 'INT16', 'INT32'], default='NATIVE', help="data type of the merged DEM, INT16/INT32 store centimetres")
+    parser.add_argument("--no-cache", action="store_true", help="recompute all points instead of reusing results/horizon_cache.json")
+    parser.add_argument("--projectname", default="")
+    parser.add_argument("--projectleader", default="")
+    parser.add_argument("--skip-dem", action="store_true", help="do not download the DEM up-front (tiles are fetched on demand)")
+    parser.add_argument("--overlap", action="store_true", help="plan points while the remaining tiles are still downloading")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run, points in results/journal.jsonl are not planned again")
+    parser.add_argument("--profile", choices=['cprofile', 'pyinstrument'], help="profile every stage, output in results/profiles")
+    parser.add_argument("--profile-stages", nargs="+", help="only profile these stages")
+    parser.add_argument("--wms-url", default=WMS_URL, help="tile lookup service (e.g. a local fixture server)")
+    parser.add_argument("--data-url", default=DATA_URL, help="tile download service")
+    parser.add_argument("--far-data-url", default=ALTI_DATA_URL, help="swissALTI3D download service (--near-radius)")
+    args = parser.parse_args()
+
+    # one JSON record per finished stage on stderr
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # "G=gps.alm" -> ("G", "gps.alm"), without prefix GPS is assumed
+    almanacs = [tuple(almanac.split("=", 1)) if "=" in almanac else ("G", almanac) for almanac in args.almanac] if args.almanac else None
+
+    session = ReadPoints().read_file(path=args.points)
+    settings = PlanningSettings(distance=args.distance, segment_resolution=args.resolution, number_of_lines=args.lines, cutoff=args.cutoff, method=args.method, projectname=args.projectname, projectleader=args.projectleader, engine=args.engine, kernel=args.kernel, refinement_threshold=args.refine, refinement_depth=args.refine_depth, antenna_heights=args.antenna_heights, horizon_raster=args.horizon_raster, site_search_radius=args.site_search, site_search_spacing=args.site_spacing, almanacs=almanacs, forecast_start=args.start, forecast_hours=args.hours, forecast_step=args.step, dop_threshold=args.pdop, receivers=args.receivers, occupation_minutes=args.occupation, changeover_minutes=args.changeover, near_radius=args.near_radius, dem_storage=args.dem_storage, cache_results=not args.no_cache, executor=args.executor, workers=args.workers)
+    timer = StageTimer(profiler=args.profile, profile_stages=args.profile_stages)
+    pipeline = RoughPlanningPipeline(session=session, parent_directory=args.project, settings=settings, timer=timer, progress=lambda value, text: print(f"{value:>3} % {text}"), wms_url=args.wms_url, data_url=args.data_url, far_data_url=args.far_data_url)
+
+    if args.overlap:
+        pipeline.run_overlapped(resume=args.resume)
+        return 0
+
+    # a resumed run keeps the mosaics downloaded before the interruption
+    if not args.skip_dem and not (args.resume and RasterCatalog(path=pipeline.raster_directory).get_raster_paths()):
+        pipeline.load_dem()
+    pipeline.plan_all(resume=args.resume)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
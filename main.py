@@ -1,28 +1,42 @@
 import sys
 import time
-from PyQt5.QtWidgets import QMainWindow, QPushButton, QApplication, QLineEdit, QTreeWidget, QTabWidget, QFileDialog, QRadioButton, QLabel, QSlider, QProgressBar
-from PyQt5 import uic
+from typing import TYPE_CHECKING
+from PyQt5.QtWidgets import QMainWindow, QPushButton, QApplication, QLineEdit, QTreeWidget, QTabWidget, QFileDialog, QRadioButton, QLabel, QSlider, QProgressBar, QMessageBox
 from PyQt5.QtGui import QPixmap, QPainter
-from multiprocessing import Pool
 import os
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
 from backend.roughplanning.GNSS import GNSS_Session, GNSS_Point
 from backend.roughplanning.ReadWritePoints import ReadPoints, WritePoints
-from backend.roughplanning.BBOX import BBOXCreator, BBOX
-from backend.roughplanning.Downloader import LoadRasterDEM
-from backend.roughplanning.Merger import RasterMerger
-from backend.roughplanning.RoughPlanning import RoughPlanning
-from backend.roughplanning.RoughPlanDrawer import RoughPlanDrawer
-from backend.roughplanning.PDFCreator import PDFCreator
 
 from backend.roughplanning.helper_functions.ui import update_progresBar
+from backend.roughplanning.helper_functions.timing import StageTimer
+
+from frontend.build_ui import UI_PATH, get_ui_hash
+
+# matplotlib, rasterio, numba and fpdf are imported on first use (preview, DEM, planning, protocol), not at launch
+if TYPE_CHECKING:
+    from backend.roughplanning.Pipeline import RoughPlanningPipeline
+
+
+def setup_ui(window: QMainWindow) -> None:
+    # precompiled by frontend/build_ui.py, the .ui is only parsed if it was changed since
+    try:
+        from frontend.gnss_planner_dialog_base_ui import Ui_MainWindow, UI_HASH
+    except ImportError:
+        UI_HASH = None
+    if UI_HASH == get_ui_hash(path=UI_PATH):
+        Ui_MainWindow().setupUi(window)
+        return
+
+    from PyQt5 import uic
+    uic.loadUi(UI_PATH, window)
+    return
 
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super(MainWindow, self).__init__()
-        uic.loadUi('./frontend/gnss_planner_dialog_base.ui', self)
+        setup_ui(window=self)
 
         # find registers
         self.main_tab_widget = self.findChild(QTabWidget, "tabWidget")
@@ -93,6 +107,7 @@ class MainWindow(QMainWindow):
 
         # initialize variables
         self.gnss_session = GNSS_Session()
+        self.timer = StageTimer() # stage timing of all runs in this window
         
     def open_project(self) -> None:
         update_progresBar(bar=self.progressbar, label=self.process_label, value=0, text="Projekt öffnen")
@@ -137,26 +152,8 @@ class MainWindow(QMainWindow):
         return
     
     def load_dem(self) -> None:
-        update_progresBar(bar=self.progressbar, label=self.process_label, value=0, text="Berechne BBox")
-        creator = BBOXCreator(session=self.gnss_session)
-        bbox: BBOX = creator.get_bbox()
-
-        update_progresBar(bar=self.progressbar, label=self.process_label, value=10, text="Puffere BBox")
-        bbox = bbox.puffer_box(distance=self.get_distance_slider())
-
-        merger = RasterMerger(path=self.raster_directory)
-        merger.remove_downloads()
-
-        update_progresBar(bar=self.progressbar, label=self.process_label, value=20, text="Lade DEM herunter")
-        loader: LoadRasterDEM = LoadRasterDEM(bbox=bbox, download_folder=self.raster_directory)
-        tiles: list = loader.get_tiles()
-        loader.load_raster(tiles=tiles)
-
-        update_progresBar(bar=self.progressbar, label=self.process_label, value=80, text="Füge Raster zusammen")
-        merger.merge_raster()
-        merger.remove_downloads()
-        
-        update_progresBar(bar=self.progressbar, label=self.process_label, value=100, text="DEM heruntergeladen")
+        pipeline = self.create_pipeline()
+        pipeline.load_dem()
 
         return
 
@@ -164,40 +161,51 @@ class MainWindow(QMainWindow):
         pass
 
     def all_points_rough(self) -> None:
+        pipeline = self.create_pipeline()
+        resume = self.ask_resume(pipeline=pipeline)
+        if resume is None:
+            return
+        pipeline.plan_all(resume=resume)
+
+        return
+
+    def ask_resume(self, pipeline: "RoughPlanningPipeline") -> bool | None:
+        # the journal of an earlier run is only continued or overwritten after asking, None if the user cancels
+        from backend.roughplanning.RunJournal import RunJournal
+
+        journal = RunJournal(path=pipeline.journal_path)
+        if journal.read_header() is None:
+            return False
+
+        if journal.matches(parameters=pipeline.settings.get_horizon_parameters()):
+            completed = journal.read(parameters=pipeline.settings.get_horizon_parameters())
+            points = self.gnss_session.get_points()
+            number_completed = sum(point.name in completed for point in points)
+            text = f"Ein früherer Lauf mit denselben Parametern hat {number_completed} von {len(points)} Punkten geplant.\n\nFortsetzen? Mit Nein wird neu geplant und das Journal überschrieben."
+            answer = QMessageBox.question(self, "Planung fortsetzen", text, QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, QMessageBox.Yes)
+            if answer == QMessageBox.Cancel:
+                return None
+            return answer == QMessageBox.Yes
+
+        text = "Das Journal eines früheren Laufs wurde mit anderen Parametern erstellt und kann nicht fortgesetzt werden.\n\nNeu planen und das Journal überschreiben?"
+        answer = QMessageBox.question(self, "Journal überschreiben", text, QMessageBox.Yes | QMessageBox.Cancel, QMessageBox.Cancel)
+        if answer != QMessageBox.Yes:
+            return None
+        return False
+
+    def create_pipeline(self) -> "RoughPlanningPipeline":
+        from backend.roughplanning.Pipeline import RoughPlanningPipeline, PlanningSettings
+
         if self.ransac_radio_button.isChecked():
             method = 'RANSAC'
         else:
             method = 'CONVENTIONAL'
 
-        min_elevation = self.get_cutoff()
+        settings = PlanningSettings(distance=self.get_distance_slider(), segment_resolution=self.get_segment_resolution(), number_of_lines=self.get_number_of_lines(), cutoff=self.get_cutoff(), method=method, projectname=self.project_name_LE.text(), projectleader=self.project_leader_LE.text())
+        progress = lambda value, text: update_progresBar(bar=self.progressbar, label=self.process_label, value=value, text=text)
 
-        number_of_lines = int(self.get_number_of_lines())
-        line_length = self.get_distance_slider()
-        number_of_segments = int(line_length / self.get_segment_resolution())
-
-        points = self.gnss_session.get_points()
-
-        for pt_idx, point in enumerate(points):
-            percentage_counter = int(pt_idx / len(points) * 100) # for progressBar and label
-            update_progresBar(bar=self.progressbar, label=self.process_label, value=percentage_counter, text=f"{pt_idx + 1} / {len(points)} Grobplanung.")
-            rough_planner = RoughPlanning(point=point, dem_path=os.path.join(self.raster_directory, "raster.tif"), method=method)
-            azimuths, elevation_angles = rough_planner.plan(number_of_lines=number_of_lines, line_length=line_length, number_of_segments=number_of_segments)
-
-            drawer = RoughPlanDrawer()
-            panorama_path = os.path.join(self.parent_directory, f"results/panorama{point.name}.png")
-            polar_path = os.path.join(self.parent_directory, f"results/polar{point.name}.png")
-            drawer.draw_panorama_diagram(azimuths=azimuths, elevation_angles=elevation_angles, min_elevation=min_elevation, image_path=panorama_path, pointname=point.name)
-            drawer.draw_polar_diagram(azimuths=azimuths, elevation_angles=elevation_angles, min_elevation=min_elevation, image_path=polar_path, pointname=point.name)
-            
-        legend_path = os.path.join(self.parent_directory, "results/legend.png")
-        drawer.save_legend(legend_path=legend_path)
-
-        update_progresBar(bar=self.progressbar, label=self.process_label, value=99, text=f"erstelle Protokoll")
-        pdf_creator = PDFCreator(results_path=self.results_directory)
-        pdf_creator.create_protocol(points=self.gnss_session.get_points(), projectname=self.project_name_LE.text(), projectleader=self.project_leader_LE.text(), distance=self.get_distance_slider(), segment_length=self.get_segment_resolution(), no_lines=self.get_number_of_lines(), cutoff=self.get_cutoff())
-
-        update_progresBar(bar=self.progressbar, label=self.process_label, value=100, text=f"Grobplanung abgeschlossen")
-        return
+        pipeline = RoughPlanningPipeline(session=self.gnss_session, parent_directory=self.parent_directory, settings=settings, timer=self.timer, progress=progress)
+        return pipeline
 
     def get_distance_slider(self) -> float | int:
         value = self.distance_slider.value()
@@ -249,6 +257,9 @@ class MainWindow(QMainWindow):
         return
     
     def update_preview_image(self) -> None:
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from backend.roughplanning.RoughPlanDrawer import RoughPlanDrawer
+
         drawer = RoughPlanDrawer()
 
         num_lines = self.get_number_of_lines()  # Annahme: Funktionen zur Rückgabe der Slider-Werte
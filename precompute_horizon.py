@@ -0,0 +1,35 @@
+"""
+Precomputes the horizon raster of a work area for instant point queries (headless.py --horizon-raster <folder>).
+
+    python precompute_horizon.py <DEM> <output folder> --spacing 10 --distance 500 --lines 64 [--heights 0 2 5]
+
+The computation is resumable: running the same command again continues with the missing chunks.
+"""
+import argparse
+import sys
+
+from backend.roughplanning.HorizonRaster import HorizonRasterBuilder
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Horizont-Raster für ein Arbeitsgebiet vorberechnen.")
+    parser.add_argument("dem", help="DEM of the work area (e.g. raster/cluster_0/raster.tif)")
+    parser.add_argument("folder", help="output folder of the horizon raster")
+    parser.add_argument("--spacing", type=float, default=10, help="distance between grid nodes [m]")
+    parser.add_argument("--distance", type=int, default=500, help="analysis distance [m]")
+    parser.add_argument("--resolution", type=float, default=1, help="segment resolution [m]")
+    parser.add_argument("--lines", type=int, default=64, help="number of lines")
+    parser.add_argument("--heights", type=float, nargs="+", default=[0.0, 2.0, 5.0], help="GNSS heights above the terrain [m]")
+    parser.add_argument("--chunk-size", type=int, default=16, help="grid nodes per chunk edge")
+    parser.add_argument("--kernel", choices=['NUMPY', 'NUMBA'], default='NUMBA', help="NUMBA needs numba, falls back to NUMPY")
+    parser.add_argument("--processes", type=int, help="workers (default: sized from CPUs and DEM memory)")
+    parser.add_argument("--executor", choices=['SERIAL', 'THREAD', 'PROCESS', 'FORKSERVER'], help="runs the chunks (default: GNSS_PLANNER_EXECUTOR or PROCESS)")
+    args = parser.parse_args()
+
+    builder = HorizonRasterBuilder(dem_path=args.dem, folder=args.folder, spacing=args.spacing, number_of_lines=args.lines, line_length=args.distance, segment_resolution=args.resolution, height_offsets=args.heights, chunk_size=args.chunk_size, kernel=args.kernel, processes=args.processes, executor=args.executor)
+    builder.build(progress=lambda value, text: print(f"{value:>3} % {text}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
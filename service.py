@@ -0,0 +1,47 @@
+"""
+Runs the rough planning as a local HTTP/JSON service for other tools.
+
+    python service.py <project folder> --port 8765 --distance 500 --resolution 1 --lines 64
+
+    curl -X POST localhost:8765/plan -d '{"points": [{"name": "P1", "easting": 2600400, "northing": 1200400, "floor_height": 548, "antenna_height": 2}]}'
+    curl localhost:8765/metrics
+"""
+import argparse
+import logging
+import os
+import sys
+
+from backend.roughplanning.Pipeline import PlanningSettings
+from backend.roughplanning.PlanningService import PlanningService
+from backend.roughplanning.Downloader import WMS_URL, DATA_URL
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="GNSS Grobplanung als lokaler Dienst.")
+    parser.add_argument("project", help="project folder (tiles and DEM windows are kept in raster/)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--distance", type=int, default=500, help="analysis distance [m]")
+    parser.add_argument("--resolution", type=int, default=1, help="segment resolution [m]")
+    parser.add_argument("--lines", type=int, default=64, help="number of lines")
+    parser.add_argument("--kernel", choices=['NUMPY', 'NUMBA'], default='NUMBA', help="NUMBA needs numba, falls back to NUMPY")
+    parser.add_argument("--dem-storage", choices=['NATIVE', 'FLOAT32', 'INT16', 'INT32'], default='NATIVE', help="data type of the DEM windows, INT16/INT32 store centimetres")
+    parser.add_argument("--batch-window", type=float, default=0.02, help="time a request waits for others to be planned with it [s]")
+    parser.add_argument("--max-batch", type=int, default=256, help="maximal number of points of a batch")
+    parser.add_argument("--windows", type=int, default=4, help="number of DEM windows kept in memory")
+    parser.add_argument("--wms-url", default=WMS_URL, help="tile lookup service (e.g. a local fixture server)")
+    parser.add_argument("--data-url", default=DATA_URL, help="tile download service")
+    args = parser.parse_args()
+
+    # one JSON record per batch on stderr
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    settings = PlanningSettings(distance=args.distance, segment_resolution=args.resolution, number_of_lines=args.lines, cutoff=0, kernel=args.kernel, dem_storage=args.dem_storage)
+    service = PlanningService(settings=settings, raster_directory=os.path.join(args.project, "raster"), wms_url=args.wms_url, data_url=args.data_url, batch_window=args.batch_window, max_batch_points=args.max_batch, max_windows=args.windows)
+    print(f"Starte Dienst auf http://{args.host}:{args.port}")
+    service.serve(host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
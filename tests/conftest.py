@@ -0,0 +1,27 @@
+import os
+
+import matplotlib
+matplotlib.use("Agg") # no display needed
+import pytest
+
+from benchmarks.stub_server import StubTileServer
+from benchmarks.synthetic import create_dem
+
+
+@pytest.fixture(scope="session")
+def server_tile_folder(tmp_path_factory) -> str:
+    # synthetic tiles only depend on tilekey and temporalkey, they are generated once per session
+    return str(tmp_path_factory.mktemp("server"))
+
+
+@pytest.fixture
+def tile_server(server_tile_folder):
+    # local stand-in for the swisstopo services, tiles are generated on first request
+    with StubTileServer(tile_folder=server_tile_folder) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def dem_path(tmp_path_factory) -> str:
+    # 1 km x 1 km at 0.5 m
+    return create_dem(path=os.path.join(tmp_path_factory.mktemp("dem"), "raster.tif"), easting=2_600_000, northing=1_200_000, width=2000, height=2000)
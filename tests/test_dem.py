@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+import rasterio
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.DEM import LazyTileDEM, RasterDEM
+from backend.roughplanning.Executor import Executor
+from backend.roughplanning.RoughPlanning import RoughPlanning
+
+
+def test_lazy_tile_dem_fetches_tiles_on_first_access(tile_server, tmp_path):
+    dem = LazyTileDEM(cache_folder=str(tmp_path / "tiles"), wms_url=tile_server.wms_url, data_url=tile_server.data_url)
+    assert tile_server.requests == []
+
+    heights = dem.sample(eastings=np.array([2_600_100.2, 2_600_900.7]), northings=np.array([1_200_100.2, 1_200_400.1]))
+
+    # one lookup and one download, only for the sampled tile
+    assert len([path for path in tile_server.requests if path.startswith("/wms")]) == 1
+    assert len([path for path in tile_server.requests if path.startswith("/data")]) == 1
+    tile_path = dem.fetch_tile(i=2600, j=1200)
+    with rasterio.open(tile_path) as src:
+        rows, cols = rasterio.transform.rowcol(src.transform, [2_600_100.2, 2_600_900.7], [1_200_100.2, 1_200_400.1])
+        np.testing.assert_array_equal(heights, src.read(1)[rows, cols])
+
+
+def test_lazy_tile_dem_reuses_cached_tiles(tile_server, tmp_path):
+    cache_folder = str(tmp_path / "tiles")
+    first = LazyTileDEM(cache_folder=cache_folder, wms_url=tile_server.wms_url, data_url=tile_server.data_url)
+    expected = first.sample(eastings=np.array([2_600_500.0, 2_601_500.0]), northings=np.array([1_200_500.0, 1_200_500.0]))
+    requests = len(tile_server.requests)
+
+    # a new provider (e.g. the next run) reads the tiles from the cache folder
+    second = LazyTileDEM(cache_folder=cache_folder, wms_url=tile_server.wms_url, data_url=tile_server.data_url)
+    np.testing.assert_array_equal(second.sample(eastings=np.array([2_600_500.0, 2_601_500.0]), northings=np.array([1_200_500.0, 1_200_500.0])), expected)
+    assert len(tile_server.requests) == requests
+
+
+def test_lazy_tile_dem_matches_merged_raster(tile_server, tmp_path, dem_path):
+    # tiles of the stub server and a raster of the same area hold the same hills, up to the noise
+    dem = LazyTileDEM(cache_folder=str(tmp_path / "tiles"), wms_url=tile_server.wms_url, data_url=tile_server.data_url)
+    eastings = 2_600_000 + np.linspace(10, 990, 50)
+    northings = 1_200_000 + np.linspace(990, 10, 50)
+    difference = dem.sample(eastings=eastings, northings=northings) - RasterDEM(path=dem_path).sample(eastings=eastings, northings=northings)
+    assert np.max(np.abs(difference)) < 5
+
+
+def test_lazy_tile_dem_with_threads_on_cold_cache(tile_server, tmp_path):
+    # lines of one point sampled by 16 threads reach the same tiles at the same time
+    point = GNSS_Point(name="P1", easting=2_600_950.0, northing=1_200_950.0, floor_height=600.0)
+    dem = LazyTileDEM(cache_folder=str(tmp_path / "tiles"), wms_url=tile_server.wms_url, data_url=tile_server.data_url)
+    threaded = RoughPlanning(point=point, dem_path="", method="CONVENTIONAL", dem_provider=dem, executor=Executor(backend='THREAD', workers=16)).plan(number_of_lines=32, line_length=200, number_of_segments=200, kernel='POOL')
+
+    # every tile is downloaded once, no temporary file is left behind
+    downloads = [path for path in tile_server.requests if path.startswith("/data")]
+    assert len(downloads) == len(set(downloads)) == 4
+    assert not [name for name in os.listdir(tmp_path / "tiles") if name.endswith(".part")]
+
+    serial = RoughPlanning(point=point, dem_path="", method="CONVENTIONAL", dem_provider=dem, executor=Executor(backend='SERIAL')).plan(number_of_lines=32, line_length=200, number_of_segments=200, kernel='POOL')
+    np.testing.assert_array_equal(threaded[1], serial[1])
+
+
+def test_lazy_tile_dem_reads_tiles_once_per_pool_worker(tile_server, tmp_path, monkeypatch):
+    point = GNSS_Point(name="P1", easting=2_600_950.0, northing=1_200_950.0, floor_height=600.0)
+    cache_folder = str(tmp_path / "tiles")
+    for i, j in ((2600, 1200), (2601, 1200), (2600, 1201), (2601, 1201)):
+        LazyTileDEM(cache_folder=cache_folder, wms_url=tile_server.wms_url, data_url=tile_server.data_url).fetch_tile(i=i, j=j)
+
+    # every read of a worker process is recorded in a file of the test
+    reads_path = tmp_path / "reads.txt"
+    read_tile = LazyTileDEM.read_tile
+    def record_read(self, filepath: str):
+        with open(reads_path, "a") as f:
+            f.write(f"{os.getpid()} {os.path.basename(filepath)}\n")
+        return read_tile(self, filepath=filepath)
+    monkeypatch.setattr(LazyTileDEM, "read_tile", record_read)
+
+    dem = LazyTileDEM(cache_folder=cache_folder, wms_url=tile_server.wms_url, data_url=tile_server.data_url)
+    RoughPlanning(point=point, dem_path="", method="CONVENTIONAL", dem_provider=dem, executor=Executor(backend='PROCESS', workers=2)).plan(number_of_lines=32, line_length=200, number_of_segments=200, kernel='POOL')
+
+    reads = reads_path.read_text().splitlines()
+    assert len(reads) == len(set(reads)) # a tile is read once per process, not once per line
+    assert len(reads) <= 2 * 4
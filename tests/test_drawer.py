@@ -0,0 +1,28 @@
+import matplotlib.axes
+import numpy as np
+
+from backend.roughplanning.RoughPlanDrawer import RoughPlanDrawer
+
+
+def test_polar_diagram_keeps_refined_azimuths(tmp_path, monkeypatch):
+    # coarse fan of 16 lines, bisected down to 0.4 gon around a mast at 100.4 gon
+    azimuths = sorted([25.0 * idx for idx in range(16)] + [100.0 + 0.4 * idx for idx in range(1, 5)])
+    elevation_angles = [30.0 if azimuth == 100.4 else 5.0 for azimuth in azimuths]
+
+    plotted = []
+    plot = matplotlib.axes.Axes.plot
+    def record_plot(self, *args, **kwargs):
+        plotted.append((np.asarray(args[0]), np.asarray(args[1]), kwargs.get("color")))
+        return plot(self, *args, **kwargs)
+    monkeypatch.setattr(matplotlib.axes.Axes, "plot", record_plot)
+
+    drawer = RoughPlanDrawer()
+    drawer.draw_panorama_diagram(azimuths=azimuths, elevation_angles=elevation_angles, min_elevation=10, image_path=str(tmp_path / "panorama.png"), pointname="P1")
+    drawer.draw_polar_diagram(azimuths=azimuths, elevation_angles=elevation_angles, min_elevation=10, image_path=str(tmp_path / "polar.png"), pointname="P1")
+
+    theta, radius = [(theta, radius) for theta, radius, color in plotted if color == 'grey'][-1]
+    gon = np.rad2deg(theta) * 10 / 9
+    np.testing.assert_allclose(gon, [*[azimuth for azimuth in azimuths if azimuth < 400], 400], atol=1e-9)
+    # the mast is drawn with its full height, the ring is closed
+    np.testing.assert_allclose(100 - radius[np.argmin(np.abs(gon - 100.4))] * 200 / np.pi, 30.0)
+    assert radius[0] == radius[-1]
@@ -0,0 +1,45 @@
+import json
+import os
+
+from backend.roughplanning.GNSS import GNSS_Session, GNSS_Point
+from backend.roughplanning.HorizonCache import HorizonCache, FAR_TILE_PREFIX
+from backend.roughplanning.Pipeline import RoughPlanningPipeline, PlanningSettings
+
+# near disk (100 m) within the tiles 2599-2600, far disk (300 m) reaches 2601
+POINT = GNSS_Point(name="P1", easting=2_600_850.0, northing=1_200_500.0, floor_height=600.0, antenna_height=2.0)
+
+
+def test_republished_far_tile_invalidates_entry(tmp_path):
+    cache = HorizonCache(path=str(tmp_path / "cache.json"), radius=100, far_radius=300)
+    tile_keys = cache.get_tile_keys(point=POINT)
+    assert FAR_TILE_PREFIX + "2601_1200" in tile_keys and "2601_1200" not in tile_keys
+
+    tile_versions = {tile_key: "2020" for tile_key in tile_keys}
+    assert cache.put(point=POINT, parameters={}, tile_versions=tile_versions, azimuths=[0.0], elevation_angles=[1.0])
+    assert cache.get(point=POINT, parameters={}, tile_versions=tile_versions) is not None
+    assert cache.get(point=POINT, parameters={}, tile_versions={**tile_versions, FAR_TILE_PREFIX + "2601_1200": "2024"}) is None
+
+
+def run_pipeline(server, folder: str) -> dict:
+    session = GNSS_Session()
+    session.add_point(POINT)
+    settings = PlanningSettings(distance=300, segment_resolution=1, number_of_lines=16, cutoff=0, kernel='NUMPY', near_radius=100)
+    pipeline = RoughPlanningPipeline(session=session, parent_directory=folder, settings=settings, wms_url=server.wms_url, data_url=server.data_url, far_data_url=server.data_url)
+    pipeline.load_dem()
+    pipeline.plan_all()
+    with open(pipeline.cache_path) as f:
+        return json.load(f)["points"][POINT.name]
+
+
+def test_pipeline_replans_with_republished_far_tile(tile_server, tmp_path):
+    entry = run_pipeline(server=tile_server, folder=str(tmp_path))
+    assert entry["tiles"][FAR_TILE_PREFIX + "2601_1200"] == "2020"
+    assert os.path.exists(tmp_path / "raster" / "far_tiles" / "2601-1200_2020.tif")
+
+    tile_server.temporalkeys["2601_1200"] = "2024"
+    entry = run_pipeline(server=tile_server, folder=str(tmp_path))
+
+    # planned again with the new coarse tile
+    assert entry["tiles"][FAR_TILE_PREFIX + "2601_1200"] == "2024"
+    assert not os.path.exists(tmp_path / "raster" / "far_tiles" / "2601-1200_2020.tif")
+    assert os.path.exists(tmp_path / "raster" / "far_tiles" / "2601-1200_2024.tif")
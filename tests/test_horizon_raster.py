@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.RoughPlanning import RoughPlanning
+from backend.roughplanning.HorizonRaster import HorizonRasterBuilder, HorizonRaster
+
+POINT = GNSS_Point(name="1", easting=2_600_480.0, northing=1_200_510.0, floor_height=500.0)
+
+
+@pytest.fixture(scope="module")
+def horizon_raster(dem_path, tmp_path_factory) -> HorizonRaster:
+    folder = str(tmp_path_factory.mktemp("horizon_raster"))
+    HorizonRasterBuilder(dem_path=dem_path, folder=folder, spacing=50, number_of_lines=16, line_length=200, chunk_size=4, kernel='NUMPY', executor='SERIAL').build()
+    return HorizonRaster(folder=folder)
+
+
+def test_matching_parameters_are_looked_up(dem_path, horizon_raster):
+    result = RoughPlanning(point=POINT, dem_path=dem_path, method="CONVENTIONAL", horizon_raster=horizon_raster).plan(number_of_lines=16, line_length=200, number_of_segments=200, kernel='NUMPY')
+    assert result == horizon_raster.lookup(easting=POINT.easting, northing=POINT.northing, gnss_height=POINT.floor_height + POINT.antenna_height)
+
+
+@pytest.mark.parametrize("number_of_lines, line_length, number_of_segments", [(16, 400, 400), (32, 200, 200), (16, 200, 100)])
+def test_differing_parameters_are_ray_cast(dem_path, horizon_raster, number_of_lines, line_length, number_of_segments):
+    parameters = {"number_of_lines": number_of_lines, "line_length": line_length, "number_of_segments": number_of_segments, "kernel": 'NUMPY'}
+    result = RoughPlanning(point=POINT, dem_path=dem_path, method="CONVENTIONAL", horizon_raster=horizon_raster).plan(**parameters)
+    reference = RoughPlanning(point=POINT, dem_path=dem_path, method="CONVENTIONAL").plan(**parameters)
+
+    assert len(result[0]) == number_of_lines
+    np.testing.assert_array_equal(result[0], reference[0])
+    np.testing.assert_array_equal(result[1], reference[1])
@@ -0,0 +1,71 @@
+import json
+import os
+import time
+
+from backend.roughplanning.BBOX import BBOX
+from backend.roughplanning.Downloader import LoadRasterDEM
+from backend.roughplanning.HTTPCache import HTTPCache, INDEX_FILE
+
+TILE_ORIGINS = [(2_600_000 + i * 1000, 1_200_000 + j * 1000) for i in range(4) for j in range(4)]
+
+
+def create_loader(server, folder) -> LoadRasterDEM:
+    return LoadRasterDEM(bbox=BBOX(Emin=2_600_000, Emax=2_604_000, Nmin=1_200_000, Nmax=1_204_000), download_folder=str(folder / "download"), wms_url=server.wms_url, data_url=server.data_url, cache_folder=str(folder / "http_cache"))
+
+
+def read_index(folder) -> dict:
+    with open(folder / "http_cache" / INDEX_FILE) as f:
+        return json.load(f)
+
+
+def test_unchanged_responses_are_revalidated_with_304(tile_server, tmp_path):
+    url = f"{tile_server.wms_url}?BBOX=2600500%2C1200500%2C2600501%2C1200501"
+    cache = HTTPCache(folder=str(tmp_path))
+
+    path, downloaded = cache.fetch(url=url)
+    assert downloaded and os.path.exists(path)
+    assert cache.fetch(url=url) == (path, False)
+    assert tile_server.not_modified == 1
+
+    # a republished tile changes the body and with it the ETag -> 200
+    tile_server.temporalkeys["2600_1200"] = "2024"
+    assert cache.fetch(url=url) == (path, True)
+    with open(path) as f:
+        assert "2024" in f.read()
+
+
+def test_parallel_requests_keep_all_validators(tile_server, tmp_path, monkeypatch):
+    # a slow start of the cache widens the window in which parallel threads could create several instances
+    instances = []
+    post_init = HTTPCache.__post_init__
+    def slow_post_init(cache: HTTPCache) -> None:
+        instances.append(cache)
+        time.sleep(0.05)
+        post_init(cache)
+    monkeypatch.setattr(HTTPCache, "__post_init__", slow_post_init)
+
+    # 16 lookups and 16 downloads from 8 threads share one index
+    loader = create_loader(server=tile_server, folder=tmp_path)
+    tiles = loader.get_tiles(tile_origins=TILE_ORIGINS)
+    loader.load_raster(tiles=tiles)
+    assert len(tiles) == 16
+    assert len(instances) == 1
+    assert len(read_index(folder=tmp_path)) == 32
+    assert not [name for name in os.listdir(tmp_path / "http_cache") if name.endswith(".part")]
+
+    # a new run revalidates everything without transferring a body
+    loader = create_loader(server=tile_server, folder=tmp_path)
+    assert loader.revalidate_tiles(tiles=loader.get_tiles(tile_origins=TILE_ORIGINS)) == []
+    assert tile_server.not_modified == 32
+
+
+def test_index_is_written_once_per_batch(tile_server, tmp_path, monkeypatch):
+    cache = HTTPCache(folder=str(tmp_path))
+    saves = []
+    save = cache.save
+    monkeypatch.setattr(cache, "save", lambda: saves.append(1) or save())
+
+    cache.fetch_all(urls=[f"{tile_server.wms_url}?BBOX={2_600_500 + i * 1000}%2C1200500%2C0%2C0" for i in range(10)])
+    assert len(saves) == 1
+    with open(tmp_path / INDEX_FILE) as f:
+        assert len(json.load(f)) == 10
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+import distribute
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.DEM import LazyTileDEM
+from backend.roughplanning.JobQueue import JobQueue
+from backend.roughplanning.Pipeline import PlanningSettings
+from backend.roughplanning.RoughPlanning import RoughPlanning
+
+POINTS = [GNSS_Point(name=f"P{idx}", easting=2_600_300.0 + idx * 250, northing=1_200_700.0 - idx * 150, floor_height=600.0) for idx in range(6)]
+SETTINGS = PlanningSettings(distance=200, segment_resolution=1, number_of_lines=16, cutoff=0, kernel='NUMPY')
+
+
+def submit(path: str, max_attempts: int = 3) -> JobQueue:
+    queue = JobQueue(path=path, max_attempts=max_attempts)
+    queue.submit(points=POINTS, parameters=SETTINGS.get_horizon_parameters(), radius=SETTINGS.get_dem_margin(), batch_size=2)
+    return queue
+
+
+def claim_and_hang(queue_path: str, claimed) -> None:
+    # a worker which dies while it holds a job, without calling fail()
+    queue = JobQueue(path=queue_path)
+    queue.claim(worker="killed", lease_seconds=1)
+    claimed.set()
+    time.sleep(600)
+
+
+def get_attempts(path: str) -> dict[int, int]:
+    with sqlite3.connect(path) as connection:
+        return dict(connection.execute("SELECT id, attempts FROM jobs"))
+
+
+def test_workers_take_over_the_job_of_a_killed_worker(tile_server, tmp_path):
+    queue_path = str(tmp_path / "queue.sqlite")
+    queue = submit(path=queue_path)
+
+    # spawn: no forked numba/TBB state, every worker opens its own connection like on another node
+    context = multiprocessing.get_context("spawn")
+    claimed = context.Event()
+    hanging = context.Process(target=claim_and_hang, args=(queue_path, claimed))
+    hanging.start()
+    assert claimed.wait(timeout=60)
+    hanging.kill()
+    hanging.join()
+    assert queue.get_progress()['leased'] == 1
+
+    time.sleep(1.1) # lease of the killed worker expired
+    workers = [context.Process(target=distribute.work, kwargs={"queue_path": queue_path, "folder": str(tmp_path / f"node{idx}"), "wms_url": tile_server.wms_url, "data_url": tile_server.data_url, "lease": 300}) for idx in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+
+    assert queue.get_progress() == {'pending': 0, 'leased': 0, 'done': 3, 'failed': 0}
+    assert sorted(get_attempts(path=queue_path).values()) == [1, 1, 2] # the job of the killed worker was claimed again
+
+    horizons = queue.get_horizons()
+    lazy_dem = LazyTileDEM(cache_folder=str(tmp_path / "reference"), wms_url=tile_server.wms_url, data_url=tile_server.data_url)
+    for point in POINTS:
+        reference = RoughPlanning(point=point, dem_path="", method="CONVENTIONAL", dem_provider=lazy_dem).plan(number_of_lines=16, line_length=200, number_of_segments=200, kernel='NUMPY')
+        np.testing.assert_allclose(horizons[point.name][1], reference[1], rtol=0, atol=1e-9)
+
+
+def test_expired_lease_after_last_attempt_fails_the_job(tmp_path):
+    queue = submit(path=str(tmp_path / "queue.sqlite"), max_attempts=2)
+
+    # the workers of job 1 die twice, their leases expire
+    for attempt in range(2):
+        job = queue.claim(worker=f"dead{attempt}", lease_seconds=-1)
+        assert job.id == 1
+
+    progress = queue.get_progress()
+    assert progress == {'pending': 2, 'leased': 0, 'done': 0, 'failed': 1}
+    assert "2 Versuchen" in queue.get_errors()[1]
+    assert [queue.claim(worker="alive").id for _ in range(2)] == [2, 3]
+    assert queue.claim(worker="alive") is None
+
+    # a late commit of a presumed dead worker is still accepted
+    assert queue.complete(job_id=1, horizons={})
+    assert queue.get_progress()['failed'] == 0
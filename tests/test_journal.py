@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.RunJournal import RunJournal
+
+PARAMETERS = {"distance": 500, "number_of_lines": 64}
+
+
+def create_point(name: str) -> GNSS_Point:
+    return GNSS_Point(name=name, easting=2_600_500.0, northing=1_200_500.0, floor_height=500.0, antenna_height=2.0)
+
+
+def test_resume_returns_completed_points(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path=path)
+    journal.start(parameters=PARAMETERS)
+    journal.append(point=create_point("P1"), azimuths=[0.0, 200.0], elevation_angles=[1.0, 2.0])
+    with open(path, "a") as f:
+        f.write('{"name": "P2", "azimu') # cut off by the interruption
+
+    resumed = RunJournal(path=path)
+    assert resumed.matches(parameters=PARAMETERS)
+    assert list(resumed.start(parameters=PARAMETERS, resume=True)) == ["P1"]
+    assert resumed.get_completed(point=create_point("P1"))["elevation_angles"] == [1.0, 2.0]
+    assert resumed.get_completed(point=create_point("P2")) is None
+
+    resumed.append(point=create_point("P2"), azimuths=[0.0], elevation_angles=[3.0])
+    assert list(RunJournal(path=path).start(parameters=PARAMETERS, resume=True)) == ["P1", "P2"]
+
+
+def test_resume_with_other_parameters_is_rejected(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    RunJournal(path=path).start(parameters=PARAMETERS)
+
+    journal = RunJournal(path=path)
+    assert not journal.matches(parameters={**PARAMETERS, "distance": 1000})
+    with pytest.raises(ValueError):
+        journal.start(parameters={**PARAMETERS, "distance": 1000}, resume=True)
+
+
+@pytest.mark.parametrize("content", ["", '{"version": 1, "param'])
+def test_empty_journal_starts_anew(tmp_path, content):
+    # the run died while the header was written
+    path = tmp_path / "journal.jsonl"
+    path.write_text(content)
+
+    journal = RunJournal(path=str(path))
+    assert journal.read_header() is None
+    assert journal.start(parameters=PARAMETERS, resume=True) == {}
+    journal.append(point=create_point("P1"), azimuths=[0.0], elevation_angles=[1.0])
+
+    lines = path.read_text().splitlines()
+    assert json.loads(lines[0])["parameters"] == PARAMETERS
+    assert list(RunJournal(path=str(path)).start(parameters=PARAMETERS, resume=True)) == ["P1"]
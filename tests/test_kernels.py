@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.RoughPlanning import RoughPlanning
+from backend.roughplanning.BlockScheduler import BlockHorizonScheduler
+
+POINTS = [GNSS_Point(name="1", easting=2_600_400.3, northing=1_200_550.8, floor_height=500.0), GNSS_Point(name="2", easting=2_600_620.0, northing=1_200_380.5, floor_height=450.0, antenna_height=1.5)]
+PARAMETERS = {"number_of_lines": 32, "line_length": 300, "number_of_segments": 300}
+
+
+def plan(point: GNSS_Point, dem_path: str, kernel: str) -> tuple[list, list]:
+    return RoughPlanning(point=point, dem_path=dem_path, method="CONVENTIONAL").plan(kernel=kernel, **PARAMETERS)
+
+
+@pytest.mark.parametrize("kernel", ['NUMPY', 'NUMBA'])
+@pytest.mark.parametrize("point", POINTS, ids=lambda point: point.name)
+def test_array_kernels_match_pool(dem_path, point, kernel):
+    reference = plan(point=point, dem_path=dem_path, kernel='POOL')
+    result = plan(point=point, dem_path=dem_path, kernel=kernel)
+    np.testing.assert_allclose(result[0], reference[0], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(result[1], reference[1], rtol=0, atol=1e-9)
+
+
+def test_block_scheduler_matches_pool(dem_path):
+    blocks = BlockHorizonScheduler(points=POINTS, dem_path=dem_path).plan(**PARAMETERS)
+    for point in POINTS:
+        reference = plan(point=point, dem_path=dem_path, kernel='POOL')
+        np.testing.assert_allclose(blocks[point.name][0], reference[0], rtol=0, atol=1e-12)
+        np.testing.assert_allclose(blocks[point.name][1], reference[1], rtol=0, atol=1e-9)
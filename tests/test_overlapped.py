@@ -0,0 +1,50 @@
+import faulthandler
+import os
+
+import numpy as np
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.RoughPlanning import RoughPlanning
+from backend.roughplanning.DEM import LazyTileDEM
+from backend.roughplanning.OverlappedPipeline import OverlappedPlanner
+from backend.roughplanning.Pipeline import PlanningSettings
+
+POINTS = [GNSS_Point(name=f"P{idx}", easting=2_600_300.0 + idx * 450, northing=1_200_700.0 - idx * 300, floor_height=600.0) for idx in range(3)]
+
+
+def create_planner(server, folder: str) -> OverlappedPlanner:
+    settings = PlanningSettings(distance=200, segment_resolution=1, number_of_lines=16, cutoff=0, kernel='NUMPY')
+    return OverlappedPlanner(points=POINTS, settings=settings, raster_directory=os.path.join(folder, "raster"), wms_url=server.wms_url, data_url=server.data_url, download_workers=4, queue_size=2)
+
+
+def run_with_timeout(planner: OverlappedPlanner, timeout: float = 120) -> dict:
+    # on the main thread (numba threads started from a helper thread keep the interpreter alive), a hang aborts the run
+    faulthandler.dump_traceback_later(timeout, exit=True)
+    try:
+        return {"horizons": planner.run()}
+    except Exception as error:
+        return {"error": error}
+    finally:
+        faulthandler.cancel_dump_traceback_later()
+
+
+def test_overlapped_run_matches_tile_provider(tile_server, tmp_path):
+    planner = create_planner(server=tile_server, folder=str(tmp_path))
+    horizons = run_with_timeout(planner=planner)["horizons"]
+
+    lazy_dem = LazyTileDEM(cache_folder=str(tmp_path / "raster" / "tiles"), wms_url=tile_server.wms_url, data_url=tile_server.data_url)
+    for point in POINTS:
+        reference = RoughPlanning(point=point, dem_path="", method="CONVENTIONAL", dem_provider=lazy_dem).plan(number_of_lines=16, line_length=200, number_of_segments=200, kernel='NUMPY')
+        np.testing.assert_allclose(horizons[point.name][1], reference[1], rtol=0, atol=1e-9)
+
+    # windows are deleted once their point is planned
+    assert not os.listdir(tmp_path / "raster" / "points")
+
+
+def test_failed_planning_cancels_downloads(tile_server, tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ValueError("planning failed")
+    monkeypatch.setattr(OverlappedPlanner, "plan_point", fail)
+
+    outcome = run_with_timeout(planner=create_planner(server=tile_server, folder=str(tmp_path)))
+    assert isinstance(outcome.get("error"), ValueError)
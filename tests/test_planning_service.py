@@ -0,0 +1,74 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.Pipeline import PlanningSettings
+from backend.roughplanning.PlanningService import PlanningService, ServiceHTTPServer
+
+POINT = {"name": "P1", "easting": 2_600_400.0, "northing": 1_200_400.0, "floor_height": 600.0, "antenna_height": 2.0}
+
+
+def create_service(server, folder: str) -> PlanningService:
+    settings = PlanningSettings(distance=200, segment_resolution=1, number_of_lines=16, cutoff=0, kernel='NUMPY')
+    return PlanningService(settings=settings, raster_directory=folder, wms_url=server.wms_url, data_url=server.data_url)
+
+
+@pytest.mark.parametrize("changes", [{"easting": float("nan")}, {"northing": float("inf")}, {"easting": 100.0}, {"floor_height": 1e9}, {"antenna_height": -2.0}])
+def test_invalid_points_are_rejected(tile_server, tmp_path, changes):
+    service = create_service(server=tile_server, folder=str(tmp_path))
+    server = ServiceHTTPServer(("127.0.0.1", 0), service.create_handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        body = json.dumps({"points": [POINT, {**POINT, "name": "P2", **changes}]}).encode()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/plan", data=body, timeout=10)
+        assert error.value.code == 400
+        assert "P2" in json.loads(error.value.read())["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert service.requests.empty() # never reached the batch loop
+
+
+def test_bad_point_fails_only_its_request(tile_server, tmp_path):
+    service = create_service(server=tile_server, folder=str(tmp_path))
+    good = service.submit(points=[GNSS_Point(**POINT)])
+    bad = service.submit(points=[GNSS_Point(**{**POINT, "name": "P2", "easting": float("nan")})])
+    service.process_batch(requests=service.collect_batch())
+
+    assert good.done.is_set() and bad.done.is_set()
+    assert good.error is None and len(good.horizons[0][1]) == 16
+    assert bad.error is not None and bad.horizons is None
+
+
+def test_unexpected_error_completes_every_request(tile_server, tmp_path, monkeypatch):
+    service = create_service(server=tile_server, folder=str(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("kaputt")
+    monkeypatch.setattr(service, "plan_requests", fail)
+
+    requests = [service.submit(points=[GNSS_Point(**POINT)]) for _ in range(2)]
+    service.process_batch(requests=service.collect_batch())
+    assert all(request.done.is_set() and request.error == "kaputt" for request in requests)
+    assert service.metrics.get_summary()["failed_requests"] == 2
+
+
+def test_plan_raises_runtime_error(tile_server, tmp_path):
+    service = create_service(server=tile_server, folder=str(tmp_path))
+    # the batch loop runs here, the in-process API waits on another thread
+    outcome = {}
+    def plan() -> None:
+        try:
+            service.plan(points=[GNSS_Point(**{**POINT, "easting": float("nan")})])
+        except Exception as error:
+            outcome["error"] = error
+    caller = threading.Thread(target=plan)
+    caller.start()
+    service.process_batch(requests=service.collect_batch(timeout=10))
+    caller.join(timeout=10)
+    assert type(outcome["error"]) is RuntimeError
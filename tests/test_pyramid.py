@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+import rasterio
+
+from benchmarks.synthetic import create_dem
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.DEM import RasterDEM
+from backend.roughplanning.Executor import Executor
+from backend.roughplanning.Merger import RasterMerger
+from backend.roughplanning.RoughPlanning import RoughPlanning
+
+POINT = GNSS_Point(name="P1", easting=2_600_250.0, northing=1_200_250.0, floor_height=560.0)
+
+
+def create_raster_with_hole(folder: str, nodata: float) -> str:
+    os.makedirs(folder, exist_ok=True)
+    path = create_dem(path=os.path.join(folder, "tile.tif"), easting=2_600_000, northing=1_200_000, width=1000, height=1000)
+    with rasterio.open(path, "r+") as dst:
+        dst.nodata = nodata
+        band = dst.read(1)
+        band[380:420, 600:640] = nodata # 20 m hole north-east of the point
+        band[300:520, 880:890] = np.nan # cells without a nodata flag
+        dst.write(band, 1)
+    return path
+
+
+@pytest.mark.parametrize("storage", ['NATIVE', 'INT16'])
+def test_pyramid_matches_full_sampling_with_nodata(tmp_path, storage):
+    # a nodata value above the terrain makes every skipped nodata sample visible in the horizon
+    source = create_raster_with_hole(folder=str(tmp_path / "source"), nodata=900.0)
+    merger = RasterMerger(path=str(tmp_path / "merged"), storage=storage, file_paths=[source])
+    merger.merge_raster()
+
+    horizons = {}
+    for use_pyramid in (True, False):
+        dem = RasterDEM(path=merger.merged_path, use_pyramid=use_pyramid)
+        planner = RoughPlanning(point=POINT, dem_path="", method="CONVENTIONAL", dem_provider=dem, executor=Executor(backend='SERIAL'))
+        horizons[use_pyramid] = (planner.plan(number_of_lines=64, line_length=200, number_of_segments=400, kernel='POOL'), planner.plan_antenna_heights(antenna_heights=[2.0, 10.0], number_of_lines=64, line_length=200, number_of_segments=400, kernel='POOL'))
+
+    assert RasterDEM(path=merger.merged_path).get_pyramid_block_sizes()
+    np.testing.assert_array_equal(horizons[True][0][1], horizons[False][0][1])
+    for antenna_height in (2.0, 10.0):
+        np.testing.assert_array_equal(horizons[True][1][antenna_height][1], horizons[False][1][antenna_height][1])
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import rasterio
+
+from backend.roughplanning.GNSS import GNSS_Point
+from backend.roughplanning.DEM import RasterDEM
+from backend.roughplanning.SiteSearch import SiteSearch
+
+POINT = GNSS_Point(name="1", easting=2_600_500.0, northing=1_200_500.0, floor_height=600.0)
+ROOF = (2_600_503.0, 2_600_510.0, 1_200_495.0, 1_200_505.0) # Emin, Emax, Nmin, Nmax of a 20 m high building east of the point
+
+
+def on_roof(easting: float, northing: float) -> bool:
+    return ROOF[0] <= easting < ROOF[1] and ROOF[2] <= northing < ROOF[3]
+
+
+def create_surface(dem_path: str, folder: str) -> str:
+    # surface model = terrain + building
+    path = os.path.join(folder, "surface.tif")
+    with rasterio.open(dem_path) as src:
+        array, profile = src.read(1), src.profile
+        rows, cols = np.indices(array.shape)
+        eastings, northings = rasterio.transform.xy(src.transform, rows.ravel(), cols.ravel())
+    building = np.array([on_roof(e, n) for e, n in zip(eastings, northings)]).reshape(array.shape)
+    with rasterio.open(path, "w", **profile) as dest:
+        dest.write(np.where(building, array + 20, array).astype(array.dtype), 1)
+    return path
+
+
+def test_candidates_stay_on_the_ground(dem_path, tmp_path):
+    surface = RasterDEM(path=create_surface(dem_path=dem_path, folder=str(tmp_path)))
+    terrain = RasterDEM(path=dem_path)
+
+    site_search = SiteSearch(point=POINT, dem=surface, terrain=terrain, search_radius=10, spacing=1)
+    candidates = site_search.search(number_of_lines=16, line_length=200, number_of_segments=200, cutoff=10, kernel='NUMPY')
+
+    # the roof candidates are dropped, all others are evaluated
+    eastings, northings = site_search.get_candidates()
+    roof = surface.sample(eastings=eastings, northings=northings) - terrain.sample(eastings=eastings, northings=northings) > 10
+    assert roof.sum() > 50
+    assert len(candidates) == len(eastings) - roof.sum()
+    assert any(candidate.shift == 0 for candidate in candidates)
+
+    # every candidate keeps the height of the nominal point above the terrain
+    nominal_ground = terrain.sample(eastings=np.array([POINT.easting]), northings=np.array([POINT.northing]))[0]
+    for candidate in candidates:
+        ground = terrain.sample(eastings=np.array([candidate.point.easting]), northings=np.array([candidate.point.northing]))[0]
+        assert abs((candidate.point.floor_height - ground) - (POINT.floor_height - nominal_ground)) < 1e-3 # float32 DEM